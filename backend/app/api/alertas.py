@@ -17,6 +17,10 @@ from ..models.alerta import Alerta, TipoAlerta
 from ..models.vehiculo import Vehiculo
 from ..models.movimiento import Movimiento
 from ..models.usuario import Usuario
+from ..services.metricas import medir_job
+from ..services.serializacion import respuesta_lista
+from ..services.invalidacion import publicar_invalidacion
+from ..services.versiones import ALERTAS
 from .auth import get_current_user
 
 router = APIRouter()
@@ -45,6 +49,7 @@ class ResolverAlerta(BaseModel):
 
 
 # Funciones auxiliares
+@medir_job("inactividad")
 def generar_alertas_inactividad(db: Session):
     """
     Genera alertas para vehículos que llevan más de X días sin movimiento.
@@ -84,6 +89,7 @@ def generar_alertas_inactividad(db: Session):
 
     if alertas_creadas > 0:
         db.commit()
+        publicar_invalidacion(ALERTAS)
 
     return alertas_creadas
 
@@ -102,7 +108,19 @@ async def listar_alertas(
     db: Session = Depends(get_db)
 ):
     """Listar alertas con filtros"""
-    query = db.query(Alerta)
+    query = db.query(
+        Alerta.id,
+        Alerta.tipo,
+        Alerta.vehiculo_id,
+        Vehiculo.matricula.label("vehiculo_matricula"),
+        Alerta.titulo,
+        Alerta.mensaje,
+        Alerta.prioridad,
+        Alerta.leida,
+        Alerta.resuelta,
+        Alerta.fecha_creacion,
+        Alerta.fecha_resolucion
+    ).outerjoin(Vehiculo, Vehiculo.id == Alerta.vehiculo_id)
 
     if tipo:
         query = query.filter(Alerta.tipo == TipoAlerta(tipo))
@@ -119,31 +137,24 @@ async def listar_alertas(
     if vehiculo_id:
         query = query.filter(Alerta.vehiculo_id == vehiculo_id)
 
-    alertas = query.order_by(desc(Alerta.fecha_creacion)).offset(skip).limit(limit).all()
-
-    result = []
-    for alerta in alertas:
-        vehiculo_matricula = None
-        if alerta.vehiculo_id:
-            vehiculo = db.query(Vehiculo).filter(Vehiculo.id == alerta.vehiculo_id).first()
-            if vehiculo:
-                vehiculo_matricula = vehiculo.matricula
-
-        result.append(AlertaResponse(
-            id=alerta.id,
-            tipo=alerta.tipo.value,
-            vehiculo_id=alerta.vehiculo_id,
-            vehiculo_matricula=vehiculo_matricula,
-            titulo=alerta.titulo,
-            mensaje=alerta.mensaje,
-            prioridad=alerta.prioridad,
-            leida=alerta.leida,
-            resuelta=alerta.resuelta,
-            fecha_creacion=alerta.fecha_creacion,
-            fecha_resolucion=alerta.fecha_resolucion
-        ))
-
-    return result
+    filas = query.order_by(desc(Alerta.fecha_creacion)).offset(skip).limit(limit).all()
+
+    return respuesta_lista(AlertaResponse, [
+        {
+            "id": fila.id,
+            "tipo": fila.tipo.value,
+            "vehiculo_id": fila.vehiculo_id,
+            "vehiculo_matricula": fila.vehiculo_matricula,
+            "titulo": fila.titulo,
+            "mensaje": fila.mensaje,
+            "prioridad": fila.prioridad,
+            "leida": fila.leida,
+            "resuelta": fila.resuelta,
+            "fecha_creacion": fila.fecha_creacion,
+            "fecha_resolucion": fila.fecha_resolucion
+        }
+        for fila in filas
+    ])
 
 
 @router.get("/contador")
@@ -222,6 +233,7 @@ async def marcar_leida(
     alerta.leida = True
     alerta.fecha_lectura = datetime.utcnow()
     db.commit()
+    publicar_invalidacion(ALERTAS)
 
     return {"mensaje": "Alerta marcada como leída"}
 
@@ -243,6 +255,7 @@ async def resolver_alerta(
     alerta.resuelta_por_id = current_user.id
     alerta.notas_resolucion = datos.notas
     db.commit()
+    publicar_invalidacion(ALERTAS)
 
     return {"mensaje": "Alerta resuelta"}
 
@@ -268,5 +281,6 @@ async def marcar_todas_leidas(
         Alerta.fecha_lectura: datetime.utcnow()
     })
     db.commit()
+    publicar_invalidacion(ALERTAS)
 
     return {"mensaje": "Todas las alertas marcadas como leídas"}
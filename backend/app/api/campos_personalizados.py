@@ -12,6 +12,9 @@ from datetime import datetime
 from ..database import get_db
 from ..models.vehiculo import CampoPersonalizado, ValorCampoPersonalizado
 from ..models.usuario import Usuario
+from ..services.campos_tipados import recalcular_valores_campo
+from ..services.invalidacion import publicar_invalidacion
+from ..services.versiones import CAMPOS, verificar_etag
 from .auth import get_current_user, get_current_admin
 
 router = APIRouter()
@@ -51,7 +54,7 @@ class CampoResponse(BaseModel):
 
 
 # Endpoints
-@router.get("/", response_model=List[CampoResponse])
+@router.get("/", response_model=List[CampoResponse], dependencies=[Depends(verificar_etag(CAMPOS))])
 async def listar_campos(
     activo: Optional[bool] = True,
     current_user: Usuario = Depends(get_current_user),
@@ -80,7 +83,7 @@ async def listar_campos(
     ]
 
 
-@router.get("/{campo_id}", response_model=CampoResponse)
+@router.get("/{campo_id}", response_model=CampoResponse, dependencies=[Depends(verificar_etag(CAMPOS))])
 async def obtener_campo(
     campo_id: int,
     current_user: Usuario = Depends(get_current_user),
@@ -146,6 +149,7 @@ async def crear_campo(
 
     db.add(nuevo_campo)
     db.commit()
+    publicar_invalidacion(CAMPOS)
     db.refresh(nuevo_campo)
 
     return CampoResponse(
@@ -182,7 +186,11 @@ async def actualizar_campo(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail=f"Tipo inválido. Opciones: {', '.join(tipos_validos)}"
             )
+        tipo_cambiado = campo.tipo != campo_data.tipo
         campo.tipo = campo_data.tipo
+        if tipo_cambiado:
+            # Rellenar la columna tipada del nuevo tipo en los valores ya guardados
+            recalcular_valores_campo(db, campo)
 
     if campo_data.opciones is not None:
         campo.opciones = campo_data.opciones
@@ -197,6 +205,7 @@ async def actualizar_campo(
         campo.activo = campo_data.activo
 
     db.commit()
+    publicar_invalidacion(CAMPOS)
     db.refresh(campo)
 
     return CampoResponse(
@@ -224,6 +233,7 @@ async def eliminar_campo(
 
     campo.activo = False
     db.commit()
+    publicar_invalidacion(CAMPOS)
 
     return {"mensaje": f"Campo '{campo.etiqueta}' desactivado correctamente"}
 
@@ -316,6 +326,7 @@ async def inicializar_campos_predefinidos(
         creados += 1
 
     db.commit()
+    publicar_invalidacion(CAMPOS)
 
     return {
         "mensaje": f"Campos predefinidos procesados",
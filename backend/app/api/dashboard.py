@@ -4,12 +4,15 @@ Endpoints del Dashboard / Panel Principal
 - Resumen de vehículos por zona
 - Mapa interactivo
 - Listados prioritarios
+- Tiempos por etapa (etiqueta)
 """
 from typing import List, Optional
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
-from sqlalchemy import func, desc
-from datetime import datetime, timedelta
+from sqlalchemy import JSON, desc, func, select, type_coerce
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from datetime import date, datetime, timedelta
+from collections import defaultdict
 
 from ..database import get_db
 from ..config import settings
@@ -19,12 +22,40 @@ from ..models.zona import Zona
 from ..models.movimiento import Movimiento, TipoMovimiento
 from ..models.alerta import Alerta
 from ..models.usuario import Usuario
+from ..services import contadores
+from ..services.catalogo_zonas import catalogo_zonas
+from ..services.estancias import analizar_estancias
+from ..services.etiquetas_espera import etiquetas_espera_piezas
+from ..services.versiones import ZONAS, ETIQUETAS, VEHICULOS, MOVIMIENTOS, ALERTAS, verificar_etag
 from .auth import get_current_user
 
 router = APIRouter()
 
 
-@router.get("/estadisticas")
+def etiquetas_activas_json(db: Session):
+    """
+    Etiquetas activas del vehículo como lista JSON [{nombre, color}], en una
+    subconsulta correlacionada con Vehiculo.id (json_agg en PostgreSQL,
+    json_group_array en SQLite): la fila del vehículo ya trae sus etiquetas.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        lista = func.json_agg(aggregate_order_by(
+            func.json_build_object("nombre", Etiqueta.nombre, "color", Etiqueta.color), VehiculoEtiqueta.id
+        ))
+    else:
+        lista = func.json_group_array(func.json_object("nombre", Etiqueta.nombre, "color", Etiqueta.color))
+    return type_coerce(
+        select(lista).select_from(VehiculoEtiqueta).join(
+            Etiqueta, Etiqueta.id == VehiculoEtiqueta.etiqueta_id
+        ).where(
+            VehiculoEtiqueta.vehiculo_id == Vehiculo.id,
+            VehiculoEtiqueta.activa == True
+        ).correlate(Vehiculo).scalar_subquery(),
+        JSON
+    )
+
+
+@router.get("/estadisticas", dependencies=[Depends(verificar_etag(VEHICULOS, ZONAS, ETIQUETAS, ALERTAS, MOVIMIENTOS))])
 async def obtener_estadisticas(
     current_user: Usuario = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -40,28 +71,24 @@ async def obtener_estadisticas(
 
     # Vehículos por zona
     vehiculos_por_zona = []
-    zonas = db.query(Zona).filter(Zona.activo == True).order_by(Zona.orden).all()
-    for zona in zonas:
-        cantidad = db.query(Vehiculo).filter(
-            Vehiculo.zona_actual_id == zona.id,
-            Vehiculo.en_instalaciones == True
-        ).count()
+    cantidades = contadores.leer(db, contadores.ZONA)
+    for zona in catalogo_zonas(db).zonas.values():
+        if not zona["activo"]:
+            continue
         vehiculos_por_zona.append({
-            "zona_id": zona.id,
-            "zona_nombre": zona.nombre,
-            "zona_codigo": zona.codigo,
-            "zona_color": zona.color,
-            "cantidad": cantidad
+            "zona_id": zona["id"],
+            "zona_nombre": zona["nombre"],
+            "zona_codigo": zona["codigo"],
+            "zona_color": zona["color"],
+            "cantidad": cantidades.get(zona["id"], 0)
         })
 
     # Vehículos por etiqueta
     vehiculos_por_etiqueta = []
     etiquetas = db.query(Etiqueta).filter(Etiqueta.activo == True).order_by(Etiqueta.orden).all()
+    cantidades = contadores.leer(db, contadores.ETIQUETA)
     for etiqueta in etiquetas:
-        cantidad = db.query(VehiculoEtiqueta).filter(
-            VehiculoEtiqueta.etiqueta_id == etiqueta.id,
-            VehiculoEtiqueta.activa == True
-        ).count()
+        cantidad = cantidades.get(etiqueta.id, 0)
         vehiculos_por_etiqueta.append({
             "etiqueta_id": etiqueta.id,
             "etiqueta_nombre": etiqueta.nombre,
@@ -106,59 +133,49 @@ async def obtener_estadisticas(
     }
 
 
-@router.get("/mapa")
+@router.get("/mapa", dependencies=[Depends(verificar_etag(ZONAS, VEHICULOS, ETIQUETAS))])
 async def obtener_datos_mapa(
     current_user: Usuario = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Obtener datos para el mapa interactivo"""
-    zonas = db.query(Zona).filter(Zona.activo == True).all()
+    zonas = [zona for zona in catalogo_zonas(db).zonas.values() if zona["activo"]]
+    if not zonas:
+        return []
+
+    # Vehículos de todas las zonas, con sus etiquetas, en una consulta
+    vehiculos_por_zona = defaultdict(list)
+    for fila in db.query(
+        Vehiculo.id, Vehiculo.matricula, Vehiculo.marca, Vehiculo.modelo, Vehiculo.color,
+        Vehiculo.fecha_ultimo_movimiento, Vehiculo.zona_actual_id,
+        etiquetas_activas_json(db).label("etiquetas")
+    ).filter(
+        Vehiculo.zona_actual_id.in_([zona["id"] for zona in zonas]),
+        Vehiculo.en_instalaciones == True
+    ).order_by(Vehiculo.id):
+        vehiculos_por_zona[fila.zona_actual_id].append({
+            "id": fila.id,
+            "matricula": fila.matricula,
+            "marca": fila.marca,
+            "modelo": fila.modelo,
+            "color": fila.color,
+            "etiquetas": fila.etiquetas or [],
+            "fecha_ultimo_movimiento": fila.fecha_ultimo_movimiento
+        })
 
     resultado = []
     for zona in zonas:
-        # Obtener vehículos en esta zona
-        vehiculos = db.query(Vehiculo).filter(
-            Vehiculo.zona_actual_id == zona.id,
-            Vehiculo.en_instalaciones == True
-        ).all()
-
-        vehiculos_list = []
-        for v in vehiculos:
-            # Obtener etiquetas del vehículo
-            etiquetas = db.query(VehiculoEtiqueta).filter(
-                VehiculoEtiqueta.vehiculo_id == v.id,
-                VehiculoEtiqueta.activa == True
-            ).all()
-
-            etiquetas_info = []
-            for ve in etiquetas:
-                etiqueta = db.query(Etiqueta).filter(Etiqueta.id == ve.etiqueta_id).first()
-                if etiqueta:
-                    etiquetas_info.append({
-                        "nombre": etiqueta.nombre,
-                        "color": etiqueta.color
-                    })
-
-            vehiculos_list.append({
-                "id": v.id,
-                "matricula": v.matricula,
-                "marca": v.marca,
-                "modelo": v.modelo,
-                "color": v.color,
-                "etiquetas": etiquetas_info,
-                "fecha_ultimo_movimiento": v.fecha_ultimo_movimiento
-            })
-
+        vehiculos_list = vehiculos_por_zona[zona["id"]]
         resultado.append({
-            "id": zona.id,
-            "nombre": zona.nombre,
-            "codigo": zona.codigo,
-            "tipo": zona.tipo,
-            "pos_x": zona.pos_x,
-            "pos_y": zona.pos_y,
-            "ancho": zona.ancho,
-            "alto": zona.alto,
-            "color": zona.color,
+            "id": zona["id"],
+            "nombre": zona["nombre"],
+            "codigo": zona["codigo"],
+            "tipo": zona["tipo"],
+            "pos_x": zona["pos_x"],
+            "pos_y": zona["pos_y"],
+            "ancho": zona["ancho"],
+            "alto": zona["alto"],
+            "color": zona["color"],
             "vehiculos": vehiculos_list,
             "cantidad_vehiculos": len(vehiculos_list)
         })
@@ -166,6 +183,25 @@ async def obtener_datos_mapa(
     return resultado
 
 
+@router.get("/tiempos-por-etiqueta")
+async def obtener_tiempos_por_etiqueta(
+    desde: Optional[date] = Query(default=None, description="Primer día (por fecha de remoción)"),
+    hasta: Optional[date] = Query(default=None, description="Último día (por defecto hoy)"),
+    current_user: Usuario = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Tiempo que pasan los vehículos en cada etiqueta: distribución por tramos, media,
+    p50/p90 de las estancias terminadas en el rango (por defecto los últimos 90 días),
+    estancias en curso y ranking de cuellos de botella
+    """
+    hasta = hasta or datetime.utcnow().date()
+    desde = desde or hasta - timedelta(days=90)
+    if desde > hasta:
+        raise HTTPException(status_code=400, detail="'desde' no puede ser posterior a 'hasta'")
+    return analizar_estancias(db, desde, hasta)
+
+
 @router.get("/vehiculos-inactivos")
 async def listar_vehiculos_inactivos(
     dias: int = Query(default=20, ge=1),
@@ -205,46 +241,41 @@ async def listar_vehiculos_esperando_piezas(
     current_user: Usuario = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Listar vehículos con etiqueta 'Esperando piezas' o similar"""
-    # Buscar etiquetas que contengan "pieza" o "espera"
-    etiquetas_espera = db.query(Etiqueta).filter(
-        Etiqueta.activo == True,
-        (Etiqueta.nombre.ilike("%pieza%")) | (Etiqueta.nombre.ilike("%espera%"))
-    ).all()
-
-    if not etiquetas_espera:
+    """Listar vehículos con etiqueta 'Esperando piezas' o similar (ETIQUETAS_ESPERA_PIEZAS)"""
+    etiqueta_ids = etiquetas_espera_piezas(db)
+    if not etiqueta_ids:
         return []
 
-    etiqueta_ids = [e.id for e in etiquetas_espera]
-
-    # Buscar vehículos con estas etiquetas
-    vehiculo_etiquetas = db.query(VehiculoEtiqueta).filter(
+    filas = db.query(
+        Vehiculo.id, Vehiculo.matricula, Vehiculo.marca, Vehiculo.modelo,
+        Vehiculo.cliente_nombre, Vehiculo.cliente_telefono,
+        Etiqueta.nombre.label("etiqueta"), Etiqueta.color.label("etiqueta_color"),
+        VehiculoEtiqueta.fecha_asignacion
+    ).join(
+        Vehiculo, Vehiculo.id == VehiculoEtiqueta.vehiculo_id
+    ).join(
+        Etiqueta, Etiqueta.id == VehiculoEtiqueta.etiqueta_id
+    ).filter(
         VehiculoEtiqueta.etiqueta_id.in_(etiqueta_ids),
         VehiculoEtiqueta.activa == True
     ).order_by(VehiculoEtiqueta.fecha_asignacion.asc()).limit(limit).all()
 
-    resultado = []
-    for ve in vehiculo_etiquetas:
-        vehiculo = db.query(Vehiculo).filter(Vehiculo.id == ve.vehiculo_id).first()
-        etiqueta = db.query(Etiqueta).filter(Etiqueta.id == ve.etiqueta_id).first()
-
-        if vehiculo:
-            dias_esperando = (datetime.utcnow() - ve.fecha_asignacion).days if ve.fecha_asignacion else 0
-
-            resultado.append({
-                "id": vehiculo.id,
-                "matricula": vehiculo.matricula,
-                "marca": vehiculo.marca,
-                "modelo": vehiculo.modelo,
-                "cliente_nombre": vehiculo.cliente_nombre,
-                "cliente_telefono": vehiculo.cliente_telefono,
-                "etiqueta": etiqueta.nombre if etiqueta else None,
-                "etiqueta_color": etiqueta.color if etiqueta else None,
-                "dias_esperando": dias_esperando,
-                "fecha_asignacion_etiqueta": ve.fecha_asignacion
-            })
-
-    return resultado
+    ahora = datetime.utcnow()
+    return [
+        {
+            "id": fila.id,
+            "matricula": fila.matricula,
+            "marca": fila.marca,
+            "modelo": fila.modelo,
+            "cliente_nombre": fila.cliente_nombre,
+            "cliente_telefono": fila.cliente_telefono,
+            "etiqueta": fila.etiqueta,
+            "etiqueta_color": fila.etiqueta_color,
+            "dias_esperando": (ahora - fila.fecha_asignacion).days if fila.fecha_asignacion else 0,
+            "fecha_asignacion_etiqueta": fila.fecha_asignacion
+        }
+        for fila in filas
+    ]
 
 
 @router.get("/vehiculos-por-tiempo-estancia")
@@ -254,43 +285,32 @@ async def listar_vehiculos_por_tiempo_estancia(
     db: Session = Depends(get_db)
 ):
     """Listar vehículos ordenados por tiempo de estancia (más antiguos primero)"""
-    vehiculos = db.query(Vehiculo).filter(
+    filas = db.query(
+        Vehiculo.id, Vehiculo.matricula, Vehiculo.marca, Vehiculo.modelo, Vehiculo.cliente_nombre,
+        Vehiculo.fecha_primera_entrada, Zona.nombre.label("zona"),
+        etiquetas_activas_json(db).label("etiquetas")
+    ).outerjoin(
+        Zona, Zona.id == Vehiculo.zona_actual_id
+    ).filter(
         Vehiculo.en_instalaciones == True,
         Vehiculo.fecha_primera_entrada.isnot(None)
     ).order_by(Vehiculo.fecha_primera_entrada.asc()).limit(limit).all()
 
-    resultado = []
-    for v in vehiculos:
-        dias_estancia = (datetime.utcnow() - v.fecha_primera_entrada).days if v.fecha_primera_entrada else 0
-
-        # Obtener etiquetas
-        etiquetas = db.query(VehiculoEtiqueta).filter(
-            VehiculoEtiqueta.vehiculo_id == v.id,
-            VehiculoEtiqueta.activa == True
-        ).all()
-
-        etiquetas_info = []
-        for ve in etiquetas:
-            etiqueta = db.query(Etiqueta).filter(Etiqueta.id == ve.etiqueta_id).first()
-            if etiqueta:
-                etiquetas_info.append({
-                    "nombre": etiqueta.nombre,
-                    "color": etiqueta.color
-                })
-
-        resultado.append({
-            "id": v.id,
-            "matricula": v.matricula,
-            "marca": v.marca,
-            "modelo": v.modelo,
-            "cliente_nombre": v.cliente_nombre,
-            "zona_actual": v.zona_actual.nombre if v.zona_actual else None,
-            "dias_estancia": dias_estancia,
-            "fecha_entrada": v.fecha_primera_entrada,
-            "etiquetas": etiquetas_info
-        })
-
-    return resultado
+    ahora = datetime.utcnow()
+    return [
+        {
+            "id": fila.id,
+            "matricula": fila.matricula,
+            "marca": fila.marca,
+            "modelo": fila.modelo,
+            "cliente_nombre": fila.cliente_nombre,
+            "zona_actual": fila.zona,
+            "dias_estancia": (ahora - fila.fecha_primera_entrada).days if fila.fecha_primera_entrada else 0,
+            "fecha_entrada": fila.fecha_primera_entrada,
+            "etiquetas": fila.etiquetas or []
+        }
+        for fila in filas
+    ]
 
 
 @router.get("/actividad-reciente")
@@ -300,24 +320,28 @@ async def obtener_actividad_reciente(
     db: Session = Depends(get_db)
 ):
     """Obtener actividad reciente (entradas/salidas)"""
-    movimientos = db.query(Movimiento).filter(
+    filas = db.query(
+        Movimiento.id, Movimiento.tipo, Movimiento.vehiculo_id, Movimiento.fecha_hora, Movimiento.manual,
+        Vehiculo.matricula, Vehiculo.marca, Vehiculo.modelo, Zona.nombre.label("zona")
+    ).outerjoin(
+        Vehiculo, Vehiculo.id == Movimiento.vehiculo_id
+    ).outerjoin(
+        Zona, Zona.id == Movimiento.zona_destino_id
+    ).filter(
         Movimiento.tipo.in_([TipoMovimiento.ENTRADA, TipoMovimiento.SALIDA])
     ).order_by(desc(Movimiento.fecha_hora)).limit(limit).all()
 
-    resultado = []
-    for mov in movimientos:
-        vehiculo = db.query(Vehiculo).filter(Vehiculo.id == mov.vehiculo_id).first()
-
-        resultado.append({
-            "id": mov.id,
-            "tipo": mov.tipo.value,
-            "vehiculo_id": mov.vehiculo_id,
-            "matricula": vehiculo.matricula if vehiculo else "N/A",
-            "marca": vehiculo.marca if vehiculo else None,
-            "modelo": vehiculo.modelo if vehiculo else None,
-            "zona": mov.zona_destino.nombre if mov.zona_destino else None,
-            "fecha_hora": mov.fecha_hora,
-            "manual": mov.manual
-        })
-
-    return resultado
+    return [
+        {
+            "id": fila.id,
+            "tipo": fila.tipo.value,
+            "vehiculo_id": fila.vehiculo_id,
+            "matricula": fila.matricula or "N/A",
+            "marca": fila.marca,
+            "modelo": fila.modelo,
+            "zona": fila.zona,
+            "fecha_hora": fila.fecha_hora,
+            "manual": fila.manual
+        }
+        for fila in filas
+    ]
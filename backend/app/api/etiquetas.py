@@ -11,8 +11,11 @@ from pydantic import BaseModel
 from datetime import datetime
 
 from ..database import get_db
-from ..models.etiqueta import Etiqueta, VehiculoEtiqueta
+from ..models.etiqueta import Etiqueta
 from ..models.usuario import Usuario
+from ..services import contadores
+from ..services.invalidacion import publicar_invalidacion
+from ..services.versiones import ETIQUETAS, verificar_etag
 from .auth import get_current_user, get_current_admin
 
 router = APIRouter()
@@ -52,7 +55,7 @@ class EtiquetaResponse(BaseModel):
 
 
 # Endpoints
-@router.get("/", response_model=List[EtiquetaResponse])
+@router.get("/", response_model=List[EtiquetaResponse], dependencies=[Depends(verificar_etag(ETIQUETAS))])
 async def listar_etiquetas(
     activo: Optional[bool] = True,
     current_user: Usuario = Depends(get_current_user),
@@ -65,14 +68,11 @@ async def listar_etiquetas(
         query = query.filter(Etiqueta.activo == activo)
 
     etiquetas = query.order_by(Etiqueta.orden, Etiqueta.nombre).all()
+    cantidades = contadores.leer(db, contadores.ETIQUETA, [etiqueta.id for etiqueta in etiquetas])
 
     result = []
     for etiqueta in etiquetas:
-        # Contar vehículos con esta etiqueta activa
-        cantidad = db.query(VehiculoEtiqueta).filter(
-            VehiculoEtiqueta.etiqueta_id == etiqueta.id,
-            VehiculoEtiqueta.activa == True
-        ).count()
+        cantidad = cantidades.get(etiqueta.id, 0)
 
         result.append(EtiquetaResponse(
             id=etiqueta.id,
@@ -89,7 +89,7 @@ async def listar_etiquetas(
     return result
 
 
-@router.get("/{etiqueta_id}", response_model=EtiquetaResponse)
+@router.get("/{etiqueta_id}", response_model=EtiquetaResponse, dependencies=[Depends(verificar_etag(ETIQUETAS))])
 async def obtener_etiqueta(
     etiqueta_id: int,
     current_user: Usuario = Depends(get_current_user),
@@ -100,10 +100,7 @@ async def obtener_etiqueta(
     if not etiqueta:
         raise HTTPException(status_code=404, detail="Etiqueta no encontrada")
 
-    cantidad = db.query(VehiculoEtiqueta).filter(
-        VehiculoEtiqueta.etiqueta_id == etiqueta.id,
-        VehiculoEtiqueta.activa == True
-    ).count()
+    cantidad = contadores.leer(db, contadores.ETIQUETA, [etiqueta.id]).get(etiqueta.id, 0)
 
     return EtiquetaResponse(
         id=etiqueta.id,
@@ -142,6 +139,7 @@ async def crear_etiqueta(
 
     db.add(nueva_etiqueta)
     db.commit()
+    publicar_invalidacion(ETIQUETAS)
     db.refresh(nueva_etiqueta)
 
     return EtiquetaResponse(
@@ -198,12 +196,10 @@ async def actualizar_etiqueta(
         etiqueta.activo = etiqueta_data.activo
 
     db.commit()
+    publicar_invalidacion(ETIQUETAS)
     db.refresh(etiqueta)
 
-    cantidad = db.query(VehiculoEtiqueta).filter(
-        VehiculoEtiqueta.etiqueta_id == etiqueta.id,
-        VehiculoEtiqueta.activa == True
-    ).count()
+    cantidad = contadores.leer(db, contadores.ETIQUETA, [etiqueta.id]).get(etiqueta.id, 0)
 
     return EtiquetaResponse(
         id=etiqueta.id,
@@ -238,5 +234,6 @@ async def eliminar_etiqueta(
     # No eliminamos, solo desactivamos
     etiqueta.activo = False
     db.commit()
+    publicar_invalidacion(ETIQUETAS)
 
     return {"mensaje": f"Etiqueta '{etiqueta.nombre}' desactivada correctamente"}
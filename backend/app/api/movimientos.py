@@ -6,22 +6,36 @@ Endpoints de Movimientos de Vehículos
 - Lógica de entrada/salida y cambio de zonas
 """
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, desc
-from pydantic import BaseModel
+import logging
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
+from sqlalchemy.orm import Session, Query as SQLQuery, aliased
+from sqlalchemy import and_, desc, func, update
+from sqlalchemy.exc import IntegrityError, OperationalError, SQLAlchemyError
+from pydantic import BaseModel, Field
 from datetime import datetime, timedelta
 
-from ..database import get_db
+from ..database import get_db, SessionLocal
 from ..config import settings
 from ..models.movimiento import Movimiento, TipoMovimiento
 from ..models.vehiculo import Vehiculo
 from ..models.zona import Zona, Camara
 from ..models.alerta import Alerta, TipoAlerta
 from ..models.usuario import Usuario
+from ..services.captura import capturar_deteccion
+from ..services.catalogo_zonas import CamaraCacheada, camara_por_codigo
+from ..services.cola_ingesta import encolar_deteccion
+from ..services.contadores import mover_vehiculo
+from ..services.idempotencia import eventos_recientes
+from ..services.metricas import medir_job, registrar_deteccion
+from ..services.registro_vehiculos import registro_vehiculos
+from ..services.serializacion import respuesta_lista
+from ..services.upsert import insertar_si_no_existe
+from ..services.invalidacion import publicar_invalidacion
+from ..services.versiones import VEHICULOS, MOVIMIENTOS, ALERTAS
 from .auth import get_current_user
 
 router = APIRouter()
+logger = logging.getLogger("sigv.movimientos")
 
 
 # Schemas
@@ -31,6 +45,7 @@ class DeteccionLPR(BaseModel):
     camara_codigo: str
     confianza: Optional[float] = None
     imagen_url: Optional[str] = None
+    evento_id: Optional[str] = Field(None, max_length=64)  # Los reintentos con el mismo id no se duplican
 
 
 class MovimientoManual(BaseModel):
@@ -60,92 +75,276 @@ class MovimientoResponse(BaseModel):
 
 
 # Funciones auxiliares
+INTENTOS_ESTADO_VEHICULO = 3
+
+
+def _tipo_movimiento(camara: CamaraCacheada, en_instalaciones: bool, zona_actual_id: Optional[int]) -> tuple:
+    """Tipo de movimiento de una detección y si el vehículo queda dentro de las instalaciones"""
+    if camara.tipo == "lpr":
+        if camara.direccion == "entrada" or (camara.direccion == "ambos" and not en_instalaciones):
+            return TipoMovimiento.ENTRADA, True
+        if camara.direccion == "salida" or (camara.direccion == "ambos" and en_instalaciones):
+            return TipoMovimiento.SALIDA, False
+        if zona_actual_id != camara.zona_id:
+            return TipoMovimiento.CAMBIO_ZONA, en_instalaciones
+    return TipoMovimiento.DETECCION, en_instalaciones
+
+
+def _actualizar_estado_vehiculo(db: Session, matricula: str, estado, tipo: TipoMovimiento,
+                                en_instalaciones: bool, zona_id: Optional[int], ahora: datetime) -> bool:
+    """
+    Escribir el nuevo estado solo si la fila sigue como dice el registro.
+    False si no coincide (registro desfasado o vehículo borrado/renombrado).
+    """
+    valores = {
+        "en_instalaciones": en_instalaciones,
+        "zona_actual_id": zona_id,
+        "fecha_ultimo_movimiento": ahora,
+    }
+    if tipo == TipoMovimiento.ENTRADA:
+        valores["fecha_ultima_entrada"] = ahora
+        valores["fecha_primera_entrada"] = func.coalesce(Vehiculo.fecha_primera_entrada, ahora)
+    elif tipo == TipoMovimiento.SALIDA:
+        valores["fecha_ultima_salida"] = ahora
+
+    resultado = db.execute(
+        update(Vehiculo.__table__)
+        .where(
+            Vehiculo.id == estado.id,
+            Vehiculo.matricula == matricula,
+            Vehiculo.en_instalaciones.is_not_distinct_from(estado.en_instalaciones),
+            Vehiculo.zona_actual_id.is_not_distinct_from(estado.zona_actual_id)
+        )
+        .values(**valores)
+    )
+    return resultado.rowcount == 1
+
+
+def _crear_vehiculo_detectado(db: Session, matricula: str, camara: CamaraCacheada, tipo: TipoMovimiento,
+                              en_instalaciones: bool, ahora: datetime) -> Optional[int]:
+    """
+    Alta de una matrícula no registrada con su alerta; devuelve el id del vehículo.
+    INSERT ... ON CONFLICT: si otra detección simultánea (otra cámara u otro worker) ya
+    la ha dado de alta devuelve None, sin error y sin segunda alerta.
+    """
+    valores = {
+        "matricula": matricula,
+        "en_instalaciones": en_instalaciones,
+        "zona_actual_id": camara.zona_id,
+        "fecha_ultimo_movimiento": ahora,
+    }
+    if tipo == TipoMovimiento.ENTRADA:
+        valores["fecha_primera_entrada"] = valores["fecha_ultima_entrada"] = ahora
+    elif tipo == TipoMovimiento.SALIDA:
+        valores["fecha_ultima_salida"] = ahora
+    vehiculo_id = insertar_si_no_existe(db, Vehiculo, valores, ["matricula"])
+    if vehiculo_id is None:
+        return None
+
+    db.add(Alerta(
+        tipo=TipoAlerta.ENTRADA_NO_REGISTRADA,
+        vehiculo_id=vehiculo_id,
+        titulo=f"Matrícula no registrada: {matricula}",
+        mensaje=f"Se ha detectado la matrícula {matricula} que no estaba en el sistema. "
+                f"Detectada por cámara {camara.codigo}.",
+        prioridad="media"
+    ))
+    return vehiculo_id
+
+
 def procesar_deteccion(
     matricula: str,
-    camara: Camara,
+    camara: CamaraCacheada,
     db: Session,
     confianza: float = None,
-    imagen_url: str = None
+    imagen_url: str = None,
+    fecha_hora: datetime = None,
+    confirmar: bool = True,
+    evento_id: str = None
 ) -> dict:
     """
     Procesa una detección de matrícula y actualiza el estado del vehículo.
     Retorna información sobre la acción realizada.
+    camara: la del catálogo de zonas (camara_por_codigo), sin consultas.
+    fecha_hora: momento de la lectura si no es ahora (detecciones encoladas).
+    confirmar=False deja el commit (y las versiones) a cargo del llamador, para aplicar lotes.
     """
+    ahora = fecha_hora or datetime.utcnow()
     matricula_norm = matricula.upper().replace(" ", "").replace("-", "")
 
-    # Buscar o crear vehículo
-    vehiculo = db.query(Vehiculo).filter(Vehiculo.matricula == matricula_norm).first()
-    vehiculo_nuevo = False
-
-    if not vehiculo:
-        # Crear vehículo nuevo
-        vehiculo = Vehiculo(matricula=matricula_norm)
-        db.add(vehiculo)
-        db.flush()
-        vehiculo_nuevo = True
-
-        # Crear alerta de matrícula no registrada
-        alerta = Alerta(
-            tipo=TipoAlerta.ENTRADA_NO_REGISTRADA,
-            vehiculo_id=vehiculo.id,
-            titulo=f"Matrícula no registrada: {matricula_norm}",
-            mensaje=f"Se ha detectado la matrícula {matricula_norm} que no estaba en el sistema. "
-                    f"Detectada por cámara {camara.codigo}.",
-            prioridad="media"
-        )
-        db.add(alerta)
+    # Estado actual del vehículo: registro en memoria o, si no está, la BD (solo 3 columnas)
+    estado = registro_vehiculos.obtener(matricula_norm)
+    if estado is None:
+        estado = registro_vehiculos.cargar(db, matricula_norm)
 
-    # Determinar tipo de movimiento basado en la cámara y estado actual
-    zona_origen_id = vehiculo.zona_actual_id
-    zona_destino_id = camara.zona_id
-    tipo_movimiento = TipoMovimiento.DETECCION
-
-    if camara.tipo == "lpr":
-        if camara.direccion == "entrada" or (camara.direccion == "ambos" and not vehiculo.en_instalaciones):
-            # Es una entrada
-            tipo_movimiento = TipoMovimiento.ENTRADA
-            vehiculo.en_instalaciones = True
-            vehiculo.fecha_ultima_entrada = datetime.utcnow()
-            if not vehiculo.fecha_primera_entrada:
-                vehiculo.fecha_primera_entrada = datetime.utcnow()
-
-        elif camara.direccion == "salida" or (camara.direccion == "ambos" and vehiculo.en_instalaciones):
-            # Es una salida
-            tipo_movimiento = TipoMovimiento.SALIDA
-            vehiculo.en_instalaciones = False
-            vehiculo.fecha_ultima_salida = datetime.utcnow()
-
-        elif zona_origen_id != zona_destino_id:
-            # Cambio de zona
-            tipo_movimiento = TipoMovimiento.CAMBIO_ZONA
-
-    # Actualizar zona y tiempo
-    vehiculo.zona_actual_id = zona_destino_id
-    vehiculo.fecha_ultimo_movimiento = datetime.utcnow()
+    vehiculo_nuevo = False
+    for _ in range(INTENTOS_ESTADO_VEHICULO):
+        if estado is None:
+            tipo_movimiento, en_instalaciones = _tipo_movimiento(camara, False, None)
+            vehiculo_id = _crear_vehiculo_detectado(
+                db, matricula_norm, camara, tipo_movimiento, en_instalaciones, ahora
+            )
+            if vehiculo_id is None:
+                # Creado a la vez por otra detección: seguir con su estado
+                estado = registro_vehiculos.cargar(db, matricula_norm)
+                continue
+            registro_vehiculos.guardar(matricula_norm, vehiculo_id, en_instalaciones, camara.zona_id)
+            mover_vehiculo(db, False, None, en_instalaciones, camara.zona_id)
+            zona_origen_id = None
+            vehiculo_nuevo = True
+            break
+
+        tipo_movimiento, en_instalaciones = _tipo_movimiento(camara, estado.en_instalaciones, estado.zona_actual_id)
+        if _actualizar_estado_vehiculo(db, matricula_norm, estado, tipo_movimiento, en_instalaciones,
+                                       camara.zona_id, ahora):
+            vehiculo_id, zona_origen_id = estado.id, estado.zona_actual_id
+            mover_vehiculo(db, estado.en_instalaciones, estado.zona_actual_id, en_instalaciones, camara.zona_id)
+            estado.en_instalaciones, estado.zona_actual_id = en_instalaciones, camara.zona_id
+            break
+
+        # El registro estaba desfasado: releer el estado y decidir de nuevo
+        estado = registro_vehiculos.cargar(db, matricula_norm)
+    else:
+        raise RuntimeError(f"El estado del vehículo {matricula_norm} cambia concurrentemente")
 
     # Registrar movimiento
     movimiento = Movimiento(
-        vehiculo_id=vehiculo.id,
+        vehiculo_id=vehiculo_id,
         tipo=tipo_movimiento,
         zona_origen_id=zona_origen_id,
-        zona_destino_id=zona_destino_id,
+        zona_destino_id=camara.zona_id,
         camara_id=camara.id,
         matricula_detectada=matricula_norm,
         confianza=confianza,
-        imagen_url=imagen_url
+        imagen_url=imagen_url,
+        evento_id=evento_id
     )
+    if fecha_hora is not None:
+        movimiento.fecha_hora = fecha_hora
     db.add(movimiento)
-    db.commit()
+
+    if confirmar:
+        db.commit()
+        if vehiculo_nuevo:
+            publicar_invalidacion(VEHICULOS, MOVIMIENTOS, ALERTAS)
+        else:
+            publicar_invalidacion(VEHICULOS, MOVIMIENTOS)
+    else:
+        db.flush()
+
+    registrar_deteccion(camara.codigo, tipo_movimiento.value)
 
     return {
         "accion": tipo_movimiento.value,
-        "vehiculo_id": vehiculo.id,
+        "vehiculo_id": vehiculo_id,
         "matricula": matricula_norm,
         "vehiculo_nuevo": vehiculo_nuevo,
-        "zona_destino": camara.zona.nombre if camara.zona else None
+        "zona_destino": camara.zona_nombre
     }
 
 
+def _aplicar_registros(registros: List[dict], db: Session) -> list:
+    resultados = []
+    for registro in registros:
+        codigo = registro["c"]
+        camara = camara_por_codigo(db, codigo)
+        if not camara:
+            resultados.append(f"Cámara {codigo} no encontrada")
+            continue
+        if not camara.activo:
+            resultados.append("Cámara desactivada")
+            continue
+
+        resultado = procesar_deteccion(
+            matricula=registro["m"],
+            camara=camara,
+            db=db,
+            confianza=registro.get("f"),
+            imagen_url=registro.get("i"),
+            fecha_hora=datetime.utcfromtimestamp(registro["t"]),
+            confirmar=False,
+            evento_id=registro.get("e")
+        )
+        resultados.append(resultado)
+    db.commit()
+    return resultados
+
+
+def aplicar_lote_detecciones(registros: List[dict]) -> list:
+    """
+    Aplicar un lote de detecciones en una transacción (cola de ingesta y listener TCP).
+    Registros: {"m": matrícula, "c": cámara, "t": epoch, "f": confianza, "i": imagen, "e": evento_id}.
+    Devuelve, en el mismo orden, el resultado de cada detección o el motivo del descarte (str).
+    Los errores de conexión se propagan para que el llamador reintente; si falla una
+    detección concreta se aplican de una en una y solo se descarta la que falla.
+    Un evento_id ya registrado devuelve el resultado original marcado como "duplicada".
+    """
+    db = SessionLocal()
+    try:
+        try:
+            resultados = _aplicar_registros(registros, db)
+        except OperationalError:
+            raise
+        except SQLAlchemyError:
+            db.rollback()
+            # Sin objetos del intento fallido: SQLite puede reutilizar sus ids
+            db.expunge_all()
+            resultados = []
+            for registro in registros:
+                try:
+                    resultados.extend(_aplicar_registros([registro], db))
+                except OperationalError:
+                    raise
+                except SQLAlchemyError:
+                    db.rollback()
+                    anterior = resultado_evento(registro["e"], db) if registro.get("e") else None
+                    if anterior is not None:
+                        resultados.append({**anterior, "duplicada": True})
+                    else:
+                        logger.exception("Detección de %s descartada al aplicarla", registro["m"])
+                        resultados.append("Error al aplicar la detección")
+    finally:
+        db.close()
+
+    nuevas = [
+        (registro, resultado) for registro, resultado in zip(registros, resultados)
+        if isinstance(resultado, dict) and not resultado.get("duplicada")
+    ]
+    if nuevas:
+        if any(resultado["vehiculo_nuevo"] for _, resultado in nuevas):
+            publicar_invalidacion(VEHICULOS, MOVIMIENTOS, ALERTAS)
+        else:
+            publicar_invalidacion(VEHICULOS, MOVIMIENTOS)
+    for registro, resultado in nuevas:
+        capturar_deteccion(resultado["matricula"], registro["c"], registro.get("f"), resultado)
+    return resultados
+
+
+def resultado_evento(evento_id: str, db: Session) -> Optional[dict]:
+    """Resultado de una detección ya registrada con este evento_id (para responder a reintentos)"""
+    fila = db.query(
+        Movimiento.tipo,
+        Movimiento.vehiculo_id,
+        Vehiculo.matricula,
+        Zona.nombre.label("zona_destino")
+    ).join(
+        Vehiculo, Vehiculo.id == Movimiento.vehiculo_id
+    ).outerjoin(
+        Zona, Zona.id == Movimiento.zona_destino_id
+    ).filter(Movimiento.evento_id == evento_id).first()
+
+    if not fila:
+        return None
+    return {
+        "accion": fila.tipo.value,
+        "vehiculo_id": fila.vehiculo_id,
+        "matricula": fila.matricula,
+        "vehiculo_nuevo": False,
+        "zona_destino": fila.zona_destino
+    }
+
+
+@medir_job("posible_entrega")
 def verificar_posible_entrega(vehiculo_id: int, db: Session):
     """
     Verifica si un vehículo debe marcarse como entregado.
@@ -181,20 +380,115 @@ def verificar_posible_entrega(vehiculo_id: int, db: Session):
                 )
                 db.add(alerta)
                 db.commit()
+                publicar_invalidacion(VEHICULOS, ALERTAS)
+
+
+def query_movimientos(db: Session) -> SQLQuery:
+    """
+    Consulta base de movimientos con matrícula, zonas, cámara y usuario
+    resueltos en un único JOIN (evita una consulta por fila).
+    """
+    zona_origen = aliased(Zona)
+    zona_destino = aliased(Zona)
+
+    return db.query(
+        Movimiento.id,
+        Movimiento.vehiculo_id,
+        Vehiculo.matricula,
+        Movimiento.tipo,
+        zona_origen.id.label("zona_origen_id"),
+        zona_origen.nombre.label("zona_origen_nombre"),
+        zona_destino.id.label("zona_destino_id"),
+        zona_destino.nombre.label("zona_destino_nombre"),
+        Camara.id.label("camara_id"),
+        Camara.codigo.label("camara_codigo"),
+        Movimiento.confianza,
+        Movimiento.fecha_hora,
+        Movimiento.manual,
+        Usuario.nombre.label("registrado_por"),
+        Movimiento.notas
+    ).outerjoin(
+        Vehiculo, Vehiculo.id == Movimiento.vehiculo_id
+    ).outerjoin(
+        zona_origen, zona_origen.id == Movimiento.zona_origen_id
+    ).outerjoin(
+        zona_destino, zona_destino.id == Movimiento.zona_destino_id
+    ).outerjoin(
+        Camara, Camara.id == Movimiento.camara_id
+    ).outerjoin(
+        Usuario, Usuario.id == Movimiento.registrado_por_id
+    )
+
+
+def movimiento_row_to_dict(row) -> dict:
+    """Convertir una fila de query_movimientos al diccionario de respuesta"""
+    zona_origen = None
+    if row.zona_origen_id is not None:
+        zona_origen = {"id": row.zona_origen_id, "nombre": row.zona_origen_nombre}
+
+    zona_destino = None
+    if row.zona_destino_id is not None:
+        zona_destino = {"id": row.zona_destino_id, "nombre": row.zona_destino_nombre}
+
+    camara_info = None
+    if row.camara_id is not None:
+        camara_info = {"id": row.camara_id, "codigo": row.camara_codigo}
+
+    return {
+        "id": row.id,
+        "vehiculo_id": row.vehiculo_id,
+        "matricula": row.matricula or "N/A",
+        "tipo": row.tipo.value,
+        "zona_origen": zona_origen,
+        "zona_destino": zona_destino,
+        "camara": camara_info,
+        "confianza": row.confianza,
+        "fecha_hora": row.fecha_hora,
+        "manual": row.manual,
+        "registrado_por": row.registrado_por,
+        "notas": row.notas
+    }
 
 
 # Endpoints
 @router.post("/lpr/detectar")
 async def registrar_deteccion_lpr(
     deteccion: DeteccionLPR,
+    response: Response,
     db: Session = Depends(get_db)
 ):
     """
     Endpoint para recibir detecciones de las cámaras LPR.
     Este endpoint será llamado por las cámaras/software LPR.
+    Con INGESTA_DIFERIDA la detección se guarda en la cola local y se responde 202;
+    la cámara se valida al aplicarla.
+    Si se envía evento_id, un reintento recibe la respuesta original sin reprocesarse.
     """
+    evento_id = deteccion.evento_id
+    if evento_id:
+        anterior = eventos_recientes.obtener(evento_id)
+        if anterior is not None:
+            if "secuencia" in anterior:
+                response.status_code = status.HTTP_202_ACCEPTED
+            return anterior
+
+    if settings.INGESTA_DIFERIDA:
+        secuencia = await encolar_deteccion({
+            "m": deteccion.matricula,
+            "c": deteccion.camara_codigo.upper(),
+            "f": deteccion.confianza,
+            "i": deteccion.imagen_url,
+            "e": evento_id
+        })
+        if secuencia is not None:
+            response.status_code = status.HTTP_202_ACCEPTED
+            respuesta = {"mensaje": "Detección encolada", "secuencia": secuencia}
+            if evento_id:
+                eventos_recientes.guardar(evento_id, respuesta)
+            return respuesta
+
     # Buscar cámara
-    camara = db.query(Camara).filter(Camara.codigo == deteccion.camara_codigo.upper()).first()
+    camara = camara_por_codigo(db, deteccion.camara_codigo.upper())
     if not camara:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -208,18 +502,31 @@ async def registrar_deteccion_lpr(
         )
 
     # Procesar detección
-    resultado = procesar_deteccion(
-        matricula=deteccion.matricula,
-        camara=camara,
-        db=db,
-        confianza=deteccion.confianza,
-        imagen_url=deteccion.imagen_url
-    )
-
-    return {
+    try:
+        resultado = procesar_deteccion(
+            matricula=deteccion.matricula,
+            camara=camara,
+            db=db,
+            confianza=deteccion.confianza,
+            imagen_url=deteccion.imagen_url,
+            evento_id=evento_id
+        )
+    except IntegrityError:
+        # Reintento que la caché no conocía (otro worker o tras un reinicio)
+        db.rollback()
+        resultado = resultado_evento(evento_id, db) if evento_id else None
+        if resultado is None:
+            raise
+    else:
+        capturar_deteccion(resultado["matricula"], camara.codigo, deteccion.confianza, resultado)
+
+    respuesta = {
         "mensaje": "Detección registrada",
         "resultado": resultado
     }
+    if evento_id:
+        eventos_recientes.guardar(evento_id, respuesta)
+    return respuesta
 
 
 @router.post("/manual")
@@ -229,7 +536,8 @@ async def registrar_movimiento_manual(
     db: Session = Depends(get_db)
 ):
     """Registrar un movimiento manualmente"""
-    vehiculo = db.query(Vehiculo).filter(Vehiculo.id == movimiento_data.vehiculo_id).first()
+    # Bloquear la fila: el estado anterior se usa para ajustar los contadores por zona
+    vehiculo = db.query(Vehiculo).filter(Vehiculo.id == movimiento_data.vehiculo_id).with_for_update().first()
     if not vehiculo:
         raise HTTPException(status_code=404, detail="Vehículo no encontrado")
 
@@ -244,6 +552,7 @@ async def registrar_movimiento_manual(
 
     zona_origen_id = vehiculo.zona_actual_id
     zona_destino_id = movimiento_data.zona_destino_id
+    en_instalaciones_antes = vehiculo.en_instalaciones
 
     # Actualizar vehículo según el tipo
     if tipo == TipoMovimiento.ENTRADA:
@@ -268,6 +577,7 @@ async def registrar_movimiento_manual(
         vehiculo.zona_actual_id = zona_destino_id
 
     vehiculo.fecha_ultimo_movimiento = datetime.utcnow()
+    mover_vehiculo(db, en_instalaciones_antes, zona_origen_id, vehiculo.en_instalaciones, vehiculo.zona_actual_id)
 
     # Crear registro
     movimiento = Movimiento(
@@ -282,6 +592,7 @@ async def registrar_movimiento_manual(
 
     db.add(movimiento)
     db.commit()
+    publicar_invalidacion(VEHICULOS, MOVIMIENTOS)
 
     return {
         "mensaje": "Movimiento registrado",
@@ -297,50 +608,15 @@ async def listar_movimientos_vehiculo(
     db: Session = Depends(get_db)
 ):
     """Obtener historial de movimientos de un vehículo"""
-    vehiculo = db.query(Vehiculo).filter(Vehiculo.id == vehiculo_id).first()
+    vehiculo = db.query(Vehiculo.id).filter(Vehiculo.id == vehiculo_id).first()
     if not vehiculo:
         raise HTTPException(status_code=404, detail="Vehículo no encontrado")
 
-    movimientos = db.query(Movimiento).filter(
+    filas = query_movimientos(db).filter(
         Movimiento.vehiculo_id == vehiculo_id
     ).order_by(desc(Movimiento.fecha_hora)).limit(limit).all()
 
-    result = []
-    for mov in movimientos:
-        zona_origen = None
-        if mov.zona_origen:
-            zona_origen = {"id": mov.zona_origen.id, "nombre": mov.zona_origen.nombre}
-
-        zona_destino = None
-        if mov.zona_destino:
-            zona_destino = {"id": mov.zona_destino.id, "nombre": mov.zona_destino.nombre}
-
-        camara_info = None
-        if mov.camara_id:
-            camara = db.query(Camara).filter(Camara.id == mov.camara_id).first()
-            if camara:
-                camara_info = {"id": camara.id, "codigo": camara.codigo}
-
-        registrado_por = None
-        if mov.registrado_por:
-            registrado_por = mov.registrado_por.nombre
-
-        result.append(MovimientoResponse(
-            id=mov.id,
-            vehiculo_id=mov.vehiculo_id,
-            matricula=vehiculo.matricula,
-            tipo=mov.tipo.value,
-            zona_origen=zona_origen,
-            zona_destino=zona_destino,
-            camara=camara_info,
-            confianza=mov.confianza,
-            fecha_hora=mov.fecha_hora,
-            manual=mov.manual,
-            registrado_por=registrado_por,
-            notas=mov.notas
-        ))
-
-    return result
+    return respuesta_lista(MovimientoResponse, [movimiento_row_to_dict(fila) for fila in filas])
 
 
 @router.get("/recientes", response_model=List[MovimientoResponse])
@@ -352,7 +628,7 @@ async def listar_movimientos_recientes(
     db: Session = Depends(get_db)
 ):
     """Listar movimientos más recientes"""
-    query = db.query(Movimiento)
+    query = query_movimientos(db)
 
     if tipo:
         query = query.filter(Movimiento.tipo == TipoMovimiento(tipo))
@@ -363,43 +639,6 @@ async def listar_movimientos_recientes(
             (Movimiento.zona_destino_id == zona_id)
         )
 
-    movimientos = query.order_by(desc(Movimiento.fecha_hora)).limit(limit).all()
-
-    result = []
-    for mov in movimientos:
-        vehiculo = db.query(Vehiculo).filter(Vehiculo.id == mov.vehiculo_id).first()
-
-        zona_origen = None
-        if mov.zona_origen:
-            zona_origen = {"id": mov.zona_origen.id, "nombre": mov.zona_origen.nombre}
-
-        zona_destino = None
-        if mov.zona_destino:
-            zona_destino = {"id": mov.zona_destino.id, "nombre": mov.zona_destino.nombre}
-
-        camara_info = None
-        if mov.camara_id:
-            camara = db.query(Camara).filter(Camara.id == mov.camara_id).first()
-            if camara:
-                camara_info = {"id": camara.id, "codigo": camara.codigo}
-
-        registrado_por = None
-        if mov.registrado_por:
-            registrado_por = mov.registrado_por.nombre
-
-        result.append(MovimientoResponse(
-            id=mov.id,
-            vehiculo_id=mov.vehiculo_id,
-            matricula=vehiculo.matricula if vehiculo else "N/A",
-            tipo=mov.tipo.value,
-            zona_origen=zona_origen,
-            zona_destino=zona_destino,
-            camara=camara_info,
-            confianza=mov.confianza,
-            fecha_hora=mov.fecha_hora,
-            manual=mov.manual,
-            registrado_por=registrado_por,
-            notas=mov.notas
-        ))
-
-    return result
+    filas = query.order_by(desc(Movimiento.fecha_hora)).limit(limit).all()
+
+    return respuesta_lista(MovimientoResponse, [movimiento_row_to_dict(fila) for fila in filas])
@@ -8,15 +8,25 @@ Endpoints de Gestión de Vehículos
 from typing import List, Optional, Dict, Any
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import or_, and_
-from pydantic import BaseModel
+from sqlalchemy import or_, and_, func, literal, select, text, update
+from pydantic import BaseModel, Field
 from datetime import datetime
+from collections import defaultdict
 
 from ..database import get_db
 from ..models.vehiculo import Vehiculo, CampoPersonalizado, ValorCampoPersonalizado
 from ..models.etiqueta import Etiqueta, VehiculoEtiqueta
 from ..models.zona import Zona
 from ..models.usuario import Usuario
+from ..services.campos_tipados import (
+    campos_por_id, campos_por_nombre, columna_filtro, columnas_valor, condicion_filtro
+)
+from ..services.contadores import ETIQUETA, sumar
+from ..services.estancias import registrar_estancias
+from ..services.invalidacion import publicar_invalidacion
+from ..services.serializacion import respuesta_lista
+from ..services.upsert import insertar_desde_consulta, insertar_o_actualizar, insertar_si_no_existe
+from ..services.versiones import VEHICULOS, ETIQUETAS
 from .auth import get_current_user
 
 router = APIRouter()
@@ -55,6 +65,17 @@ class EtiquetaAsignar(BaseModel):
     etiqueta_id: int
 
 
+class EtiquetaLote(BaseModel):
+    """Asignar o quitar una etiqueta a varios vehículos: por ids o por filtro"""
+    etiqueta_id: int
+    accion: str = "asignar"  # asignar, quitar
+    vehiculo_ids: Optional[List[int]] = Field(None, max_length=5000)
+    # Filtro (vehículos activos), si no se indican ids
+    zona_id: Optional[int] = None
+    en_instalaciones: Optional[bool] = None
+    con_etiqueta_id: Optional[int] = None  # vehículos que tienen ahora esta etiqueta
+
+
 class VehiculoResponse(BaseModel):
     id: int
     matricula: str
@@ -82,69 +103,177 @@ class VehiculoResponse(BaseModel):
 
 
 # Funciones auxiliares
-def vehiculo_to_response(vehiculo: Vehiculo, db: Session) -> VehiculoResponse:
-    """Convertir modelo a respuesta"""
-    # Obtener etiquetas activas
-    etiquetas_activas = db.query(VehiculoEtiqueta).filter(
-        VehiculoEtiqueta.vehiculo_id == vehiculo.id,
+def vehiculos_to_dicts(vehiculos: List[Vehiculo], db: Session) -> List[dict]:
+    """
+    Convertir vehículos a diccionarios de respuesta.
+    Etiquetas, campos personalizados y zonas se cargan en bloque
+    (una consulta por relación, no una por vehículo).
+    """
+    if not vehiculos:
+        return []
+
+    vehiculo_ids = [v.id for v in vehiculos]
+
+    # Etiquetas activas
+    etiquetas_por_vehiculo = defaultdict(list)
+    filas_etiquetas = db.query(
+        VehiculoEtiqueta.vehiculo_id,
+        Etiqueta.id,
+        Etiqueta.nombre,
+        Etiqueta.color,
+        VehiculoEtiqueta.fecha_asignacion
+    ).join(
+        Etiqueta, Etiqueta.id == VehiculoEtiqueta.etiqueta_id
+    ).filter(
+        VehiculoEtiqueta.vehiculo_id.in_(vehiculo_ids),
         VehiculoEtiqueta.activa == True
-    ).all()
-
-    etiquetas = []
-    for ve in etiquetas_activas:
-        etiqueta = db.query(Etiqueta).filter(Etiqueta.id == ve.etiqueta_id).first()
-        if etiqueta:
-            etiquetas.append({
-                "id": etiqueta.id,
-                "nombre": etiqueta.nombre,
-                "color": etiqueta.color,
-                "fecha_asignacion": ve.fecha_asignacion
-            })
+    ).order_by(VehiculoEtiqueta.id).all()
+
+    for fila in filas_etiquetas:
+        etiquetas_por_vehiculo[fila.vehiculo_id].append({
+            "id": fila.id,
+            "nombre": fila.nombre,
+            "color": fila.color,
+            "fecha_asignacion": fila.fecha_asignacion
+        })
+
+    # Campos personalizados
+    campos_por_vehiculo = defaultdict(dict)
+    filas_campos = db.query(
+        ValorCampoPersonalizado.vehiculo_id,
+        ValorCampoPersonalizado.valor,
+        CampoPersonalizado.nombre,
+        CampoPersonalizado.etiqueta,
+        CampoPersonalizado.tipo
+    ).join(
+        CampoPersonalizado, CampoPersonalizado.id == ValorCampoPersonalizado.campo_id
+    ).filter(
+        ValorCampoPersonalizado.vehiculo_id.in_(vehiculo_ids)
+    ).order_by(ValorCampoPersonalizado.id).all()
+
+    for fila in filas_campos:
+        campos_por_vehiculo[fila.vehiculo_id][fila.nombre] = {
+            "etiqueta": fila.etiqueta,
+            "valor": fila.valor,
+            "tipo": fila.tipo
+        }
 
-    # Obtener campos personalizados
-    campos = {}
-    for valor in vehiculo.campos_personalizados:
-        campo = db.query(CampoPersonalizado).filter(CampoPersonalizado.id == valor.campo_id).first()
-        if campo:
-            campos[campo.nombre] = {
-                "etiqueta": campo.etiqueta,
-                "valor": valor.valor,
-                "tipo": campo.tipo
-            }
-
-    # Zona actual
-    zona = None
-    if vehiculo.zona_actual:
-        zona = {
-            "id": vehiculo.zona_actual.id,
-            "nombre": vehiculo.zona_actual.nombre,
-            "codigo": vehiculo.zona_actual.codigo
+    # Zonas actuales
+    zona_ids = {v.zona_actual_id for v in vehiculos if v.zona_actual_id is not None}
+    zonas = {}
+    if zona_ids:
+        for zona in db.query(Zona.id, Zona.nombre, Zona.codigo).filter(Zona.id.in_(zona_ids)).all():
+            zonas[zona.id] = {"id": zona.id, "nombre": zona.nombre, "codigo": zona.codigo}
+
+    return [
+        {
+            "id": v.id,
+            "matricula": v.matricula,
+            "marca": v.marca,
+            "modelo": v.modelo,
+            "color": v.color,
+            "año": v.año,
+            "vin": v.vin,
+            "cliente_nombre": v.cliente_nombre,
+            "cliente_telefono": v.cliente_telefono,
+            "cliente_email": v.cliente_email,
+            "notas": v.notas,
+            "activo": v.activo,
+            "en_instalaciones": v.en_instalaciones,
+            "zona_actual": zonas.get(v.zona_actual_id),
+            "etiquetas": etiquetas_por_vehiculo[v.id],
+            "campos_personalizados": campos_por_vehiculo[v.id],
+            "fecha_primera_entrada": v.fecha_primera_entrada,
+            "fecha_ultima_entrada": v.fecha_ultima_entrada,
+            "fecha_ultimo_movimiento": v.fecha_ultimo_movimiento,
+            "fecha_creacion": v.fecha_creacion
         }
+        for v in vehiculos
+    ]
+
 
-    return VehiculoResponse(
-        id=vehiculo.id,
-        matricula=vehiculo.matricula,
-        marca=vehiculo.marca,
-        modelo=vehiculo.modelo,
-        color=vehiculo.color,
-        año=vehiculo.año,
-        vin=vehiculo.vin,
-        cliente_nombre=vehiculo.cliente_nombre,
-        cliente_telefono=vehiculo.cliente_telefono,
-        cliente_email=vehiculo.cliente_email,
-        notas=vehiculo.notas,
-        activo=vehiculo.activo,
-        en_instalaciones=vehiculo.en_instalaciones,
-        zona_actual=zona,
-        etiquetas=etiquetas,
-        campos_personalizados=campos,
-        fecha_primera_entrada=vehiculo.fecha_primera_entrada,
-        fecha_ultima_entrada=vehiculo.fecha_ultima_entrada,
-        fecha_ultimo_movimiento=vehiculo.fecha_ultimo_movimiento,
-        fecha_creacion=vehiculo.fecha_creacion
+def vehiculo_to_response(vehiculo: Vehiculo, db: Session) -> VehiculoResponse:
+    """Convertir modelo a respuesta"""
+    return VehiculoResponse(**vehiculos_to_dicts([vehiculo], db)[0])
+
+
+def valores_campos(db: Session, campos_personalizados: Dict[str, Any]) -> Dict[int, dict]:
+    """
+    Validar {campo_id: valor} y convertir cada valor a sus columnas (texto y tipada)
+    según el tipo del campo (catálogo de campos en memoria, sin consultas).
+    400 si el campo no existe o el valor no es de su tipo.
+    """
+    try:
+        valores = {int(campo_id): valor for campo_id, valor in campos_personalizados.items()}
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Los campos personalizados se indican por su id")
+
+    campos = campos_por_id(db, valores)
+    no_encontrados = set(valores) - set(campos)
+    if no_encontrados:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Campos personalizados no encontrados: {', '.join(map(str, sorted(no_encontrados)))}"
+        )
+    try:
+        return {campo_id: columnas_valor(campos[campo_id], valor) for campo_id, valor in valores.items()}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def guardar_valores_campos(db: Session, vehiculo_id: int, valores: Dict[int, dict]):
+    """Insertar o actualizar todos los valores del vehículo en una sola sentencia"""
+    insertar_o_actualizar(
+        db, ValorCampoPersonalizado,
+        [{"vehiculo_id": vehiculo_id, "campo_id": campo_id, **columnas} for campo_id, columnas in valores.items()],
+        ["vehiculo_id", "campo_id"],
+        actualizar={"fecha_actualizacion": func.now()}
     )
 
 
+def filtrar_por_campos(query, db: Session, filtros: List[str], orden: Optional[str]):
+    """
+    Filtros "nombre:operador:valor" y orden "nombre" / "-nombre" sobre campos personalizados.
+    Cada filtro es un IN (subconsulta) sobre el índice (campo_id, valor tipado).
+    """
+    partes_filtros = []
+    for filtro in filtros:
+        partes = filtro.split(":", 2)
+        if len(partes) != 3:
+            raise HTTPException(status_code=400, detail=f"Filtro '{filtro}' no válido: use nombre:operador:valor")
+        partes_filtros.append(partes)
+
+    nombre_orden = orden.lstrip("-") if orden else None
+    campos = campos_por_nombre(db, [p[0] for p in partes_filtros] + ([nombre_orden] if nombre_orden else []))
+
+    for nombre, operador, valor in partes_filtros:
+        campo = campos.get(nombre)
+        if campo is None:
+            raise HTTPException(status_code=400, detail=f"Campo personalizado '{nombre}' no encontrado")
+        try:
+            condicion = condicion_filtro(campo, operador, valor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        query = query.filter(Vehiculo.id.in_(
+            db.query(ValorCampoPersonalizado.vehiculo_id).filter(
+                ValorCampoPersonalizado.campo_id == campo.id, condicion
+            )
+        ))
+
+    if nombre_orden is None:
+        return query, None
+    campo = campos.get(nombre_orden)
+    if campo is None:
+        raise HTTPException(status_code=400, detail=f"Campo personalizado '{nombre_orden}' no encontrado")
+    # Los vehículos sin valor en el campo van al final en ambos sentidos
+    query = query.outerjoin(ValorCampoPersonalizado, and_(
+        ValorCampoPersonalizado.vehiculo_id == Vehiculo.id,
+        ValorCampoPersonalizado.campo_id == campo.id
+    ))
+    columna = columna_filtro(campo)
+    return query, (columna.desc() if orden.startswith("-") else columna.asc()).nulls_last()
+
+
 # Endpoints
 @router.get("/", response_model=List[VehiculoResponse])
 async def listar_vehiculos(
@@ -153,12 +282,19 @@ async def listar_vehiculos(
     activo: Optional[bool] = True,
     zona_id: Optional[int] = None,
     etiqueta_id: Optional[int] = None,
+    campo: Optional[List[str]] = Query(
+        None, description="Filtro por campo personalizado nombre:operador:valor (repetible), "
+                          "p. ej. presupuesto:mayor:1000 o fecha_estimada_entrega:entre:2026-10-01|2026-10-31"
+    ),
+    ordenar_campo: Optional[str] = Query(
+        None, description="Ordenar por un campo personalizado (nombre, o -nombre descendente)"
+    ),
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=200),
     current_user: Usuario = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Listar vehículos con filtros"""
+    """Listar vehículos con filtros (también por campos personalizados)"""
     query = db.query(Vehiculo)
 
     if activo is not None:
@@ -188,9 +324,16 @@ async def listar_vehiculos(
         ).subquery()
         query = query.filter(Vehiculo.id.in_(vehiculo_ids))
 
-    vehiculos = query.order_by(Vehiculo.fecha_ultimo_movimiento.desc()).offset(skip).limit(limit).all()
+    orden = []
+    if campo or ordenar_campo:
+        query, orden_campo = filtrar_por_campos(query, db, campo or [], ordenar_campo)
+        if orden_campo is not None:
+            orden.append(orden_campo)
+    orden.append(Vehiculo.fecha_ultimo_movimiento.desc())
 
-    return [vehiculo_to_response(v, db) for v in vehiculos]
+    vehiculos = query.order_by(*orden).offset(skip).limit(limit).all()
+
+    return respuesta_lista(VehiculoResponse, vehiculos_to_dicts(vehiculos, db))
 
 
 @router.get("/buscar/{matricula}", response_model=VehiculoResponse)
@@ -228,45 +371,36 @@ async def crear_vehiculo(
     db: Session = Depends(get_db)
 ):
     """Crear un nuevo vehículo"""
+    valores = valores_campos(db, vehiculo_data.campos_personalizados or {})
+
     # Normalizar matrícula
     matricula = vehiculo_data.matricula.upper().replace(" ", "").replace("-", "")
 
-    # Verificar si ya existe
-    existente = db.query(Vehiculo).filter(Vehiculo.matricula == matricula).first()
-    if existente:
+    # Alta atómica: si otra petición simultánea crea la misma matrícula, solo una gana
+    vehiculo_id = insertar_si_no_existe(db, Vehiculo, {
+        "matricula": matricula,
+        "marca": vehiculo_data.marca,
+        "modelo": vehiculo_data.modelo,
+        "color": vehiculo_data.color,
+        "año": vehiculo_data.año,
+        "vin": vehiculo_data.vin,
+        "cliente_nombre": vehiculo_data.cliente_nombre,
+        "cliente_telefono": vehiculo_data.cliente_telefono,
+        "cliente_email": vehiculo_data.cliente_email,
+        "notas": vehiculo_data.notas,
+    }, ["matricula"])
+    if vehiculo_id is None:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Ya existe un vehículo con esta matrícula"
         )
 
-    nuevo_vehiculo = Vehiculo(
-        matricula=matricula,
-        marca=vehiculo_data.marca,
-        modelo=vehiculo_data.modelo,
-        color=vehiculo_data.color,
-        año=vehiculo_data.año,
-        vin=vehiculo_data.vin,
-        cliente_nombre=vehiculo_data.cliente_nombre,
-        cliente_telefono=vehiculo_data.cliente_telefono,
-        cliente_email=vehiculo_data.cliente_email,
-        notas=vehiculo_data.notas
-    )
-
-    db.add(nuevo_vehiculo)
+    # Guardar campos personalizados (en la misma transacción)
+    guardar_valores_campos(db, vehiculo_id, valores)
     db.commit()
-    db.refresh(nuevo_vehiculo)
+    nuevo_vehiculo = db.query(Vehiculo).filter(Vehiculo.id == vehiculo_id).first()
 
-    # Guardar campos personalizados
-    if vehiculo_data.campos_personalizados:
-        for campo_id, valor in vehiculo_data.campos_personalizados.items():
-            nuevo_valor = ValorCampoPersonalizado(
-                vehiculo_id=nuevo_vehiculo.id,
-                campo_id=int(campo_id),
-                valor=str(valor)
-            )
-            db.add(nuevo_valor)
-        db.commit()
-        db.refresh(nuevo_vehiculo)
+    publicar_invalidacion(VEHICULOS)
 
     return vehiculo_to_response(nuevo_vehiculo, db)
 
@@ -307,29 +441,107 @@ async def actualizar_vehiculo(
 
     # Actualizar campos personalizados
     if vehiculo_data.campos_personalizados:
-        for campo_id, valor in vehiculo_data.campos_personalizados.items():
-            # Buscar si existe
-            valor_existente = db.query(ValorCampoPersonalizado).filter(
-                ValorCampoPersonalizado.vehiculo_id == vehiculo_id,
-                ValorCampoPersonalizado.campo_id == int(campo_id)
-            ).first()
-
-            if valor_existente:
-                valor_existente.valor = str(valor)
-            else:
-                nuevo_valor = ValorCampoPersonalizado(
-                    vehiculo_id=vehiculo_id,
-                    campo_id=int(campo_id),
-                    valor=str(valor)
-                )
-                db.add(nuevo_valor)
+        guardar_valores_campos(db, vehiculo_id, valores_campos(db, vehiculo_data.campos_personalizados))
 
     db.commit()
+    publicar_invalidacion(VEHICULOS)
     db.refresh(vehiculo)
 
     return vehiculo_to_response(vehiculo, db)
 
 
+@router.post("/etiquetas/lote")
+async def etiquetas_en_lote(
+    datos: EtiquetaLote,
+    current_user: Usuario = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Asignar o quitar una etiqueta a muchos vehículos en una transacción.
+    Los duplicados se descartan en la propia sentencia (NOT EXISTS al asignar,
+    solo asignaciones activas al quitar), sin consultar vehículo a vehículo.
+    """
+    if datos.accion not in ("asignar", "quitar"):
+        raise HTTPException(status_code=400, detail="Acción inválida. Opciones: asignar, quitar")
+
+    etiqueta = db.query(Etiqueta.id, Etiqueta.nombre).filter(Etiqueta.id == datos.etiqueta_id).first()
+    if not etiqueta:
+        raise HTTPException(status_code=404, detail="Etiqueta no encontrada")
+
+    no_encontrados = []
+    if datos.vehiculo_ids is not None:
+        pedidos = set(datos.vehiculo_ids)
+        existentes = {fila.id for fila in db.query(Vehiculo.id).filter(Vehiculo.id.in_(pedidos)).all()}
+        no_encontrados = sorted(pedidos - existentes)
+        seleccion = select(Vehiculo.id).where(Vehiculo.id.in_(existentes))
+        seleccionados = len(existentes)
+    else:
+        if datos.zona_id is None and datos.en_instalaciones is None and datos.con_etiqueta_id is None:
+            raise HTTPException(
+                status_code=400,
+                detail="Indique vehiculo_ids o al menos un filtro (zona_id, en_instalaciones, con_etiqueta_id)"
+            )
+        seleccion = select(Vehiculo.id).where(Vehiculo.activo == True)
+        if datos.zona_id is not None:
+            seleccion = seleccion.where(Vehiculo.zona_actual_id == datos.zona_id)
+        if datos.en_instalaciones is not None:
+            seleccion = seleccion.where(Vehiculo.en_instalaciones == datos.en_instalaciones)
+        if datos.con_etiqueta_id is not None:
+            seleccion = seleccion.where(Vehiculo.id.in_(
+                select(VehiculoEtiqueta.vehiculo_id).where(
+                    VehiculoEtiqueta.etiqueta_id == datos.con_etiqueta_id,
+                    VehiculoEtiqueta.activa == True
+                )
+            ))
+        seleccionados = db.execute(select(func.count()).select_from(seleccion.subquery())).scalar()
+
+    if datos.accion == "asignar":
+        ya_asignada = select(VehiculoEtiqueta.id).where(
+            VehiculoEtiqueta.vehiculo_id == Vehiculo.id,
+            VehiculoEtiqueta.etiqueta_id == etiqueta.id,
+            VehiculoEtiqueta.activa == True
+        ).exists()
+        # ON CONFLICT: una asignación individual simultánea no duplica la etiqueta activa
+        afectados = insertar_desde_consulta(
+            db, VehiculoEtiqueta,
+            ["vehiculo_id", "etiqueta_id", "activa", "asignado_por_id"],
+            select(Vehiculo.id, literal(etiqueta.id), literal(True), literal(current_user.id)).where(
+                Vehiculo.id.in_(seleccion), ~ya_asignada
+            ),
+            ["vehiculo_id", "etiqueta_id"], donde=text("activa")
+        )
+        sumar(db, ETIQUETA, etiqueta.id, afectados)
+    else:
+        ahora = datetime.utcnow()
+        quitadas = db.execute(
+            update(VehiculoEtiqueta)
+            .where(
+                VehiculoEtiqueta.etiqueta_id == etiqueta.id,
+                VehiculoEtiqueta.activa == True,
+                VehiculoEtiqueta.vehiculo_id.in_(seleccion)
+            )
+            .values(activa=False, fecha_remocion=ahora)
+            .returning(VehiculoEtiqueta.fecha_asignacion)
+            .execution_options(synchronize_session=False)
+        ).scalars().all()
+        afectados = len(quitadas)
+        sumar(db, ETIQUETA, etiqueta.id, -afectados)
+        registrar_estancias(db, [(etiqueta.id, asignada, ahora) for asignada in quitadas])
+    db.commit()
+
+    if afectados:
+        publicar_invalidacion(VEHICULOS, ETIQUETAS)
+
+    return {
+        "etiqueta": etiqueta.nombre,
+        "accion": datos.accion,
+        "seleccionados": seleccionados,
+        "modificados": afectados,
+        "sin_cambios": seleccionados - afectados,
+        "no_encontrados": no_encontrados
+    }
+
+
 @router.post("/{vehiculo_id}/etiquetas")
 async def asignar_etiqueta(
     vehiculo_id: int,
@@ -346,27 +558,23 @@ async def asignar_etiqueta(
     if not etiqueta:
         raise HTTPException(status_code=404, detail="Etiqueta no encontrada")
 
-    # Verificar si ya está asignada
-    existente = db.query(VehiculoEtiqueta).filter(
-        VehiculoEtiqueta.vehiculo_id == vehiculo_id,
-        VehiculoEtiqueta.etiqueta_id == etiqueta_data.etiqueta_id,
-        VehiculoEtiqueta.activa == True
-    ).first()
+    # Índice único parcial: si ya está asignada (también por otra petición simultánea) no se inserta
+    asignacion_id = insertar_si_no_existe(db, VehiculoEtiqueta, {
+        "vehiculo_id": vehiculo_id,
+        "etiqueta_id": etiqueta_data.etiqueta_id,
+        "activa": True,
+        "asignado_por_id": current_user.id
+    }, ["vehiculo_id", "etiqueta_id"], donde=text("activa"))
 
-    if existente:
+    if asignacion_id is None:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Esta etiqueta ya está asignada al vehículo"
         )
 
-    nueva_asignacion = VehiculoEtiqueta(
-        vehiculo_id=vehiculo_id,
-        etiqueta_id=etiqueta_data.etiqueta_id,
-        asignado_por_id=current_user.id
-    )
-
-    db.add(nueva_asignacion)
+    sumar(db, ETIQUETA, etiqueta.id, 1)
     db.commit()
+    publicar_invalidacion(VEHICULOS, ETIQUETAS)
 
     return {"mensaje": f"Etiqueta '{etiqueta.nombre}' asignada al vehículo {vehiculo.matricula}"}
 
@@ -390,7 +598,10 @@ async def quitar_etiqueta(
 
     asignacion.activa = False
     asignacion.fecha_remocion = datetime.utcnow()
+    sumar(db, ETIQUETA, etiqueta_id, -1)
+    registrar_estancias(db, [(etiqueta_id, asignacion.fecha_asignacion, asignacion.fecha_remocion)])
     db.commit()
+    publicar_invalidacion(VEHICULOS, ETIQUETAS)
 
     return {"mensaje": "Etiqueta removida correctamente"}
 
@@ -2,6 +2,7 @@
 Endpoints de Gestión de Zonas y Cámaras
 - CRUD de zonas (Campa, Taller, etc.)
 - CRUD de cámaras
+- Lecturas desde el catálogo de zonas y cámaras en memoria (services/catalogo_zonas.py)
 """
 from typing import List, Optional
 from fastapi import APIRouter, Depends, HTTPException, status
@@ -11,8 +12,11 @@ from datetime import datetime
 
 from ..database import get_db
 from ..models.zona import Zona, Camara
-from ..models.vehiculo import Vehiculo
 from ..models.usuario import Usuario
+from ..services import contadores
+from ..services.catalogo_zonas import CatalogoZonas, catalogo_zonas
+from ..services.invalidacion import publicar_invalidacion
+from ..services.versiones import ZONAS, VEHICULOS, verificar_etag
 from .auth import get_current_user, get_current_admin
 
 router = APIRouter()
@@ -111,8 +115,13 @@ class CamaraResponse(BaseModel):
         from_attributes = True
 
 
+def zona_respuesta(catalogo: CatalogoZonas, zona: dict, cantidad: int) -> dict:
+    """Zona del catálogo con su número de vehículos y sus cámaras"""
+    return {**zona, "cantidad_vehiculos": cantidad, "camaras": catalogo.camaras_por_zona.get(zona["id"], [])}
+
+
 # Endpoints de Zonas
-@router.get("/", response_model=List[ZonaResponse])
+@router.get("/", response_model=List[ZonaResponse], dependencies=[Depends(verificar_etag(ZONAS, VEHICULOS))])
 async def listar_zonas(
     activo: Optional[bool] = True,
     tipo: Optional[str] = None,
@@ -120,81 +129,34 @@ async def listar_zonas(
     db: Session = Depends(get_db)
 ):
     """Listar todas las zonas"""
-    query = db.query(Zona)
-
-    if activo is not None:
-        query = query.filter(Zona.activo == activo)
-
-    if tipo:
-        query = query.filter(Zona.tipo == tipo)
-
-    zonas = query.order_by(Zona.orden, Zona.nombre).all()
-
-    result = []
-    for zona in zonas:
-        # Contar vehículos en esta zona
-        cantidad = db.query(Vehiculo).filter(
-            Vehiculo.zona_actual_id == zona.id,
-            Vehiculo.en_instalaciones == True
-        ).count()
-
-        # Obtener cámaras
-        camaras = db.query(Camara).filter(Camara.zona_id == zona.id).all()
-        camaras_list = [{"id": c.id, "codigo": c.codigo, "tipo": c.tipo, "online": c.online} for c in camaras]
-
-        result.append(ZonaResponse(
-            id=zona.id,
-            nombre=zona.nombre,
-            codigo=zona.codigo,
-            descripcion=zona.descripcion,
-            tipo=zona.tipo,
-            pos_x=zona.pos_x,
-            pos_y=zona.pos_y,
-            ancho=zona.ancho,
-            alto=zona.alto,
-            color=zona.color,
-            activo=zona.activo,
-            cantidad_vehiculos=cantidad,
-            camaras=camaras_list
-        ))
-
-    return result
-
-
-@router.get("/{zona_id}", response_model=ZonaResponse)
+    catalogo = catalogo_zonas(db)
+    zonas = [
+        zona for zona in catalogo.zonas.values()
+        if (activo is None or zona["activo"] == activo) and (not tipo or zona["tipo"] == tipo)
+    ]
+    cantidades = contadores.leer(db, contadores.ZONA, [zona["id"] for zona in zonas])
+    return [zona_respuesta(catalogo, zona, cantidades.get(zona["id"], 0)) for zona in zonas]
+
+
+@router.get("/{zona_id}", response_model=ZonaResponse, dependencies=[Depends(verificar_etag(ZONAS, VEHICULOS))])
 async def obtener_zona(
     zona_id: int,
     current_user: Usuario = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Obtener una zona por ID"""
-    zona = db.query(Zona).filter(Zona.id == zona_id).first()
-    if not zona:
+    catalogo = catalogo_zonas(db)
+    zona = catalogo.zonas.get(zona_id)
+    # Puede haberla creado otro worker antes de llegar la invalidación: recargar el
+    # catálogo solo si la fila existe, no por cada id desconocido
+    if zona is None and db.query(Zona.id).filter(Zona.id == zona_id).first() is not None:
+        catalogo = catalogo_zonas(db, recargar=True)
+        zona = catalogo.zonas.get(zona_id)
+    if zona is None:
         raise HTTPException(status_code=404, detail="Zona no encontrada")
 
-    cantidad = db.query(Vehiculo).filter(
-        Vehiculo.zona_actual_id == zona.id,
-        Vehiculo.en_instalaciones == True
-    ).count()
-
-    camaras = db.query(Camara).filter(Camara.zona_id == zona.id).all()
-    camaras_list = [{"id": c.id, "codigo": c.codigo, "tipo": c.tipo, "online": c.online} for c in camaras]
-
-    return ZonaResponse(
-        id=zona.id,
-        nombre=zona.nombre,
-        codigo=zona.codigo,
-        descripcion=zona.descripcion,
-        tipo=zona.tipo,
-        pos_x=zona.pos_x,
-        pos_y=zona.pos_y,
-        ancho=zona.ancho,
-        alto=zona.alto,
-        color=zona.color,
-        activo=zona.activo,
-        cantidad_vehiculos=cantidad,
-        camaras=camaras_list
-    )
+    cantidad = contadores.leer(db, contadores.ZONA, [zona_id]).get(zona_id, 0)
+    return zona_respuesta(catalogo, zona, cantidad)
 
 
 @router.post("/", response_model=ZonaResponse, status_code=status.HTTP_201_CREATED)
@@ -225,6 +187,7 @@ async def crear_zona(
 
     db.add(nueva_zona)
     db.commit()
+    publicar_invalidacion(ZONAS)
     db.refresh(nueva_zona)
 
     return ZonaResponse(
@@ -276,31 +239,16 @@ async def actualizar_zona(
         zona.activo = zona_data.activo
 
     db.commit()
-    db.refresh(zona)
+    publicar_invalidacion(ZONAS)
 
-    cantidad = db.query(Vehiculo).filter(Vehiculo.zona_actual_id == zona.id).count()
-    camaras = db.query(Camara).filter(Camara.zona_id == zona.id).all()
-    camaras_list = [{"id": c.id, "codigo": c.codigo, "tipo": c.tipo, "online": c.online} for c in camaras]
-
-    return ZonaResponse(
-        id=zona.id,
-        nombre=zona.nombre,
-        codigo=zona.codigo,
-        descripcion=zona.descripcion,
-        tipo=zona.tipo,
-        pos_x=zona.pos_x,
-        pos_y=zona.pos_y,
-        ancho=zona.ancho,
-        alto=zona.alto,
-        color=zona.color,
-        activo=zona.activo,
-        cantidad_vehiculos=cantidad,
-        camaras=camaras_list
-    )
+    # La invalidación ya cambió la versión: el catálogo se recarga con la zona actualizada
+    catalogo = catalogo_zonas(db)
+    cantidad = contadores.leer(db, contadores.ZONA, [zona_id]).get(zona_id, 0)
+    return zona_respuesta(catalogo, catalogo.zonas[zona_id], cantidad)
 
 
 # Endpoints de Cámaras
-@router.get("/camaras/", response_model=List[CamaraResponse])
+@router.get("/camaras/", response_model=List[CamaraResponse], dependencies=[Depends(verificar_etag(ZONAS))])
 async def listar_camaras(
     activo: Optional[bool] = True,
     tipo: Optional[str] = None,
@@ -309,42 +257,12 @@ async def listar_camaras(
     db: Session = Depends(get_db)
 ):
     """Listar todas las cámaras"""
-    query = db.query(Camara)
-
-    if activo is not None:
-        query = query.filter(Camara.activo == activo)
-    if tipo:
-        query = query.filter(Camara.tipo == tipo)
-    if zona_id:
-        query = query.filter(Camara.zona_id == zona_id)
-
-    camaras = query.all()
-
-    result = []
-    for camara in camaras:
-        zona_nombre = None
-        if camara.zona:
-            zona_nombre = camara.zona.nombre
-
-        result.append(CamaraResponse(
-            id=camara.id,
-            nombre=camara.nombre,
-            codigo=camara.codigo,
-            tipo=camara.tipo,
-            zona_id=camara.zona_id,
-            zona_nombre=zona_nombre,
-            ip=camara.ip,
-            puerto=camara.puerto,
-            url_stream=camara.url_stream,
-            direccion=camara.direccion,
-            activo=camara.activo,
-            online=camara.online,
-            pos_x=camara.pos_x,
-            pos_y=camara.pos_y,
-            angulo=camara.angulo
-        ))
-
-    return result
+    return [
+        camara for camara in catalogo_zonas(db).camaras
+        if (activo is None or camara["activo"] == activo)
+        and (not tipo or camara["tipo"] == tipo)
+        and (not zona_id or camara["zona_id"] == zona_id)
+    ]
 
 
 @router.post("/camaras/", response_model=CamaraResponse, status_code=status.HTTP_201_CREATED)
@@ -377,6 +295,7 @@ async def crear_camara(
 
     db.add(nueva_camara)
     db.commit()
+    publicar_invalidacion(ZONAS)
     db.refresh(nueva_camara)
 
     return CamaraResponse(
@@ -434,6 +353,7 @@ async def actualizar_camara(
         camara.angulo = camara_data.angulo
 
     db.commit()
+    publicar_invalidacion(ZONAS)
     db.refresh(camara)
 
     zona_nombre = None
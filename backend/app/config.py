@@ -19,10 +19,57 @@ class Settings(BaseSettings):
     PORT: int = 8000
     DEBUG: bool = True
 
+    # Esquema al arrancar: "ninguno", "verificar" (avisar si faltan migraciones) o "migrar"
+    ESQUEMA_AL_ARRANCAR: str = "verificar"
+
     # Alertas
     ALERTA_INACTIVIDAD_DIAS: int = 20
     TIEMPO_ENTREGA_MINUTOS: int = 60  # 1 hora
 
+    # Ingesta LPR diferida: cola local en disco y aplicación en segundo plano
+    INGESTA_DIFERIDA: bool = False
+    COLA_INGESTA_DIR: str = "cola_ingesta"
+    COLA_INGESTA_LOTE: int = 200  # Detecciones por transacción
+    COLA_INGESTA_DRENAJE_SEGUNDOS: float = 10  # Tiempo máximo para vaciar la cola al apagar
+
+    # Listener TCP para cámaras LPR (conexiones persistentes, una detección por línea)
+    TCP_LPR_PUERTO: int = 0  # 0 = desactivado; ej: 9100
+    TCP_LPR_HOST: str = "0.0.0.0"
+    TCP_LPR_CLAVE: Optional[str] = None  # Si se define, primera línea "CLAVE <clave>"
+    TCP_LPR_LOTE: int = 100  # Líneas de una conexión aplicadas por transacción
+
+    # Sondeo de salud de cámaras (conexión TCP a ip:puerto; actualiza online/ultimo_ping)
+    SONDEO_CAMARAS_INTERVALO: float = 30  # Segundos entre sondeos; 0 = desactivado
+    SONDEO_CAMARAS_TIMEOUT: float = 3
+    SONDEO_CAMARAS_FALLOS: int = 2  # Sondeos fallidos seguidos para marcar offline
+    SONDEO_CAMARAS_CONCURRENCIA: int = 100
+
+    # Estado de vehículos en memoria para la ingesta LPR (id, en_instalaciones, zona)
+    REGISTRO_VEHICULOS_MAXIMO: int = 500_000  # ~20 MB por cada 100.000 matrículas
+    REGISTRO_VEHICULOS_PRECARGA: bool = True  # Cargar los vehículos activos al arrancar
+
+    # Contadores de vehículos por zona y etiqueta: reconciliación con las tablas
+    CONTADORES_RECONCILIAR_INTERVALO: float = 600  # Segundos; 0 = solo al arrancar
+
+    # Dashboard: etiquetas de "esperando piezas" (partes del nombre, separadas por comas)
+    ETIQUETAS_ESPERA_PIEZAS: str = "pieza,espera"
+
+    # Ids de evento LPR recordados en memoria para responder a reintentos sin ir a la BD
+    IDEMPOTENCIA_EVENTOS_RECIENTES: int = 10000
+
+    # Captura de detecciones LPR para reproducirlas con el simulador
+    CAPTURA_DETECCIONES_ARCHIVO: Optional[str] = None  # Ej: "capturas/detecciones.jsonl"
+
+    # Perfil de SQL por petición (solo para desarrollo / diagnóstico)
+    PERFIL_SQL: bool = False
+    PERFIL_SQL_MAX_CONSULTAS: int = 20  # Avisar si una petición supera estas consultas
+    PERFIL_SQL_MAX_MS: float = 200  # ... o este tiempo total en la BD
+    PERFIL_SQL_UMBRAL_REPETICIONES: int = 5  # Sentencia repetida N veces = posible N+1
+
+    # Compresión de respuestas
+    COMPRESION_MINIMO_BYTES: int = 1024  # No comprimir respuestas más pequeñas
+    COMPRESION_NIVEL_GZIP: int = 6
+
     class Config:
         env_file = ".env"
 
@@ -2,14 +2,69 @@
 SIGV - Sistema Inteligente de Gestión de Vehículos
 API Principal
 """
-from fastapi import FastAPI
+import logging
+import time
+
+_inicio_importacion = time.perf_counter()
+
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
 from .config import settings
-from .database import engine, Base
+from .database import engine
+from .services.metricas import MetricasMiddleware, exportar, instrumentar_pool
+from .services.perfil_sql import PerfilSQLMiddleware, instrumentar_engine
+from .services.arranque import InformeArranque, calentar, comprobar_esquema
+from .services.invalidacion import detener_bus, iniciar_bus
+from .services.cola_ingesta import detener_cola_ingesta, iniciar_cola_ingesta
+from .services.servidor_tcp import detener_servidor_tcp, iniciar_servidor_tcp
+from .services.registro_vehiculos import precargar_registro
+from .services.contadores import detener_reconciliacion, iniciar_reconciliacion
+from .services.salud_camaras import detener_sondeo_camaras, iniciar_sondeo_camaras
 from .api import auth, usuarios, vehiculos, etiquetas, zonas, movimientos, alertas, dashboard, campos_personalizados
 
-# Crear tablas en la base de datos
-Base.metadata.create_all(bind=engine)
+logger = logging.getLogger("sigv.arranque")
+
+# Importar este módulo no conecta con la base de datos: el esquema se gestiona
+# con migraciones (alembic upgrade head) y se comprueba en el lifespan
+informe_arranque = InformeArranque(_inicio_importacion)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Comprobación del esquema, calentamiento y bus de invalidación antes de aceptar peticiones"""
+    with informe_arranque.fase("esquema"):
+        comprobar_esquema(engine, settings.ESQUEMA_AL_ARRANCAR)
+    with informe_arranque.fase("calentamiento"):
+        calentar(
+            engine,
+            [vehiculos.VehiculoResponse, movimientos.MovimientoResponse, alertas.AlertaResponse],
+            app
+        )
+    with informe_arranque.fase("registro de vehículos"):
+        precargar_registro()
+    with informe_arranque.fase("bus de invalidación"):
+        iniciar_bus(engine)
+    with informe_arranque.fase("contadores"):
+        iniciar_reconciliacion()
+    with informe_arranque.fase("cola de ingesta"):
+        iniciar_cola_ingesta(movimientos.aplicar_lote_detecciones)
+    with informe_arranque.fase("listener TCP LPR"):
+        await iniciar_servidor_tcp(movimientos.aplicar_lote_detecciones)
+    with informe_arranque.fase("sondeo de cámaras"):
+        iniciar_sondeo_camaras(engine)
+    logger.info(informe_arranque.resumen())
+    yield
+    await detener_sondeo_camaras()
+    await detener_reconciliacion()
+    # Primero dejar de aceptar detecciones y después drenar la cola
+    await detener_servidor_tcp()
+    await detener_cola_ingesta()
+    detener_bus()
+
 
 # Crear aplicación FastAPI
 app = FastAPI(
@@ -17,7 +72,9 @@ app = FastAPI(
     description="Sistema Inteligente de Gestión de Vehículos - Centro de Automóvil Pedro Madroño",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
 )
 
 # Configurar CORS para permitir acceso desde el frontend
@@ -29,6 +86,31 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Comprimir respuestas grandes (mapa, listados, historiales).
+# Si brotli-asgi está instalado se usa brotli, con gzip como alternativa.
+try:
+    from brotli_asgi import BrotliMiddleware
+    app.add_middleware(
+        BrotliMiddleware,
+        minimum_size=settings.COMPRESION_MINIMO_BYTES,
+        gzip_fallback=True
+    )
+except ImportError:
+    app.add_middleware(
+        GZipMiddleware,
+        minimum_size=settings.COMPRESION_MINIMO_BYTES,
+        compresslevel=settings.COMPRESION_NIVEL_GZIP
+    )
+
+# Métricas Prometheus (latencia por ruta y estado del pool de conexiones)
+app.add_middleware(MetricasMiddleware)
+instrumentar_pool(engine)
+
+# Perfil de SQL por petición y detector de N+1 (opcional)
+if settings.PERFIL_SQL:
+    instrumentar_engine(engine)
+    app.add_middleware(PerfilSQLMiddleware)
+
 
 @app.get("/")
 async def root():
@@ -47,6 +129,13 @@ async def health_check():
     return {"status": "ok"}
 
 
+@app.get("/metrics", include_in_schema=False)
+async def metricas():
+    """Métricas en formato Prometheus"""
+    contenido, content_type = exportar()
+    return Response(content=contenido, media_type=content_type)
+
+
 # Registrar routers de la API
 app.include_router(auth.router, prefix="/api/auth", tags=["Autenticación"])
 app.include_router(usuarios.router, prefix="/api/usuarios", tags=["Usuarios"])
@@ -57,3 +146,5 @@ app.include_router(movimientos.router, prefix="/api/movimientos", tags=["Movimie
 app.include_router(alertas.router, prefix="/api/alertas", tags=["Alertas"])
 app.include_router(dashboard.router, prefix="/api/dashboard", tags=["Dashboard"])
 app.include_router(campos_personalizados.router, prefix="/api/campos", tags=["Campos Personalizados"])
+
+informe_arranque.fin_importacion()
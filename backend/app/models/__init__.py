@@ -1,6 +1,8 @@
 from .usuario import Usuario, Rol
 from .vehiculo import Vehiculo, CampoPersonalizado, ValorCampoPersonalizado
-from .etiqueta import Etiqueta, VehiculoEtiqueta
+from .etiqueta import Etiqueta, VehiculoEtiqueta, EstanciaEtiqueta
 from .zona import Zona, Camara
 from .movimiento import Movimiento, TipoMovimiento
 from .alerta import Alerta, TipoAlerta
+from .contador import ContadorVehiculos
+from .version import VersionRecurso
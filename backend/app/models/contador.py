@@ -0,0 +1,21 @@
+"""
+Contadores desnormalizados de vehículos
+- zona: vehículos en instalaciones cuya zona actual es la zona
+- etiqueta: asignaciones activas de la etiqueta
+Se mantienen en las rutas de escritura y se reconcilian periódicamente
+(services/contadores.py).
+"""
+from sqlalchemy import Column, Integer, String
+from ..database import Base
+
+
+class ContadorVehiculos(Base):
+    """Número de vehículos por zona o por etiqueta"""
+    __tablename__ = "contadores_vehiculos"
+
+    tipo = Column(String(20), primary_key=True)  # zona, etiqueta
+    entidad_id = Column(Integer, primary_key=True)  # Zona.id o Etiqueta.id
+    cantidad = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<ContadorVehiculos {self.tipo}={self.entidad_id}: {self.cantidad}>"
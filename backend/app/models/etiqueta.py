@@ -4,7 +4,7 @@ Sistema de Etiquetas de Proceso
 - Colores personalizables
 - Un vehículo puede tener múltiples etiquetas
 """
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Boolean, Date, DateTime, Float, ForeignKey, Index, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from ..database import Base
@@ -44,6 +44,15 @@ class VehiculoEtiqueta(Base):
     Guarda historial de cuándo se asignó cada etiqueta.
     """
     __tablename__ = "vehiculo_etiquetas"
+    __table_args__ = (
+        # Asignaciones activas por etiqueta (pocas frente a todo el historial)
+        Index("ix_vehiculo_etiquetas_activa", "activa", "etiqueta_id"),
+        # Una sola asignación activa de cada etiqueta por vehículo (el historial puede repetirse)
+        Index(
+            "uq_vehiculo_etiquetas_activa", "vehiculo_id", "etiqueta_id", unique=True,
+            postgresql_where=text("activa"), sqlite_where=text("activa")
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     vehiculo_id = Column(Integer, ForeignKey("vehiculos.id"), nullable=False)
@@ -62,3 +71,22 @@ class VehiculoEtiqueta(Base):
 
     def __repr__(self):
         return f"<VehiculoEtiqueta vehiculo={self.vehiculo_id} etiqueta={self.etiqueta_id}>"
+
+
+class EstanciaEtiqueta(Base):
+    """
+    Agregado de las estancias terminadas en cada etiqueta (asignación -> remoción):
+    número y suma de duraciones por etiqueta, día de remoción y tramo de duración.
+    Se actualiza al quitar etiquetas (services/estancias.py) para analizar los
+    tiempos por etapa sin recorrer el historial completo.
+    """
+    __tablename__ = "estancias_etiquetas"
+
+    etiqueta_id = Column(Integer, ForeignKey("etiquetas.id"), primary_key=True)
+    dia = Column(Date, primary_key=True)  # Día (UTC) en que se quitó la etiqueta
+    tramo = Column(Integer, primary_key=True)  # Índice en estancias.TRAMOS_HORAS
+    cantidad = Column(Integer, nullable=False, default=0)
+    segundos = Column(Float, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<EstanciaEtiqueta etiqueta={self.etiqueta_id} dia={self.dia} tramo={self.tramo}>"
@@ -40,6 +40,7 @@ class Movimiento(Base):
     matricula_detectada = Column(String(20))  # Lo que leyó la cámara
     confianza = Column(Float)  # % de confianza de la lectura (0-100)
     imagen_url = Column(String(500))  # Captura del momento
+    evento_id = Column(String(64), unique=True, index=True)  # Id de la cámara/pasarela para descartar reintentos
 
     # Tiempo
     fecha_hora = Column(DateTime(timezone=True), server_default=func.now(), index=True)
@@ -3,7 +3,7 @@ Modelo de Vehículos con campos personalizables
 - Campos base obligatorios (matrícula)
 - Campos personalizados dinámicos (añadir/quitar según necesidad)
 """
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Text, JSON
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Date, Float, ForeignKey, Text, JSON, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from ..database import Base
@@ -92,11 +92,26 @@ class ValorCampoPersonalizado(Base):
     Estructura EAV (Entity-Attribute-Value) para máxima flexibilidad.
     """
     __tablename__ = "valores_campos_personalizados"
+    __table_args__ = (
+        # Un valor por vehículo y campo (clave del upsert; también sirve para buscar por vehículo)
+        Index("uq_valores_vehiculo_campo", "vehiculo_id", "campo_id", unique=True),
+        Index("ix_valores_campo_numero", "campo_id", "valor_numero"),
+        Index("ix_valores_campo_fecha", "campo_id", "valor_fecha"),
+        Index("ix_valores_campo_booleano", "campo_id", "valor_booleano"),
+        Index("ix_valores_campo_opcion", "campo_id", "valor_opcion"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     vehiculo_id = Column(Integer, ForeignKey("vehiculos.id"), nullable=False)
     campo_id = Column(Integer, ForeignKey("campos_personalizados.id"), nullable=False)
-    valor = Column(Text)  # Guardamos todo como texto, convertimos según el tipo
+    valor = Column(Text)  # Texto tal como se introdujo
+
+    # Valor convertido según CampoPersonalizado.tipo (solo se rellena la columna de su tipo)
+    # para filtrar y ordenar con índices sin convertir el texto en cada consulta
+    valor_numero = Column(Float)
+    valor_fecha = Column(Date)
+    valor_booleano = Column(Boolean)
+    valor_opcion = Column(String(255))
 
     fecha_actualizacion = Column(DateTime(timezone=True), onupdate=func.now())
 
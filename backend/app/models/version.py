@@ -0,0 +1,18 @@
+"""
+Versiones compartidas de los recursos cacheados
+Las incrementa el hilo de envío de invalidaciones (services/invalidacion.py) y
+viajan en el NOTIFY; todos los workers calculan los ETag con ellas.
+"""
+from sqlalchemy import BigInteger, Column, String
+from ..database import Base
+
+
+class VersionRecurso(Base):
+    """Versión de un recurso (zonas, etiquetas, vehiculos...)"""
+    __tablename__ = "versiones_recursos"
+
+    recurso = Column(String(50), primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<VersionRecurso {self.recurso}: {self.version}>"
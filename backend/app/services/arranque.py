@@ -0,0 +1,130 @@
+"""
+Arranque de la aplicación
+- Importar app.main no toca la base de datos: el esquema se gestiona con migraciones
+  (Alembic) y se comprueba, opcionalmente, en el lifespan
+- Calentamiento del pool de conexiones, los adaptadores de serialización y el esquema OpenAPI
+- Informe de tiempos de arranque (importación y fases del lifespan)
+"""
+import logging
+import os
+import time
+from contextlib import contextmanager
+from typing import List, Type
+
+from pydantic import BaseModel
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import SQLAlchemyError
+
+from .serializacion import adaptador_lista
+
+logger = logging.getLogger("sigv.arranque")
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Revisión equivalente a lo que creaba Base.metadata.create_all antes de las migraciones
+REVISION_INICIAL = "0001"
+
+
+class InformeArranque:
+    """Duración de cada fase del arranque"""
+
+    def __init__(self, inicio: float):
+        self._inicio = inicio
+        self.fases: List[tuple] = []
+
+    def fin_importacion(self):
+        self.fases.append(("importación", time.perf_counter() - self._inicio))
+
+    @contextmanager
+    def fase(self, nombre: str):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.fases.append((nombre, time.perf_counter() - inicio))
+
+    def resumen(self) -> str:
+        partes = ", ".join(f"{nombre} {segundos * 1000:.0f} ms" for nombre, segundos in self.fases)
+        total = sum(segundos for _, segundos in self.fases)
+        return f"Arranque SIGV en {total * 1000:.0f} ms ({partes})"
+
+
+def configuracion_alembic():
+    """Config de Alembic apuntando a backend/alembic.ini (sin tocar la config de logging)"""
+    from alembic.config import Config
+
+    config = Config(os.path.join(BACKEND_DIR, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(BACKEND_DIR, "migrations"))
+    config.attributes["configurar_logging"] = False
+    return config
+
+
+def revisiones(engine: Engine) -> tuple:
+    """(revisión aplicada en la BD, última revisión disponible)"""
+    from alembic.runtime.migration import MigrationContext
+    from alembic.script import ScriptDirectory
+
+    with engine.connect() as conexion:
+        actual = MigrationContext.configure(conexion).get_current_revision()
+    ultima = ScriptDirectory.from_config(configuracion_alembic()).get_current_head()
+    return actual, ultima
+
+
+def aplicar_migraciones(engine: Engine):
+    """
+    Aplicar las migraciones pendientes.
+    Una BD creada con create_all (sin tabla alembic_version) se marca primero
+    con la revisión inicial para no intentar crear de nuevo las tablas.
+    """
+    from alembic import command
+
+    config = configuracion_alembic()
+    with engine.connect() as conexion:
+        sin_versionar = (
+            not inspect(conexion).has_table("alembic_version")
+            and inspect(conexion).has_table("vehiculos")
+        )
+    if sin_versionar:
+        command.stamp(config, REVISION_INICIAL)
+    command.upgrade(config, "head")
+
+
+def comprobar_esquema(engine: Engine, modo: str):
+    """
+    Comprobación del esquema al arrancar (ESQUEMA_AL_ARRANCAR):
+    - "ninguno": no hacer nada
+    - "verificar": avisar si faltan migraciones
+    - "migrar": aplicar las migraciones pendientes
+    Si la BD no está disponible se avisa y se arranca igualmente
+    (pool_pre_ping recupera las conexiones cuando vuelva).
+    """
+    if modo == "ninguno":
+        return
+    try:
+        if modo == "migrar":
+            aplicar_migraciones(engine)
+            return
+        actual, ultima = revisiones(engine)
+        if actual != ultima:
+            logger.warning(
+                "El esquema de la BD está en la revisión %s y la última es %s: ejecutar 'alembic upgrade head'",
+                actual, ultima
+            )
+    except SQLAlchemyError as e:
+        logger.warning("No se pudo comprobar el esquema de la BD: %s", e)
+
+
+def calentar(engine: Engine, modelos_lista: List[Type[BaseModel]], app=None):
+    """Abrir la primera conexión del pool y construir los adaptadores y el esquema OpenAPI"""
+    try:
+        with engine.connect() as conexion:
+            conexion.execute(text("SELECT 1"))
+    except SQLAlchemyError as e:
+        logger.warning("No se pudo abrir la conexión inicial con la BD: %s", e)
+
+    for modelo in modelos_lista:
+        adaptador_lista(modelo)
+
+    if app is not None:
+        app.openapi()
@@ -0,0 +1,258 @@
+"""
+Valores tipados de los campos personalizados
+- Además del texto (valor), cada valor se guarda en la columna de su tipo:
+  numero -> valor_numero, fecha -> valor_fecha, booleano -> valor_booleano,
+  seleccion -> valor_opcion; con índices (campo_id, valor tipado)
+- Filtros y orden por campo personalizado en el listado de vehículos sobre esas columnas
+- Catálogo en memoria de los campos definidos (por id y por nombre) para validar
+  sin consultas; se invalida con el bus al crear/modificar/eliminar campos
+"""
+import math
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from ..models.vehiculo import CampoPersonalizado, ValorCampoPersonalizado
+from .invalidacion import suscribir
+from .metricas import registrar_cache
+from .versiones import CAMPOS
+
+COLUMNAS_TIPADAS = {
+    "numero": "valor_numero",
+    "fecha": "valor_fecha",
+    "booleano": "valor_booleano",
+    "seleccion": "valor_opcion",
+}
+
+VERDADEROS = {"true", "1", "si", "sí", "s", "yes", "y", "on", "verdadero"}
+FALSOS = {"false", "0", "no", "n", "off", "falso"}
+
+# Operadores de filtro: nombre -> (tipos admitidos, número de valores)
+OPERADORES = {
+    "igual": (None, 1),
+    "distinto": (None, 1),
+    "mayor": ({"numero", "fecha"}, 1),
+    "menor": ({"numero", "fecha"}, 1),
+    "desde": ({"numero", "fecha"}, 1),
+    "hasta": ({"numero", "fecha"}, 1),
+    "entre": ({"numero", "fecha"}, 2),
+    "en": ({"seleccion", "texto", "numero"}, None),
+    "contiene": ({"texto"}, 1),
+}
+
+
+def convertir_valor(tipo: str, valor: Any) -> Any:
+    """Valor de la columna tipada para un campo de tipo `tipo`; ValueError si no es válido"""
+    if isinstance(valor, str):
+        valor = valor.strip()
+    if tipo == "numero":
+        if isinstance(valor, (int, float)) and not isinstance(valor, bool):
+            numero = float(valor)
+        else:
+            texto = str(valor).replace(" ", "").replace("€", "")
+            if "," in texto:
+                # Formato español: 1.234,56
+                texto = texto.replace(".", "").replace(",", ".")
+            try:
+                numero = float(texto)
+            except ValueError:
+                raise ValueError("no es un número")
+        # float() acepta "nan" e "inf", que no se pueden comparar ni ordenar
+        if not math.isfinite(numero):
+            raise ValueError("no es un número")
+        return numero
+    if tipo == "fecha":
+        if isinstance(valor, datetime):
+            return valor.date()
+        if isinstance(valor, date):
+            return valor
+        texto = str(valor)
+        try:
+            if "/" in texto:
+                return datetime.strptime(texto, "%d/%m/%Y").date()
+            return datetime.fromisoformat(texto.replace("Z", "+00:00")).date()
+        except ValueError:
+            raise ValueError("fecha no válida: use AAAA-MM-DD o DD/MM/AAAA")
+    if tipo == "booleano":
+        if isinstance(valor, bool):
+            return valor
+        texto = str(valor).lower()
+        if texto in VERDADEROS:
+            return True
+        if texto in FALSOS:
+            return False
+        raise ValueError("no es un valor sí/no")
+    if tipo == "seleccion":
+        return str(valor)[:255]
+    return None
+
+
+def columnas_tipadas(tipo: str, valor: Any) -> Dict[str, Any]:
+    """Todas las columnas tipadas (None salvo la del tipo) para un valor; ValueError si no es válido"""
+    columnas = dict.fromkeys(COLUMNAS_TIPADAS.values())
+    columna = COLUMNAS_TIPADAS.get(tipo)
+    if columna is not None and valor is not None and valor != "":
+        columnas[columna] = convertir_valor(tipo, valor)
+    return columnas
+
+
+def columnas_valor(campo: CampoPersonalizado, valor: Any, estricto: bool = True) -> Dict[str, Any]:
+    """
+    Columnas de ValorCampoPersonalizado (texto y tipadas) para un valor del campo.
+    estricto=False deja la columna tipada vacía si el texto no se puede convertir
+    (datos existentes o cambio de tipo) en lugar de lanzar ValueError.
+    """
+    try:
+        columnas = columnas_tipadas(campo.tipo, valor)
+        opcion = columnas["valor_opcion"]
+        if estricto and opcion is not None and campo.opciones and opcion not in campo.opciones:
+            raise ValueError(f"opciones: {', '.join(campo.opciones)}")
+    except ValueError as e:
+        if estricto:
+            raise ValueError(f"Valor no válido para '{campo.etiqueta}': {valor} ({e})")
+        columnas = dict.fromkeys(COLUMNAS_TIPADAS.values())
+    columnas["valor"] = None if valor is None else str(valor)
+    return columnas
+
+
+def recalcular_valores_campo(db: Session, campo: CampoPersonalizado, lote: int = 5000) -> int:
+    """Rellenar de nuevo las columnas tipadas de todos los valores de un campo (tras cambiar su tipo)"""
+    ultimo_id, total = 0, 0
+    while True:
+        filas = db.execute(
+            select(ValorCampoPersonalizado.id, ValorCampoPersonalizado.valor)
+            .where(ValorCampoPersonalizado.campo_id == campo.id, ValorCampoPersonalizado.id > ultimo_id)
+            .order_by(ValorCampoPersonalizado.id)
+            .limit(lote)
+        ).all()
+        if not filas:
+            return total
+        db.execute(update(ValorCampoPersonalizado), [
+            {"id": fila.id, **columnas_valor(campo, fila.valor, estricto=False)} for fila in filas
+        ])
+        ultimo_id, total = filas[-1].id, total + len(filas)
+
+
+def columna_filtro(campo: CampoPersonalizado):
+    """Columna sobre la que se filtra/ordena un campo (la tipada, o el texto)"""
+    return getattr(ValorCampoPersonalizado, COLUMNAS_TIPADAS.get(campo.tipo, "valor"))
+
+
+def condicion_filtro(campo: CampoPersonalizado, operador: str, texto: str):
+    """Condición SQL sobre ValorCampoPersonalizado para "operador:valor"; ValueError si no es válida"""
+    if operador not in OPERADORES:
+        raise ValueError(f"Operador '{operador}' no válido. Opciones: {', '.join(OPERADORES)}")
+    tipos, cantidad = OPERADORES[operador]
+    if tipos is not None and campo.tipo not in tipos:
+        raise ValueError(f"El operador '{operador}' no se puede usar con campos de tipo {campo.tipo}")
+
+    partes: List[str] = texto.split("|") if cantidad != 1 else [texto]
+    if cantidad is not None and len(partes) != cantidad:
+        raise ValueError(f"El operador '{operador}' requiere {cantidad} valores separados por '|'")
+
+    columna = columna_filtro(campo)
+    if campo.tipo in COLUMNAS_TIPADAS:
+        try:
+            valores = [convertir_valor(campo.tipo, parte) for parte in partes]
+        except ValueError:
+            raise ValueError(f"Valor no válido para '{campo.nombre}' ({campo.tipo}): {texto}")
+    else:
+        valores = partes
+
+    if operador == "igual":
+        return columna == valores[0]
+    if operador == "distinto":
+        return columna != valores[0]
+    if operador == "mayor":
+        return columna > valores[0]
+    if operador == "menor":
+        return columna < valores[0]
+    if operador == "desde":
+        return columna >= valores[0]
+    if operador == "hasta":
+        return columna <= valores[0]
+    if operador == "entre":
+        return columna.between(min(valores), max(valores))
+    if operador == "en":
+        return columna.in_(valores)
+    return columna.ilike(f"%{valores[0]}%")
+
+
+class CampoCacheado:
+    """Copia ligera de un CampoPersonalizado (sin sesión) para el catálogo en memoria"""
+    __slots__ = ("id", "nombre", "etiqueta", "tipo", "opciones", "activo")
+
+    def __init__(self, id, nombre, etiqueta, tipo, opciones, activo):
+        self.id = id
+        self.nombre = nombre
+        self.etiqueta = etiqueta
+        self.tipo = tipo
+        self.opciones = opciones
+        self.activo = activo
+
+
+class CatalogoCampos:
+    """
+    Campos personalizados definidos, cargados con una consulta y compartidos por las
+    peticiones del worker. Si se pide un campo que no está se recarga una vez (un
+    campo recién creado por otro proceso antes de recibir la invalidación).
+    """
+
+    def __init__(self):
+        # (por id, por nombre), o None si hay que cargarlo
+        self._indices: Optional[tuple] = None
+        self._generacion = 0
+
+    def _cargar(self, db: Session) -> tuple:
+        generacion = self._generacion
+        filas = db.query(
+            CampoPersonalizado.id, CampoPersonalizado.nombre, CampoPersonalizado.etiqueta,
+            CampoPersonalizado.tipo, CampoPersonalizado.opciones, CampoPersonalizado.activo
+        ).all()
+        por_id = {fila.id: CampoCacheado(*fila) for fila in filas}
+        indices = (por_id, {campo.nombre: campo for campo in por_id.values()})
+        # Si se invalidó mientras se leía, no guardar un catálogo que puede estar desfasado
+        if generacion == self._generacion:
+            self._indices = indices
+        return indices
+
+    def _buscar(self, db: Session, claves: Iterable, por_nombre: bool) -> Dict:
+        claves = set(claves)
+        if not claves:
+            return {}
+        indices = self._indices
+        acierto = indices is not None and claves <= indices[por_nombre].keys()
+        registrar_cache("campos", acierto)
+        if not acierto:
+            indices = self._cargar(db)
+        indice = indices[por_nombre]
+        return {clave: indice[clave] for clave in claves if clave in indice}
+
+    def por_id(self, db: Session, ids: Iterable[int]) -> Dict[int, CampoCacheado]:
+        return self._buscar(db, ids, por_nombre=False)
+
+    def por_nombre(self, db: Session, nombres: Iterable[str]) -> Dict[str, CampoCacheado]:
+        return self._buscar(db, nombres, por_nombre=True)
+
+    def invalidar(self):
+        self._generacion += 1
+        self._indices = None
+
+
+catalogo_campos = CatalogoCampos()
+
+
+@suscribir
+def _invalidar_catalogo(recursos):
+    if recursos is None or CAMPOS in recursos:
+        catalogo_campos.invalidar()
+
+
+def campos_por_nombre(db: Session, nombres) -> Dict[str, CampoCacheado]:
+    return catalogo_campos.por_nombre(db, nombres)
+
+
+def campos_por_id(db: Session, ids) -> Dict[int, CampoCacheado]:
+    return catalogo_campos.por_id(db, ids)
@@ -0,0 +1,42 @@
+"""
+Captura de detecciones LPR para reproducirlas después con el simulador
+- Si CAPTURA_DETECCIONES_ARCHIVO está definido, cada detección aceptada se
+  añade al archivo como una línea JSON compacta:
+  {"t": epoch, "m": matrícula, "c": cámara, "f": confianza, "a": acción, "z": zona}
+- "a" y "z" son el resultado obtenido, que el simulador usa para comprobar
+  que la reproducción deja los vehículos en el mismo estado
+"""
+import json
+import threading
+import time
+from typing import Optional
+
+from ..config import settings
+
+_lock = threading.Lock()
+_archivo = None
+
+
+def _abrir():
+    global _archivo
+    if _archivo is None:
+        _archivo = open(settings.CAPTURA_DETECCIONES_ARCHIVO, "a", encoding="utf-8", buffering=1)
+    return _archivo
+
+
+def capturar_deteccion(matricula: str, camara: str, confianza: Optional[float], resultado: dict):
+    """Añadir una detección aceptada al archivo de captura (no hace nada si está desactivado)"""
+    if not settings.CAPTURA_DETECCIONES_ARCHIVO:
+        return
+
+    linea = json.dumps({
+        "t": round(time.time(), 3),
+        "m": matricula,
+        "c": camara,
+        "f": confianza,
+        "a": resultado["accion"],
+        "z": resultado["zona_destino"]
+    }, ensure_ascii=False, separators=(",", ":"))
+
+    with _lock:
+        _abrir().write(linea + "\n")
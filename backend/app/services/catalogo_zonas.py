@@ -0,0 +1,92 @@
+"""
+Zonas y cámaras en memoria (datos de referencia que casi no cambian)
+- Se cargan con dos consultas (zonas y cámaras) y se sirven desde una
+  CacheVersionada mientras no cambie la versión de ZONAS (altas y cambios de
+  zonas y cámaras, cambios de estado online del sondeo de cámaras)
+- Las detecciones resuelven su cámara (y el nombre de su zona) por código desde
+  aquí, sin consultas por detección
+- El número de vehículos por zona no se guarda aquí: se lee de los contadores
+- Los diccionarios son compartidos entre peticiones: no modificarlos
+"""
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from ..models.zona import Zona, Camara
+from .versiones import ZONAS, CacheVersionada
+
+
+class CamaraCacheada:
+    """Copia ligera de una Camara (sin sesión) con lo que necesita procesar una detección"""
+    __slots__ = ("id", "codigo", "tipo", "direccion", "zona_id", "zona_nombre", "activo")
+
+    def __init__(self, id, codigo, tipo, direccion, zona_id, zona_nombre, activo):
+        self.id = id
+        self.codigo = codigo
+        self.tipo = tipo
+        self.direccion = direccion
+        self.zona_id = zona_id
+        self.zona_nombre = zona_nombre
+        self.activo = activo
+
+
+class CatalogoZonas:
+    """Zonas (en orden de presentación) y cámaras, con las cámaras de cada zona y por código"""
+    __slots__ = ("zonas", "camaras", "camaras_por_zona", "camaras_por_codigo")
+
+    def __init__(self, zonas: Dict[int, dict], camaras: List[dict], camaras_por_zona: Dict[int, List[dict]],
+                 camaras_por_codigo: Dict[str, CamaraCacheada]):
+        self.zonas = zonas
+        self.camaras = camaras
+        self.camaras_por_zona = camaras_por_zona
+        self.camaras_por_codigo = camaras_por_codigo
+
+
+def _cargar(db: Session) -> CatalogoZonas:
+    zonas = {
+        fila.id: dict(fila._mapping)
+        for fila in db.query(
+            Zona.id, Zona.nombre, Zona.codigo, Zona.descripcion, Zona.tipo, Zona.pos_x, Zona.pos_y,
+            Zona.ancho, Zona.alto, Zona.color, Zona.activo
+        ).order_by(Zona.orden, Zona.nombre)
+    }
+    camaras = []
+    camaras_por_zona = defaultdict(list)
+    camaras_por_codigo = {}
+    for fila in db.query(
+        Camara.id, Camara.nombre, Camara.codigo, Camara.tipo, Camara.zona_id, Camara.ip, Camara.puerto,
+        Camara.url_stream, Camara.direccion, Camara.activo, Camara.online, Camara.pos_x, Camara.pos_y,
+        Camara.angulo
+    ).order_by(Camara.id):
+        zona = zonas.get(fila.zona_id)
+        zona_nombre = zona["nombre"] if zona else None
+        camaras.append({**fila._mapping, "zona_nombre": zona_nombre})
+        camaras_por_zona[fila.zona_id].append(
+            {"id": fila.id, "codigo": fila.codigo, "tipo": fila.tipo, "online": fila.online}
+        )
+        camaras_por_codigo[fila.codigo] = CamaraCacheada(
+            fila.id, fila.codigo, fila.tipo, fila.direccion, fila.zona_id, zona_nombre, fila.activo
+        )
+    return CatalogoZonas(zonas, camaras, dict(camaras_por_zona), camaras_por_codigo)
+
+
+_cache = CacheVersionada("zonas", (ZONAS,), _cargar)
+
+
+def catalogo_zonas(db: Session, recargar: bool = False) -> CatalogoZonas:
+    return _cache.obtener(db, recargar)
+
+
+def camara_por_codigo(db: Session, codigo: str) -> Optional[CamaraCacheada]:
+    """
+    Cámara por código desde el catálogo. Si no está (alta en otro worker antes de
+    llegar la invalidación, o código desconocido) se busca solo esa fila.
+    """
+    camara = catalogo_zonas(db).camaras_por_codigo.get(codigo)
+    if camara is not None:
+        return camara
+    fila = db.query(
+        Camara.id, Camara.codigo, Camara.tipo, Camara.direccion, Camara.zona_id, Zona.nombre, Camara.activo
+    ).outerjoin(Zona, Zona.id == Camara.zona_id).filter(Camara.codigo == codigo).first()
+    return CamaraCacheada(*fila) if fila else None
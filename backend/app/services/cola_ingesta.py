@@ -0,0 +1,354 @@
+"""
+Cola local persistente para la ingesta LPR (INGESTA_DIFERIDA=True)
+- /lpr/detectar añade la detección a un log en disco (append + fsync) y responde
+  202 sin esperar a la base de datos
+- Un consumidor en segundo plano aplica las detecciones en lotes y en orden
+- Al arrancar se reaplica lo que quedó pendiente; al apagar se drena la cola
+  durante COLA_INGESTA_DRENAJE_SEGUNDOS y el resto queda en disco
+
+Formato en disco (un directorio "ranura" por worker, reclamado con un lock de archivo
+para que tras un reinicio cada worker recoja lo pendiente de una ranura):
+    <COLA_INGESTA_DIR>/ranura-N/<primera secuencia>.log   líneas JSON {"s": secuencia, "t": epoch, ...}
+    <COLA_INGESTA_DIR>/ranura-N/aplicado                  última secuencia aplicada en la BD
+    <COLA_INGESTA_DIR>/ranura-N/id                        identificador de la ranura
+
+La entrega es "al menos una vez": si el proceso muere entre el commit y la escritura
+de "aplicado", ese lote se vuelve a aplicar al arrancar. Es idempotente porque toda
+detección encolada lleva evento_id: la del cliente o "q<id de ranura>-<secuencia>",
+y un evento ya registrado no crea otro movimiento.
+
+Al arrancar, cada worker se queda también con lo pendiente de las ranuras que no usa
+ningún worker (p. ej. si se reduce el número de workers).
+"""
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from typing import Callable, List, Optional
+
+from prometheus_client import Gauge, Histogram
+
+from ..config import settings
+
+logger = logging.getLogger("sigv.cola_ingesta")
+
+TAMANO_SEGMENTO = 16 * 1024 * 1024
+
+cola_profundidad = Gauge(
+    "sigv_ingesta_cola_profundidad",
+    "Detecciones aceptadas pendientes de aplicar en la BD",
+    multiprocess_mode="livesum"
+)
+
+cola_retraso = Gauge(
+    "sigv_ingesta_cola_retraso_segundos",
+    "Antigüedad de la detección pendiente más antigua",
+    multiprocess_mode="livemax"
+)
+
+aplicacion_retraso = Histogram(
+    "sigv_ingesta_retraso_aplicacion_seconds",
+    "Tiempo desde que se acepta una detección hasta que se aplica en la BD",
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+)
+
+
+def _bloquear(archivo) -> bool:
+    """Lock exclusivo no bloqueante sobre un archivo abierto (Linux y Windows)"""
+    try:
+        import fcntl
+        fcntl.flock(archivo.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return True
+    except ImportError:
+        import msvcrt
+        try:
+            msvcrt.locking(archivo.fileno(), msvcrt.LK_NBLCK, 1)
+            return True
+        except OSError:
+            return False
+    except OSError:
+        return False
+
+
+def _escribir_atomico(ruta: str, contenido: str):
+    temporal = ruta + ".tmp"
+    with open(temporal, "w", encoding="utf-8") as f:
+        f.write(contenido)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporal, ruta)
+
+
+def _identificador(directorio: str) -> str:
+    """Identificador de la ranura (se crea la primera vez; uno nuevo si se borra el directorio)"""
+    ruta = os.path.join(directorio, "id")
+    if os.path.exists(ruta):
+        with open(ruta, encoding="utf-8") as f:
+            identificador = f.read().strip()
+        if identificador:
+            return identificador
+    identificador = uuid.uuid4().hex[:12]
+    _escribir_atomico(ruta, identificador)
+    return identificador
+
+
+def _con_evento(registro: dict, identificador: str) -> dict:
+    """Registro con evento_id: el suyo o uno determinista por ranura y secuencia"""
+    if registro.get("e"):
+        return registro
+    return {**registro, "e": f"q{identificador}-{registro['s']}"}
+
+
+class ColaIngesta:
+    """Log de detecciones en disco con secuencia, checkpoint y segmentos rotados"""
+
+    def __init__(self, directorio: str):
+        self.directorio_base = directorio
+        self.directorio = None
+        self._lock = threading.Lock()
+        self._lock_ranura = None
+        self._segmento = None
+        self._pendientes: deque = deque()
+        self._siguiente = 1
+        self.aplicado = 0
+        self.identificador = None
+
+    # --- Apertura y recuperación ---
+    def abrir(self):
+        os.makedirs(self.directorio_base, exist_ok=True)
+        n = 0
+        while True:
+            directorio = os.path.join(self.directorio_base, f"ranura-{n}")
+            os.makedirs(directorio, exist_ok=True)
+            archivo_lock = open(os.path.join(directorio, "lock"), "a+")
+            if _bloquear(archivo_lock):
+                self.directorio, self._lock_ranura = directorio, archivo_lock
+                break
+            archivo_lock.close()
+            n += 1
+
+        self.identificador = _identificador(self.directorio)
+        self.aplicado, ultima, pendientes = self._leer_ranura(self.directorio)
+        self._pendientes.extend(_con_evento(registro, self.identificador) for registro in pendientes)
+        self._siguiente = ultima + 1
+        self._nuevo_segmento()
+        self._adoptar_ranuras_libres()
+        self._actualizar_metricas()
+
+        if self._pendientes:
+            logger.warning("Cola de ingesta %s: %d detecciones pendientes de reaplicar",
+                           self.directorio, len(self._pendientes))
+
+    @classmethod
+    def _leer_ranura(cls, directorio: str) -> tuple:
+        """(última aplicada, última secuencia escrita, registros pendientes) de una ranura"""
+        aplicado = 0
+        ruta_aplicado = os.path.join(directorio, "aplicado")
+        if os.path.exists(ruta_aplicado):
+            with open(ruta_aplicado, encoding="utf-8") as f:
+                aplicado = int(f.read().strip() or 0)
+
+        ultima = aplicado
+        pendientes = []
+        for segmento in cls._segmentos_de(directorio):
+            for registro in cls._leer_segmento(segmento):
+                ultima = max(ultima, registro["s"])
+                if registro["s"] > aplicado:
+                    pendientes.append(registro)
+        return aplicado, ultima, pendientes
+
+    def _adoptar_ranuras_libres(self):
+        """
+        Pasar a esta ranura lo pendiente de las ranuras sin worker. Conservan su
+        evento_id: si se cae antes de vaciar la ranura libre, repetirlas no duplica.
+        """
+        for nombre in sorted(os.listdir(self.directorio_base)):
+            directorio = os.path.join(self.directorio_base, nombre)
+            if not nombre.startswith("ranura-") or directorio == self.directorio or not os.path.isdir(directorio):
+                continue
+            with open(os.path.join(directorio, "lock"), "a+") as archivo_lock:
+                if not _bloquear(archivo_lock):
+                    continue  # La usa otro worker
+                _, ultima, pendientes = self._leer_ranura(directorio)
+                if pendientes:
+                    identificador = _identificador(directorio)
+                    self.anadir([_con_evento(registro, identificador) for registro in pendientes])
+                    logger.warning("Cola de ingesta %s: %d detecciones pendientes recogidas de %s",
+                                   self.directorio, len(pendientes), directorio)
+                _escribir_atomico(os.path.join(directorio, "aplicado"), str(ultima))
+                for segmento in self._segmentos_de(directorio):
+                    os.remove(segmento)
+
+    def _segmentos(self) -> List[str]:
+        return self._segmentos_de(self.directorio)
+
+    @staticmethod
+    def _segmentos_de(directorio: str) -> List[str]:
+        return sorted(
+            os.path.join(directorio, nombre)
+            for nombre in os.listdir(directorio) if nombre.endswith(".log")
+        )
+
+    @staticmethod
+    def _leer_segmento(ruta: str):
+        with open(ruta, encoding="utf-8") as f:
+            for linea in f:
+                try:
+                    yield json.loads(linea)
+                except ValueError:
+                    # Última línea a medio escribir (caída durante el append): se descarta
+                    logger.warning("Registro incompleto descartado en %s", ruta)
+
+    def _nuevo_segmento(self):
+        if self._segmento is not None:
+            self._segmento.close()
+        ruta = os.path.join(self.directorio, f"{self._siguiente:016d}.log")
+        self._segmento = open(ruta, "a", encoding="utf-8")
+
+    # --- Escritura ---
+    def anadir(self, registros: List[dict]) -> List[int]:
+        """
+        Añadir detecciones y forzarlas a disco con un único fsync; devuelve sus secuencias.
+        Las que no traen evento_id reciben uno de esta ranura; las que traen "t" lo conservan.
+        """
+        instante = round(time.time(), 3)
+        with self._lock:
+            nuevos = []
+            for registro in registros:
+                nuevos.append(_con_evento(
+                    {**registro, "s": self._siguiente, "t": registro.get("t", instante)}, self.identificador
+                ))
+                self._siguiente += 1
+            self._segmento.write("".join(
+                json.dumps(r, ensure_ascii=False, separators=(",", ":")) + "\n" for r in nuevos
+            ))
+            self._segmento.flush()
+            os.fsync(self._segmento.fileno())
+            self._pendientes.extend(nuevos)
+            if self._segmento.tell() > TAMANO_SEGMENTO:
+                self._nuevo_segmento()
+        cola_profundidad.inc(len(nuevos))
+        return [r["s"] for r in nuevos]
+
+    # --- Consumo ---
+    def lote(self, maximo: int) -> List[dict]:
+        """Primeras detecciones pendientes, en orden (sin retirarlas)"""
+        with self._lock:
+            return [self._pendientes[i] for i in range(min(maximo, len(self._pendientes)))]
+
+    def confirmar(self, hasta: int):
+        """Marcar como aplicadas las detecciones hasta la secuencia `hasta`"""
+        ahora = time.time()
+        with self._lock:
+            while self._pendientes and self._pendientes[0]["s"] <= hasta:
+                aplicacion_retraso.observe(ahora - self._pendientes.popleft()["t"])
+            self.aplicado = hasta
+            _escribir_atomico(os.path.join(self.directorio, "aplicado"), str(hasta))
+
+            # Borrar los segmentos cerrados completamente aplicados
+            segmentos = self._segmentos()
+            for segmento, siguiente in zip(segmentos, segmentos[1:]):
+                if int(os.path.basename(siguiente)[:-4]) - 1 <= hasta:
+                    os.remove(segmento)
+        self._actualizar_metricas()
+
+    @property
+    def profundidad(self) -> int:
+        return len(self._pendientes)
+
+    def _actualizar_metricas(self):
+        cola_profundidad.set(len(self._pendientes))
+        cola_retraso.set(time.time() - self._pendientes[0]["t"] if self._pendientes else 0)
+
+    def cerrar(self):
+        with self._lock:
+            if self._segmento is not None:
+                self._segmento.close()
+            if self._lock_ranura is not None:
+                self._lock_ranura.close()
+
+
+# --- Consumidor (un único consumidor por worker: mantiene el orden) ---
+_estado = {"cola": None, "tarea": None, "aviso": None, "parar": False}
+
+
+async def _consumir(cola: ColaIngesta, aplicar: Callable[[List[dict]], list]):
+    """Aplicar lotes en orden; si la BD falla se reintenta el mismo lote con espera creciente"""
+    espera = 0.5
+    while True:
+        registros = cola.lote(settings.COLA_INGESTA_LOTE)
+        if not registros:
+            if _estado["parar"]:
+                return
+            _estado["aviso"].clear()
+            try:
+                await asyncio.wait_for(_estado["aviso"].wait(), timeout=1.0)
+            except asyncio.TimeoutError:
+                pass
+            continue
+
+        try:
+            resultados = await asyncio.to_thread(aplicar, registros)
+        except Exception as e:
+            logger.warning("No se pudo aplicar un lote de %d detecciones (%s); reintento en %.1f s",
+                           len(registros), e, espera)
+            cola._actualizar_metricas()
+            await asyncio.sleep(espera)
+            espera = min(espera * 2, 30)
+            continue
+
+        espera = 0.5
+        descartadas = [r for r in resultados if isinstance(r, str)]
+        if descartadas:
+            logger.warning("%d detecciones descartadas al aplicarlas (%s)", len(descartadas), descartadas[0])
+        await asyncio.to_thread(cola.confirmar, registros[-1]["s"])
+
+
+def iniciar_cola_ingesta(aplicar: Callable[[List[dict]], list]):
+    """Abrir la cola, reaplicar lo pendiente y arrancar el consumidor (en el lifespan)"""
+    if not settings.INGESTA_DIFERIDA or _estado["cola"] is not None:
+        return
+    cola = ColaIngesta(settings.COLA_INGESTA_DIR)
+    cola.abrir()
+    _estado.update(cola=cola, aviso=asyncio.Event(), parar=False)
+    _estado["tarea"] = asyncio.create_task(_consumir(cola, aplicar))
+
+
+async def detener_cola_ingesta():
+    """Drenar la cola durante el tiempo configurado; lo que quede se reaplicará al arrancar"""
+    cola, tarea = _estado["cola"], _estado["tarea"]
+    if cola is None:
+        return
+    _estado["parar"] = True
+    _estado["aviso"].set()
+    try:
+        await asyncio.wait_for(tarea, timeout=settings.COLA_INGESTA_DRENAJE_SEGUNDOS)
+    except asyncio.TimeoutError:
+        tarea.cancel()
+        logger.warning("Cola de ingesta sin drenar: %d detecciones quedan en disco", cola.profundidad)
+    cola.cerrar()
+    _estado.update(cola=None, tarea=None, aviso=None, parar=False)
+
+
+def cola_activa() -> bool:
+    return _estado["cola"] is not None
+
+
+async def encolar_detecciones(registros: List[dict]) -> Optional[List[int]]:
+    """Persistir detecciones en la cola (un fsync por llamada); None si la cola no está activa"""
+    cola = _estado["cola"]
+    if cola is None:
+        return None
+    secuencias = await asyncio.to_thread(cola.anadir, registros)
+    _estado["aviso"].set()
+    return secuencias
+
+
+async def encolar_deteccion(registro: dict) -> Optional[int]:
+    """Persistir una detección en la cola; None si la cola no está activa"""
+    secuencias = await encolar_detecciones([registro])
+    return secuencias[0] if secuencias else None
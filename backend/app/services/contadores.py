@@ -0,0 +1,191 @@
+"""
+Contadores de vehículos por zona y por etiqueta (tabla contadores_vehiculos)
+- Las rutas de escritura (detecciones, movimientos manuales, asignar/quitar
+  etiquetas) anotan deltas en la sesión con sumar() / mover_vehiculo()
+- Los deltas se aplican justo antes del commit, agregados y en orden fijo: los
+  bloqueos de fila duran lo mínimo y dos workers no se interbloquean; un rollback
+  los descarta junto con el resto de la transacción
+- reconciliar() recalcula los contadores desde las tablas y corrige el desfase
+  (al arrancar y cada CONTADORES_RECONCILIAR_INTERVALO segundos)
+"""
+import asyncio
+import logging
+import random
+from collections import Counter
+from typing import Dict, Iterable, Optional
+
+from sqlalchemy import event, func, insert, text, update
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..database import SessionLocal
+from ..models.contador import ContadorVehiculos
+from ..models.etiqueta import VehiculoEtiqueta
+from ..models.vehiculo import Vehiculo
+from .invalidacion import publicar_invalidacion
+from .upsert import insertar_o_actualizar
+from .versiones import ZONAS, ETIQUETAS
+
+logger = logging.getLogger("sigv.contadores")
+
+ZONA = "zona"
+ETIQUETA = "etiqueta"
+
+_DELTAS = "contadores_deltas"  # Clave en Session.info
+VARIACION_INTERVALO = 0.2
+
+_estado = {"tarea": None}
+
+
+def sumar(db: Session, tipo: str, entidad_id: Optional[int], delta: int):
+    """Anotar un cambio del contador; se escribe al hacer commit de la sesión"""
+    if entidad_id is None or not delta:
+        return
+    db.info.setdefault(_DELTAS, Counter())[(tipo, entidad_id)] += delta
+
+
+def mover_vehiculo(db: Session, en_antes: bool, zona_antes: Optional[int], en_despues: bool,
+                   zona_despues: Optional[int]):
+    """Anotar el paso de un vehículo de un estado (en instalaciones, zona) a otro"""
+    if bool(en_antes) == bool(en_despues) and zona_antes == zona_despues:
+        return
+    if en_antes:
+        sumar(db, ZONA, zona_antes, -1)
+    if en_despues:
+        sumar(db, ZONA, zona_despues, 1)
+
+
+@event.listens_for(SessionLocal, "before_commit")
+def _aplicar_deltas(db: Session):
+    deltas = db.info.pop(_DELTAS, None)
+    if not deltas:
+        return
+    # Una sentencia para todos los contadores de la transacción, siempre en el mismo orden
+    insertar_o_actualizar(
+        db, ContadorVehiculos,
+        [
+            {"tipo": tipo, "entidad_id": entidad_id, "cantidad": delta}
+            for (tipo, entidad_id), delta in sorted(deltas.items()) if delta
+        ],
+        ["tipo", "entidad_id"],
+        acumular=["cantidad"]
+    )
+
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _descartar_deltas(db: Session):
+    db.info.pop(_DELTAS, None)
+
+
+def leer(db: Session, tipo: str, ids: Optional[Iterable[int]] = None) -> Dict[int, int]:
+    """{entidad_id: cantidad} en una consulta; las entidades sin fila cuentan 0"""
+    query = db.query(ContadorVehiculos.entidad_id, ContadorVehiculos.cantidad).filter(
+        ContadorVehiculos.tipo == tipo
+    )
+    if ids is not None:
+        ids = list(ids)
+        if not ids:
+            return {}
+        query = query.filter(ContadorVehiculos.entidad_id.in_(ids))
+    return dict(query.all())
+
+
+def _recuentos(db: Session) -> Dict[tuple, int]:
+    reales = {
+        (ZONA, zona_id): cantidad
+        for zona_id, cantidad in db.query(Vehiculo.zona_actual_id, func.count()).filter(
+            Vehiculo.en_instalaciones == True, Vehiculo.zona_actual_id.isnot(None)
+        ).group_by(Vehiculo.zona_actual_id)
+    }
+    reales.update({
+        (ETIQUETA, etiqueta_id): cantidad
+        for etiqueta_id, cantidad in db.query(VehiculoEtiqueta.etiqueta_id, func.count()).filter(
+            VehiculoEtiqueta.activa == True
+        ).group_by(VehiculoEtiqueta.etiqueta_id)
+    })
+    return reales
+
+
+def reconciliar(db: Session) -> Dict[tuple, tuple]:
+    """
+    Recalcular los contadores y corregir los que no coinciden (en una transacción).
+    Devuelve {(tipo, entidad_id): (antes, ahora)} de los corregidos.
+    En PostgreSQL bloquea la tabla de contadores mientras cuenta: las escrituras que
+    terminan entre el recuento y la corrección esperan y aplican su delta después.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(text("LOCK TABLE contadores_vehiculos IN SHARE ROW EXCLUSIVE MODE"))
+    actuales = {
+        (fila.tipo, fila.entidad_id): fila.cantidad
+        for fila in db.query(ContadorVehiculos.tipo, ContadorVehiculos.entidad_id, ContadorVehiculos.cantidad)
+    }
+    reales = _recuentos(db)
+
+    correcciones = {}
+    for clave in actuales.keys() | reales.keys():
+        real = reales.get(clave, 0)
+        if actuales.get(clave, 0) != real:
+            correcciones[clave] = (actuales.get(clave), real)
+
+    actualizar = [
+        {"tipo": tipo, "entidad_id": entidad_id, "cantidad": real}
+        for (tipo, entidad_id), (antes, real) in correcciones.items() if antes is not None
+    ]
+    nuevas = [
+        {"tipo": tipo, "entidad_id": entidad_id, "cantidad": real}
+        for (tipo, entidad_id), (antes, real) in correcciones.items() if antes is None
+    ]
+    if actualizar:
+        db.execute(update(ContadorVehiculos), actualizar)
+    if nuevas:
+        db.execute(insert(ContadorVehiculos), nuevas)
+    db.commit()
+    return correcciones
+
+
+def reconciliar_contadores() -> Dict[tuple, tuple]:
+    """Reconciliar con una sesión propia; avisa en el log del desfase encontrado"""
+    db = SessionLocal()
+    try:
+        correcciones = reconciliar(db)
+    finally:
+        db.close()
+    desfases = {clave: cambio for clave, cambio in correcciones.items() if cambio[0] is not None}
+    if desfases:
+        logger.warning(
+            "Contadores desfasados corregidos: %s",
+            ", ".join(f"{tipo} {entidad_id}: {antes} -> {real}"
+                      for (tipo, entidad_id), (antes, real) in sorted(desfases.items()))
+        )
+    if correcciones:
+        publicar_invalidacion(ZONAS, ETIQUETAS)
+    return correcciones
+
+
+async def _bucle():
+    while True:
+        intervalo = settings.CONTADORES_RECONCILIAR_INTERVALO
+        await asyncio.sleep(intervalo * random.uniform(1 - VARIACION_INTERVALO, 1 + VARIACION_INTERVALO))
+        try:
+            await asyncio.to_thread(reconciliar_contadores)
+        except Exception:
+            logger.exception("Error reconciliando los contadores")
+
+
+def iniciar_reconciliacion():
+    """Reconciliar al arrancar y, si hay intervalo, periódicamente en segundo plano (en el lifespan)"""
+    reconciliar_contadores()
+    if settings.CONTADORES_RECONCILIAR_INTERVALO > 0 and _estado["tarea"] is None:
+        _estado["tarea"] = asyncio.create_task(_bucle())
+
+
+async def detener_reconciliacion():
+    tarea = _estado["tarea"]
+    if tarea is None:
+        return
+    tarea.cancel()
+    try:
+        await tarea
+    except asyncio.CancelledError:
+        pass
+    _estado["tarea"] = None
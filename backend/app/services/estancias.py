@@ -0,0 +1,178 @@
+"""
+Tiempo que pasan los vehículos en cada etiqueta (etapa del taller)
+- Cada estancia terminada (asignación -> remoción) se suma al agregado
+  estancias_etiquetas por etiqueta, día de remoción y tramo de duración, en la
+  misma transacción que quita la etiqueta
+- El análisis de un rango de fechas lee solo el agregado (etiquetas x días x
+  tramos filas) y las asignaciones activas, nunca el historial completo
+- Percentiles aproximados a partir de la distribución por tramos
+"""
+from bisect import bisect_left
+from collections import defaultdict
+from datetime import date, datetime, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import delete, func, insert
+from sqlalchemy.orm import Session
+
+from ..models.etiqueta import Etiqueta, VehiculoEtiqueta, EstanciaEtiqueta
+from .upsert import insertar_o_actualizar
+
+# Límite superior (horas) de cada tramo; el último tramo es "más de 30 días"
+TRAMOS_HORAS = (1, 4, 8, 24, 48, 72, 120, 168, 336, 720)
+LOTE = 10_000
+
+
+def _utc(fecha: datetime) -> datetime:
+    """Fechas naive (UTC) o con zona horaria, como naive UTC"""
+    if fecha.tzinfo is not None:
+        fecha = fecha.astimezone(timezone.utc).replace(tzinfo=None)
+    return fecha
+
+
+def tramo(segundos: float) -> int:
+    return bisect_left(TRAMOS_HORAS, segundos / 3600)
+
+
+def agregar(filas: Iterable[Tuple[int, datetime, datetime]],
+            agregado: Optional[Dict] = None) -> Dict[tuple, list]:
+    """(etiqueta_id, fecha_asignacion, fecha_remocion) -> {(etiqueta_id, dia, tramo): [cantidad, segundos]}"""
+    agregado = agregado if agregado is not None else defaultdict(lambda: [0, 0.0])
+    for etiqueta_id, asignacion, remocion in filas:
+        if asignacion is None or remocion is None:
+            continue
+        remocion = _utc(remocion)
+        segundos = max((remocion - _utc(asignacion)).total_seconds(), 0.0)
+        acumulado = agregado[(etiqueta_id, remocion.date(), tramo(segundos))]
+        acumulado[0] += 1
+        acumulado[1] += segundos
+    return agregado
+
+
+def registrar_estancias(db: Session, filas: Iterable[Tuple[int, datetime, datetime]]):
+    """Sumar estancias recién terminadas al agregado (en la transacción del llamador)"""
+    insertar_o_actualizar(
+        db, EstanciaEtiqueta,
+        [
+            {"etiqueta_id": etiqueta_id, "dia": dia, "tramo": indice, "cantidad": cantidad, "segundos": segundos}
+            for (etiqueta_id, dia, indice), (cantidad, segundos) in sorted(agregar(filas).items())
+        ],
+        ["etiqueta_id", "dia", "tramo"],
+        acumular=["cantidad", "segundos"]
+    )
+
+
+def reconstruir_estancias(db: Session) -> int:
+    """Recalcular el agregado desde el historial (tras cargas en bloque); devuelve las estancias"""
+    agregado = defaultdict(lambda: [0, 0.0])
+    filas = db.query(
+        VehiculoEtiqueta.etiqueta_id, VehiculoEtiqueta.fecha_asignacion, VehiculoEtiqueta.fecha_remocion
+    ).filter(
+        VehiculoEtiqueta.activa == False, VehiculoEtiqueta.fecha_remocion.isnot(None)
+    ).yield_per(LOTE)
+    agregar(filas, agregado)
+
+    db.execute(delete(EstanciaEtiqueta))
+    nuevas = [
+        {"etiqueta_id": etiqueta_id, "dia": dia, "tramo": indice, "cantidad": cantidad, "segundos": segundos}
+        for (etiqueta_id, dia, indice), (cantidad, segundos) in agregado.items()
+    ]
+    for inicio in range(0, len(nuevas), LOTE):
+        db.execute(insert(EstanciaEtiqueta), nuevas[inicio:inicio + LOTE])
+    db.commit()
+    return sum(cantidad for cantidad, _ in agregado.values())
+
+
+def _percentil(distribucion: List[int], p: float) -> Optional[float]:
+    """Percentil (horas) interpolando dentro del tramo en que cae"""
+    total = sum(distribucion)
+    if not total:
+        return None
+    objetivo = p * total
+    acumulado = 0
+    for indice, cantidad in enumerate(distribucion):
+        if cantidad and acumulado + cantidad >= objetivo:
+            inferior = TRAMOS_HORAS[indice - 1] if indice else 0
+            if indice == len(TRAMOS_HORAS):
+                return float(inferior)
+            return inferior + (TRAMOS_HORAS[indice] - inferior) * (objetivo - acumulado) / cantidad
+        acumulado += cantidad
+    return None
+
+
+def _horas(segundos: Optional[float]) -> Optional[float]:
+    return None if segundos is None else round(segundos / 3600, 1)
+
+
+def _redondear(horas: Optional[float]) -> Optional[float]:
+    return None if horas is None else round(horas, 1)
+
+
+def analizar_estancias(db: Session, desde: date, hasta: date, ahora: Optional[datetime] = None) -> dict:
+    """
+    Distribución del tiempo por etiqueta de las estancias terminadas entre `desde` y
+    `hasta` (por día de remoción), las estancias en curso y el ranking de cuellos de
+    botella (horas acumuladas). Tres consultas, independientes del tamaño del historial.
+    """
+    ahora = ahora or datetime.utcnow()
+    tramos = len(TRAMOS_HORAS) + 1
+
+    terminadas = defaultdict(lambda: {"distribucion": [0] * tramos, "segundos": 0.0})
+    for fila in db.query(
+        EstanciaEtiqueta.etiqueta_id, EstanciaEtiqueta.tramo,
+        func.sum(EstanciaEtiqueta.cantidad).label("cantidad"),
+        func.sum(EstanciaEtiqueta.segundos).label("segundos")
+    ).filter(
+        EstanciaEtiqueta.dia >= desde, EstanciaEtiqueta.dia <= hasta
+    ).group_by(EstanciaEtiqueta.etiqueta_id, EstanciaEtiqueta.tramo):
+        datos = terminadas[fila.etiqueta_id]
+        datos["distribucion"][fila.tramo] = int(fila.cantidad)
+        datos["segundos"] += fila.segundos
+
+    en_curso = defaultdict(list)
+    for etiqueta_id, asignacion in db.query(VehiculoEtiqueta.etiqueta_id, VehiculoEtiqueta.fecha_asignacion).filter(
+        VehiculoEtiqueta.activa == True, VehiculoEtiqueta.fecha_asignacion.isnot(None)
+    ):
+        en_curso[etiqueta_id].append(max((ahora - _utc(asignacion)).total_seconds(), 0.0))
+
+    etiquetas = db.query(Etiqueta.id, Etiqueta.nombre, Etiqueta.color).filter(
+        Etiqueta.id.in_(set(terminadas) | set(en_curso))
+    ).order_by(Etiqueta.orden, Etiqueta.nombre).all() if terminadas or en_curso else []
+
+    resultado = []
+    for etiqueta in etiquetas:
+        datos = terminadas.get(etiqueta.id, {"distribucion": [0] * tramos, "segundos": 0.0})
+        finalizadas = sum(datos["distribucion"])
+        abiertas = en_curso.get(etiqueta.id, [])
+        resultado.append({
+            "etiqueta_id": etiqueta.id,
+            "nombre": etiqueta.nombre,
+            "color": etiqueta.color,
+            "finalizadas": finalizadas,
+            "media_horas": _horas(datos["segundos"] / finalizadas) if finalizadas else None,
+            "p50_horas": _redondear(_percentil(datos["distribucion"], 0.5)),
+            "p90_horas": _redondear(_percentil(datos["distribucion"], 0.9)),
+            "distribucion": datos["distribucion"],
+            "en_curso": len(abiertas),
+            "en_curso_media_horas": _horas(sum(abiertas) / len(abiertas)) if abiertas else None,
+            "en_curso_max_horas": _horas(max(abiertas)) if abiertas else None,
+            "horas_totales": _horas(datos["segundos"] + sum(abiertas)),
+        })
+
+    ranking = sorted(resultado, key=lambda fila: fila["horas_totales"], reverse=True)
+    return {
+        "desde": desde,
+        "hasta": hasta,
+        "tramos_horas": list(TRAMOS_HORAS) + [None],
+        "etiquetas": resultado,
+        "cuellos_de_botella": [
+            {
+                "etiqueta_id": fila["etiqueta_id"],
+                "nombre": fila["nombre"],
+                "horas_totales": fila["horas_totales"],
+                "p90_horas": fila["p90_horas"],
+                "en_curso": fila["en_curso"],
+            }
+            for fila in ranking if fila["horas_totales"]
+        ],
+    }
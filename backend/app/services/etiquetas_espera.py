@@ -0,0 +1,47 @@
+"""
+Etiquetas de "esperando piezas" del dashboard
+- Las etiquetas activas cuyo nombre contiene alguno de los patrones de
+  ETIQUETAS_ESPERA_PIEZAS se resuelven una vez por worker y se guardan en memoria
+- Se invalida con el bus al crear/modificar/eliminar etiquetas
+"""
+from typing import Tuple
+
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..models.etiqueta import Etiqueta
+from .invalidacion import suscribir
+from .metricas import registrar_cache
+from .versiones import ETIQUETAS
+
+# ids resueltos (None = hay que resolverlos) y generación para descartar cargas desfasadas
+_estado = {"ids": None, "generacion": 0}
+
+
+def etiquetas_espera_piezas(db: Session) -> Tuple[int, ...]:
+    """Ids de las etiquetas activas de espera de piezas (una consulta solo si no están en memoria)"""
+    ids = _estado["ids"]
+    registrar_cache("etiquetas_espera", ids is not None)
+    if ids is not None:
+        return ids
+
+    generacion = _estado["generacion"]
+    patrones = [patron.strip().casefold() for patron in settings.ETIQUETAS_ESPERA_PIEZAS.split(",") if patron.strip()]
+    ids = tuple(
+        etiqueta_id
+        for etiqueta_id, nombre in db.query(Etiqueta.id, Etiqueta.nombre).filter(
+            Etiqueta.activo == True
+        ).order_by(Etiqueta.id)
+        if any(patron in nombre.casefold() for patron in patrones)
+    )
+    # Si se invalidó mientras se leía, no guardar un resultado que puede estar desfasado
+    if generacion == _estado["generacion"]:
+        _estado["ids"] = ids
+    return ids
+
+
+@suscribir
+def _invalidar_etiquetas_espera(recursos):
+    if recursos is None or ETIQUETAS in recursos:
+        _estado["generacion"] += 1
+        _estado["ids"] = None
@@ -0,0 +1,341 @@
+"""
+Generador de datos sintéticos para pruebas de rendimiento
+- Vehículos con trayectorias realistas entre las zonas y cámaras reales
+- Historial de etiquetas siguiendo el flujo del taller
+- Valores de campos personalizados según su tipo
+- Alertas (matrículas no registradas, inactividad, posibles entregas)
+
+Todo es reproducible a partir de una semilla. Los datos se insertan por lotes:
+COPY en PostgreSQL e INSERT multi-fila en el resto de bases de datos.
+"""
+import csv
+import io
+import random
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List
+
+from sqlalchemy import func, insert, text
+from sqlalchemy.orm import Session
+
+from ..models.usuario import Usuario, Rol
+from ..models.vehiculo import Vehiculo, CampoPersonalizado, ValorCampoPersonalizado
+from ..models.etiqueta import Etiqueta, VehiculoEtiqueta
+from ..models.zona import Camara
+from ..models.movimiento import Movimiento
+from ..models.alerta import Alerta
+from .campos_tipados import columnas_tipadas
+from .contadores import reconciliar
+from .estancias import reconstruir_estancias
+
+CONSONANTES = "BCDFGHJKLMNPRSTVWXYZ"
+MARCAS = {
+    "Seat": ["Ibiza", "León", "Arona", "Ateca"],
+    "Renault": ["Clio", "Mégane", "Captur", "Kangoo"],
+    "Peugeot": ["208", "308", "2008", "3008"],
+    "Volkswagen": ["Polo", "Golf", "T-Roc", "Tiguan"],
+    "Toyota": ["Yaris", "Corolla", "C-HR", "RAV4"],
+    "Ford": ["Fiesta", "Focus", "Kuga", "Transit"],
+}
+COLORES = ["Blanco", "Negro", "Gris", "Plata", "Rojo", "Azul"]
+NOMBRES = ["Antonio", "María", "José", "Carmen", "Manuel", "Laura", "Francisco", "Ana", "David", "Lucía"]
+APELLIDOS = ["García", "Martínez", "López", "Sánchez", "Pérez", "Gómez", "Fernández", "Ruiz", "Díaz"]
+
+PROB_SALIDA = 0.12  # Probabilidad de que una detección interna sea seguida de salida
+PROB_NO_REGISTRADA = 0.3  # Vehículos que entraron sin estar dados de alta
+
+
+def matricula_desde_indice(indice: int) -> str:
+    """Matrícula única y determinista para cada índice (hasta 80 millones)"""
+    numero = indice % 10000
+    resto = indice // 10000
+    letras = ""
+    for _ in range(3):
+        letras = CONSONANTES[resto % 20] + letras
+        resto //= 20
+    return f"{numero:04d}{letras}"
+
+
+def insertar_lote(db: Session, tabla, filas: List[dict]):
+    """Insertar filas en bloque: COPY en PostgreSQL, executemany en el resto"""
+    if not filas:
+        return
+
+    if db.bind.dialect.name == "postgresql":
+        columnas = list(filas[0].keys())
+        buffer = io.StringIO()
+        escritor = csv.writer(buffer)
+        for fila in filas:
+            escritor.writerow(fila[c] for c in columnas)
+        buffer.seek(0)
+
+        cursor = db.connection().connection.cursor()
+        columnas_sql = ", ".join(f'"{c}"' for c in columnas)
+        cursor.copy_expert(f"COPY {tabla.name} ({columnas_sql}) FROM STDIN WITH (FORMAT csv)", buffer)
+    else:
+        db.execute(insert(tabla), filas)
+
+
+def _trayectoria(rnd: random.Random, cantidad: int, inicio: datetime, fin: datetime,
+                 camara_entrada: dict, camara_salida: dict, camaras_internas: List[dict]) -> List[dict]:
+    """
+    Secuencia cronológica de movimientos de un vehículo, con la misma lógica
+    de tipos que procesar_deteccion (entrada, cambios de zona, salida).
+    Los instantes se reparten al azar dentro de [inicio, fin): nunca en el futuro.
+    """
+    movimientos = []
+    segundos = max((fin - inicio).total_seconds(), 0)
+    instantes = sorted(inicio + timedelta(seconds=rnd.random() * segundos) for _ in range(cantidad))
+    dentro = False
+    zona_actual = None
+
+    for instante in instantes:
+        if not dentro:
+            camara, tipo = camara_entrada, "ENTRADA"
+            dentro = True
+        elif rnd.random() < PROB_SALIDA:
+            camara, tipo = camara_salida, "SALIDA"
+            dentro = False
+        else:
+            camara = rnd.choice(camaras_internas)
+            tipo = "CAMBIO_ZONA" if camara["zona_id"] != zona_actual else "DETECCION"
+
+        movimientos.append({
+            "tipo": tipo,
+            "zona_origen_id": zona_actual,
+            "zona_destino_id": camara["zona_id"],
+            "camara_id": camara["id"],
+            "fecha_hora": instante,
+        })
+        zona_actual = camara["zona_id"]
+
+    return movimientos
+
+
+def _valor_campo(rnd: random.Random, campo: dict, referencia: datetime) -> str:
+    tipo = campo["tipo"]
+    if tipo == "numero":
+        if "kilometraje" in campo["nombre"]:
+            return str(rnd.randint(5_000, 250_000))
+        return f"{rnd.uniform(80, 6000):.2f}"
+    if tipo == "fecha":
+        return (referencia + timedelta(days=rnd.randint(-10, 30))).date().isoformat()
+    if tipo == "booleano":
+        return rnd.choice(["true", "false"])
+    if tipo == "seleccion" and campo["opciones"]:
+        return rnd.choice(campo["opciones"])
+    return f"{campo['nombre'][:3].upper()}-{rnd.randint(10000, 99999)}"
+
+
+def _lotes(total: int, tamano: int) -> Iterable[range]:
+    for inicio in range(0, total, tamano):
+        yield range(inicio, min(inicio + tamano, total))
+
+
+def generar_datos(
+    db: Session,
+    vehiculos: int = 200_000,
+    movimientos: int = 20_000_000,
+    dias: int = 365,
+    semilla: int = 42,
+    hasta: datetime = None,
+    lote_vehiculos: int = 2_000,
+    progreso: bool = True
+) -> Dict[str, int]:
+    """
+    Generar el conjunto de datos completo.
+    Requiere que existan zonas, cámaras, etiquetas y campos (init_all) y que la
+    tabla de vehículos esté vacía, para que los ids y matrículas sean reproducibles.
+    Con la misma semilla y la misma fecha `hasta` (por defecto hoy a las 00:00)
+    se obtienen exactamente los mismos datos.
+    """
+    if db.query(Vehiculo.id).first():
+        raise ValueError("La tabla de vehículos no está vacía; usar una base de datos limpia")
+
+    rnd = random.Random(semilla)
+    ahora = hasta or datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    inicio_ventana = ahora - timedelta(days=dias)
+
+    camaras = [
+        {"id": c.id, "zona_id": c.zona_id, "tipo": c.tipo, "direccion": c.direccion}
+        for c in db.query(Camara).filter(Camara.activo == True, Camara.zona_id.isnot(None)).order_by(Camara.id)
+    ]
+    camara_entrada = next(c for c in camaras if c["tipo"] == "lpr" and c["direccion"] in ("entrada", "ambos"))
+    camara_salida = next(c for c in camaras if c["tipo"] == "lpr" and c["direccion"] in ("salida", "ambos"))
+    camaras_internas = [c for c in camaras if c["tipo"] != "lpr"] or [camara_entrada]
+
+    etiquetas = [e.id for e in db.query(Etiqueta).filter(Etiqueta.activo == True).order_by(Etiqueta.orden)]
+    etiqueta_entregado = db.query(Etiqueta.id).filter(Etiqueta.nombre == "Entregado").scalar()
+    etiquetas_flujo = [e for e in etiquetas if e != etiqueta_entregado]
+
+    campos = [
+        {"id": c.id, "nombre": c.nombre, "tipo": c.tipo, "opciones": c.opciones}
+        for c in db.query(CampoPersonalizado).filter(CampoPersonalizado.activo == True).order_by(CampoPersonalizado.id)
+    ]
+    admin_id = db.query(Usuario.id).filter(Usuario.rol == Rol.ADMINISTRADOR).order_by(Usuario.id).scalar()
+
+    primer_id = (db.query(func.max(Vehiculo.id)).scalar() or 0) + 1
+    media_movimientos = movimientos / max(vehiculos, 1)
+    movimientos_restantes = movimientos
+    totales = {"vehiculos": 0, "movimientos": 0, "etiquetas": 0, "campos": 0, "alertas": 0}
+
+    for indices in _lotes(vehiculos, lote_vehiculos):
+        filas_vehiculos, filas_movimientos, filas_etiquetas, filas_campos, filas_alertas = [], [], [], [], []
+
+        for i in indices:
+            vehiculo_id = primer_id + i
+            matricula = matricula_desde_indice(i)
+            marca = rnd.choice(list(MARCAS))
+
+            # Movimientos (el último vehículo recibe el resto para cuadrar el total)
+            if i == vehiculos - 1:
+                cantidad = movimientos_restantes
+            else:
+                cantidad = min(movimientos_restantes, max(1, round(media_movimientos * rnd.uniform(0.3, 1.7))))
+            movimientos_restantes -= cantidad
+
+            inicio = inicio_ventana + timedelta(seconds=rnd.uniform(0, dias * 86400 * 0.5))
+            trayectoria = _trayectoria(rnd, cantidad, inicio, ahora, camara_entrada, camara_salida, camaras_internas)
+            for mov in trayectoria:
+                mov.update({
+                    "vehiculo_id": vehiculo_id,
+                    "matricula_detectada": matricula,
+                    "confianza": round(rnd.uniform(80, 99.9), 2),
+                    "manual": False,
+                })
+            filas_movimientos.extend(trayectoria)
+
+            entradas = [m["fecha_hora"] for m in trayectoria if m["tipo"] == "ENTRADA"]
+            salidas = [m["fecha_hora"] for m in trayectoria if m["tipo"] == "SALIDA"]
+            ultimo = trayectoria[-1] if trayectoria else None
+            dentro = bool(ultimo) and ultimo["tipo"] != "SALIDA"
+
+            filas_vehiculos.append({
+                "id": vehiculo_id,
+                "matricula": matricula,
+                "marca": marca,
+                "modelo": rnd.choice(MARCAS[marca]),
+                "color": rnd.choice(COLORES),
+                "año": rnd.randint(2005, 2025),
+                "vin": None,
+                "cliente_nombre": f"{rnd.choice(NOMBRES)} {rnd.choice(APELLIDOS)}",
+                "cliente_telefono": f"6{rnd.randint(10_000_000, 99_999_999)}",
+                "cliente_email": None,
+                "activo": True,
+                "en_instalaciones": dentro,
+                "zona_actual_id": ultimo["zona_destino_id"] if ultimo else None,
+                "fecha_primera_entrada": entradas[0] if entradas else None,
+                "fecha_ultima_entrada": entradas[-1] if entradas else None,
+                "fecha_ultima_salida": salidas[-1] if salidas else None,
+                "fecha_ultimo_movimiento": ultimo["fecha_hora"] if ultimo else None,
+                "fecha_creacion": trayectoria[0]["fecha_hora"] if trayectoria else inicio,
+            })
+
+            # Historial de etiquetas: avanza por el flujo del taller
+            if trayectoria and etiquetas_flujo:
+                pasos = etiquetas_flujo[:rnd.randint(1, len(etiquetas_flujo))]
+                fin_flujo = ultimo["fecha_hora"] if dentro else salidas[-1]
+                duracion = (fin_flujo - trayectoria[0]["fecha_hora"]) / (len(pasos) + 1)
+                asignacion = trayectoria[0]["fecha_hora"]
+                for n, etiqueta_id in enumerate(pasos):
+                    remocion = min(asignacion + duracion * rnd.uniform(0.5, 1.5), fin_flujo)
+                    activa = dentro and n == len(pasos) - 1
+                    filas_etiquetas.append({
+                        "vehiculo_id": vehiculo_id,
+                        "etiqueta_id": etiqueta_id,
+                        "activa": activa,
+                        "asignado_por_id": admin_id,
+                        "fecha_asignacion": asignacion,
+                        "fecha_remocion": None if activa else remocion,
+                    })
+                    asignacion = remocion
+                if not dentro and etiqueta_entregado:
+                    filas_etiquetas.append({
+                        "vehiculo_id": vehiculo_id,
+                        "etiqueta_id": etiqueta_entregado,
+                        "activa": True,
+                        "asignado_por_id": admin_id,
+                        "fecha_asignacion": salidas[-1],
+                        "fecha_remocion": None,
+                    })
+
+            # Campos personalizados (alrededor de la mitad rellenos)
+            referencia = trayectoria[0]["fecha_hora"] if trayectoria else inicio
+            for campo in campos:
+                if rnd.random() < 0.5:
+                    valor = _valor_campo(rnd, campo, referencia)
+                    filas_campos.append({
+                        "vehiculo_id": vehiculo_id,
+                        "campo_id": campo["id"],
+                        "valor": valor,
+                        **columnas_tipadas(campo["tipo"], valor),
+                    })
+
+            # Alertas
+            if entradas and rnd.random() < PROB_NO_REGISTRADA:
+                resuelta = rnd.random() < 0.8
+                filas_alertas.append({
+                    "tipo": "ENTRADA_NO_REGISTRADA",
+                    "vehiculo_id": vehiculo_id,
+                    "titulo": f"Matrícula no registrada: {matricula}",
+                    "mensaje": f"Se ha detectado la matrícula {matricula} que no estaba en el sistema.",
+                    "prioridad": "media",
+                    "leida": resuelta or rnd.random() < 0.5,
+                    "resuelta": resuelta,
+                    "fecha_creacion": entradas[0],
+                    "fecha_resolucion": min(entradas[0] + timedelta(hours=rnd.uniform(0.1, 48)), ahora)
+                                        if resuelta else None,
+                })
+            if dentro and ahora - ultimo["fecha_hora"] > timedelta(days=20):
+                filas_alertas.append({
+                    "tipo": "INACTIVIDAD",
+                    "vehiculo_id": vehiculo_id,
+                    "titulo": f"Vehículo inactivo: {matricula}",
+                    "mensaje": f"El vehículo {matricula} lleva más de 20 días sin movimiento.",
+                    "prioridad": "alta",
+                    "leida": rnd.random() < 0.3,
+                    "resuelta": False,
+                    "fecha_creacion": ultimo["fecha_hora"] + timedelta(days=20),
+                    "fecha_resolucion": None,
+                })
+            elif salidas and rnd.random() < 0.2 and ahora - salidas[-1] > timedelta(hours=2):
+                filas_alertas.append({
+                    "tipo": "POSIBLE_ENTREGA",
+                    "vehiculo_id": vehiculo_id,
+                    "titulo": f"Posible entrega: {matricula}",
+                    "mensaje": f"El vehículo {matricula} no ha sido detectado desde su última salida.",
+                    "prioridad": "baja",
+                    "leida": True,
+                    "resuelta": True,
+                    "fecha_creacion": salidas[-1] + timedelta(hours=1),
+                    "fecha_resolucion": salidas[-1] + timedelta(hours=2),
+                })
+
+        insertar_lote(db, Vehiculo.__table__, filas_vehiculos)
+        insertar_lote(db, Movimiento.__table__, filas_movimientos)
+        insertar_lote(db, VehiculoEtiqueta.__table__, filas_etiquetas)
+        insertar_lote(db, ValorCampoPersonalizado.__table__, filas_campos)
+        insertar_lote(db, Alerta.__table__, filas_alertas)
+        db.commit()
+
+        totales["vehiculos"] += len(filas_vehiculos)
+        totales["movimientos"] += len(filas_movimientos)
+        totales["etiquetas"] += len(filas_etiquetas)
+        totales["campos"] += len(filas_campos)
+        totales["alertas"] += len(filas_alertas)
+        if progreso:
+            print(f"  {totales['vehiculos']:>9,} vehículos | {totales['movimientos']:>11,} movimientos", flush=True)
+
+    if db.bind.dialect.name == "postgresql":
+        # Los ids de vehículos se asignaron explícitamente: ajustar la secuencia
+        db.execute(text(
+            "SELECT setval(pg_get_serial_sequence('vehiculos', 'id'), (SELECT MAX(id) FROM vehiculos))"
+        ))
+        db.commit()
+        with db.bind.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.execute(text("ANALYZE"))
+
+    # Las filas se insertaron en bloque, sin pasar por los contadores ni las estancias por etiqueta
+    reconciliar(db)
+    reconstruir_estancias(db)
+
+    return totales
@@ -0,0 +1,41 @@
+"""
+Idempotencia de la ingesta LPR
+- Las cámaras/pasarelas pueden enviar un evento_id y reintentar con el mismo id
+- Los ids recientes se guardan en memoria con la respuesta original: un reintento
+  se responde sin tocar la base de datos
+- La restricción única de movimientos.evento_id cubre lo que la caché no ve
+  (otro worker, un reinicio, ids ya expulsados de la caché)
+"""
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from ..config import settings
+from .metricas import registrar_cache
+
+
+class EventosRecientes:
+    """Caché LRU acotada evento_id -> respuesta original"""
+
+    def __init__(self, maximo: int):
+        self.maximo = maximo
+        self._datos: "OrderedDict[str, dict]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obtener(self, evento_id: str) -> Optional[dict]:
+        with self._lock:
+            respuesta = self._datos.get(evento_id)
+            if respuesta is not None:
+                self._datos.move_to_end(evento_id)
+        registrar_cache("eventos_lpr", respuesta is not None)
+        return respuesta
+
+    def guardar(self, evento_id: str, respuesta: dict):
+        with self._lock:
+            self._datos[evento_id] = respuesta
+            self._datos.move_to_end(evento_id)
+            while len(self._datos) > self.maximo:
+                self._datos.popitem(last=False)
+
+
+eventos_recientes = EventosRecientes(settings.IDEMPOTENCIA_EVENTOS_RECIENTES)
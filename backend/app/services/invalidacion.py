@@ -0,0 +1,250 @@
+"""
+Bus de invalidación de cachés entre workers
+- Toda escritura publica qué recursos han cambiado: las de administración (zonas,
+  cámaras, etiquetas, campos) y también vehículos, movimientos, alertas y
+  asignaciones de etiquetas, porque forman parte de los ETag
+- Cada worker aplica la invalidación en sus cachés en memoria (versiones de ETag,
+  catálogo de zonas, etiquetas...) mediante las funciones suscritas
+- PostgreSQL: NOTIFY en el canal sigv_invalidacion y un hilo por worker con LISTEN.
+  El NOTIFY lo envía un hilo propio, nunca la petición: lo publicado mientras se
+  envía uno se acumula y sale junto en el siguiente
+- Versiones compartidas: el hilo de envío incrementa la versión de cada recurso en
+  la tabla versiones_recursos y la manda en el NOTIFY, así todos los workers
+  calculan los mismos ETag (también uno recién arrancado, que las lee de la tabla)
+- SQLite / tests: bucle local en memoria (un solo proceso)
+
+Cada vez que se (re)establece la conexión de escucha se invalida todo y se releen
+las versiones, porque pueden haberse perdido notificaciones mientras no se escuchaba.
+"""
+import json
+import logging
+import select
+import threading
+import uuid
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.pool import NullPool
+
+logger = logging.getLogger("sigv.invalidacion")
+
+CANAL = "sigv_invalidacion"
+
+# Identificador de este proceso, para no aplicar dos veces las notificaciones propias
+_origen = uuid.uuid4().hex[:12]
+
+# Funciones suscritas: reciben la tupla de recursos, o None = invalidar todo
+_suscriptores: List[Callable[[Optional[tuple]], None]] = []
+
+# Receptores de las versiones compartidas: reciben {recurso: versión} y si es la tabla completa
+_receptores_versiones: List[Callable[[Dict[str, int], bool], None]] = []
+
+SQL_INCREMENTAR = text(
+    "INSERT INTO versiones_recursos (recurso, version) SELECT unnest(CAST(:recursos AS varchar[])), 1 "
+    "ON CONFLICT (recurso) DO UPDATE SET version = versiones_recursos.version + 1 "
+    "RETURNING recurso, version"
+)
+SQL_VERSIONES = "SELECT recurso, version FROM versiones_recursos"
+
+_estado = {"hilo": None, "parar": None}
+
+# Recursos pendientes de notificar (hilo de envío)
+_envio = {"pendientes": set(), "hilo": None, "parar": False}
+_condicion_envio = threading.Condition()
+
+ESPERA_REINTENTO_ENVIO = 1.0
+
+
+def suscribir(funcion: Callable[[Optional[tuple]], None]):
+    """Registrar una función de invalidación (se puede usar como decorador)"""
+    if funcion not in _suscriptores:
+        _suscriptores.append(funcion)
+    return funcion
+
+
+def suscribir_versiones(funcion: Callable[[Dict[str, int], bool], None]):
+    """Registrar un receptor de versiones compartidas (se puede usar como decorador)"""
+    if funcion not in _receptores_versiones:
+        _receptores_versiones.append(funcion)
+    return funcion
+
+
+def _fijar_versiones(versiones: Dict[str, int], completo: bool = False):
+    for funcion in _receptores_versiones:
+        try:
+            funcion(versiones, completo)
+        except Exception:
+            logger.exception("Error fijando las versiones %s en %s", versiones, funcion.__name__)
+
+
+def _aplicar(recursos: Optional[tuple]):
+    for funcion in _suscriptores:
+        try:
+            funcion(recursos)
+        except Exception:
+            logger.exception("Error aplicando la invalidación %s en %s", recursos, funcion.__name__)
+
+
+def publicar_invalidacion(*recursos: str):
+    """
+    Invalidar recursos en todos los workers (llamar después del commit).
+    Se aplica de inmediato en este proceso; el NOTIFY al resto lo envía el hilo de
+    envío, así que la petición no ocupa otra conexión ni espera a la BD.
+    """
+    _aplicar(recursos)
+
+    with _condicion_envio:
+        if _envio["hilo"] is None:
+            return
+        _envio["pendientes"].update(recursos)
+        _condicion_envio.notify()
+
+
+def _enviar(engine: Engine):
+    """Hilo de envío: un NOTIFY con todo lo pendiente; al parar, envía lo que quede"""
+    while True:
+        with _condicion_envio:
+            while not _envio["pendientes"] and not _envio["parar"]:
+                _condicion_envio.wait()
+            if not _envio["pendientes"]:
+                return
+            lote = sorted(_envio["pendientes"])
+            _envio["pendientes"].clear()
+
+        versiones = _notificar(engine, lote)
+        if versiones is not None:
+            _fijar_versiones(versiones)
+        elif not _envio["parar"]:
+            # Sin BD: reintentar junto con lo que se publique mientras tanto
+            with _condicion_envio:
+                _envio["pendientes"].update(lote)
+                _condicion_envio.wait(ESPERA_REINTENTO_ENVIO)
+
+
+def _notificar(engine: Engine, recursos: List[str]) -> Optional[Dict[str, int]]:
+    """Incrementar las versiones compartidas y notificarlas; None si no se pudo"""
+    try:
+        with engine.begin() as conexion:
+            versiones = dict(conexion.execute(SQL_INCREMENTAR, {"recursos": recursos}).all())
+            payload = json.dumps({"o": _origen, "v": versiones})
+            conexion.execute(text("SELECT pg_notify(:canal, :payload)"), {"canal": CANAL, "payload": payload})
+    except SQLAlchemyError:
+        logger.exception("No se pudo publicar la invalidación de %s", recursos)
+        return None
+    return versiones
+
+
+def _recibir(mensaje: dict):
+    """Aplicar la notificación de otro worker: invalidar sus recursos y adoptar sus versiones"""
+    if mensaje.get("o") == _origen:
+        return
+    versiones = mensaje.get("v") or {}
+    _aplicar(tuple(versiones))
+    _fijar_versiones(versiones)
+
+
+def _cargar_versiones(engine: Engine):
+    """Leer todas las versiones compartidas (al arrancar, antes de atender peticiones)"""
+    try:
+        with engine.connect() as conexion:
+            _fijar_versiones(dict(conexion.execute(text(SQL_VERSIONES)).all()), completo=True)
+    except SQLAlchemyError:
+        logger.exception("No se pudieron leer las versiones compartidas")
+
+
+def iniciar_envio(engine: Engine):
+    """Lanzar el hilo de envío de NOTIFY"""
+    with _condicion_envio:
+        if _envio["hilo"] is not None:
+            return
+        _envio["parar"] = False
+        hilo = threading.Thread(target=_enviar, args=(engine,), name="sigv-invalidacion-envio", daemon=True)
+        _envio["hilo"] = hilo
+    hilo.start()
+
+
+def detener_envio():
+    """Parar el hilo de envío después de enviar lo pendiente"""
+    with _condicion_envio:
+        hilo = _envio["hilo"]
+        if hilo is None:
+            return
+        _envio["parar"] = True
+        _condicion_envio.notify()
+    hilo.join(timeout=5)
+    with _condicion_envio:
+        _envio.update(hilo=None, parar=False)
+        _envio["pendientes"].clear()
+
+
+def _escuchar(engine: Engine, parar: threading.Event):
+    """Hilo de escucha: LISTEN con reconexión y espera exponencial"""
+    espera = 0.5
+    while not parar.is_set():
+        try:
+            conexion = engine.raw_connection()
+        except Exception as e:  # raw_connection no envuelve los errores del driver
+            logger.warning("Bus de invalidación sin conexión (%s), reintentando en %.1f s", e, espera)
+            parar.wait(espera)
+            espera = min(espera * 2, 30)
+            continue
+
+        try:
+            driver = conexion.driver_connection
+            driver.autocommit = True
+            with driver.cursor() as cursor:
+                cursor.execute(f"LISTEN {CANAL}")
+                cursor.execute(SQL_VERSIONES)
+                versiones = dict(cursor.fetchall())
+
+            # Lo ocurrido mientras no escuchábamos se ha perdido: invalidar todo
+            _aplicar(None)
+            _fijar_versiones(versiones, completo=True)
+            espera = 0.5
+
+            while not parar.is_set():
+                listo, _, _ = select.select([driver], [], [], 1.0)
+                if not listo:
+                    continue
+                driver.poll()
+                while driver.notifies:
+                    notificacion = driver.notifies.pop(0)
+                    try:
+                        mensaje = json.loads(notificacion.payload)
+                    except ValueError:
+                        continue
+                    _recibir(mensaje)
+        except Exception as e:
+            logger.warning("Bus de invalidación desconectado (%s), reconectando", e)
+            parar.wait(espera)
+        finally:
+            try:
+                conexion.close()
+            except Exception:
+                pass
+
+
+def iniciar_bus(engine: Engine):
+    """Arrancar el bus (en el lifespan). En PostgreSQL lanza los hilos de envío y de escucha."""
+    if engine.dialect.name != "postgresql" or _estado["hilo"] is not None:
+        return
+    _cargar_versiones(engine)
+    iniciar_envio(engine)
+
+    # Conexión propia fuera del pool: no ocupa una de las conexiones de las peticiones
+    motor_escucha = create_engine(engine.url, poolclass=NullPool)
+    parar = threading.Event()
+    hilo = threading.Thread(target=_escuchar, args=(motor_escucha, parar), name="sigv-invalidacion", daemon=True)
+    hilo.start()
+    _estado.update(hilo=hilo, parar=parar)
+
+
+def detener_bus():
+    """Parar los hilos de envío y de escucha (al apagar la aplicación)"""
+    detener_envio()
+    if _estado["parar"] is not None:
+        _estado["parar"].set()
+        _estado["hilo"].join(timeout=5)
+    _estado.update(hilo=None, parar=None)
@@ -0,0 +1,145 @@
+"""
+Métricas en formato Prometheus
+- Latencia de peticiones HTTP por ruta, método y código de estado
+- Conexiones del pool de la base de datos (en uso / overflow)
+- Detecciones LPR por cámara (usar rate() para detecciones/segundo)
+- Duración de los procesos de alertas
+- Aciertos/fallos de las cachés
+
+Con varios workers de uvicorn, definir PROMETHEUS_MULTIPROC_DIR con un directorio
+vacío antes de arrancar: cada worker escribe sus valores allí y /metrics los agrega.
+"""
+import os
+import time
+from contextlib import contextmanager
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, REGISTRY, generate_latest
+)
+from prometheus_client import multiprocess
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+MULTIPROCESO = bool(os.environ.get("PROMETHEUS_MULTIPROC_DIR"))
+
+peticiones_duracion = Histogram(
+    "sigv_http_request_duration_seconds",
+    "Latencia de las peticiones HTTP",
+    ["metodo", "ruta", "estado"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+)
+
+pool_conexiones_en_uso = Gauge(
+    "sigv_db_pool_checked_out",
+    "Conexiones del pool de la base de datos en uso",
+    multiprocess_mode="livesum"
+)
+
+pool_overflow = Gauge(
+    "sigv_db_pool_overflow",
+    "Conexiones abiertas por encima de pool_size",
+    multiprocess_mode="livesum"
+)
+
+detecciones_lpr = Counter(
+    "sigv_lpr_detecciones_total",
+    "Detecciones LPR procesadas",
+    ["camara", "accion"]
+)
+
+alertas_job_duracion = Histogram(
+    "sigv_alertas_job_duration_seconds",
+    "Duración de los procesos de generación de alertas",
+    ["job"]
+)
+
+cache_consultas = Counter(
+    "sigv_cache_consultas_total",
+    "Consultas a cachés internas por resultado (hit/miss)",
+    ["cache", "resultado"]
+)
+
+
+def registrar_cache(cache: str, acierto: bool):
+    """Contabilizar un acierto o fallo de caché"""
+    cache_consultas.labels(cache, "hit" if acierto else "miss").inc()
+
+
+def registrar_deteccion(camara: str, accion: str):
+    """Contabilizar una detección LPR procesada"""
+    detecciones_lpr.labels(camara, accion).inc()
+
+
+@contextmanager
+def medir_job(job: str):
+    """
+    Medir la duración de un proceso de alertas.
+    Sirve como `with medir_job("inactividad"):` o como decorador `@medir_job("inactividad")`.
+    """
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        alertas_job_duracion.labels(job).observe(time.perf_counter() - inicio)
+
+
+def instrumentar_pool(engine: Engine):
+    """
+    Actualizar los gauges del pool en cada checkout/checkin de conexión.
+    El evento checkin se emite antes de que el pool descuente la conexión,
+    por eso se lleva la cuenta aquí en lugar de leer pool.checkedout().
+    """
+    tamano = engine.pool.size() if hasattr(engine.pool, "size") else 0
+    en_uso = {"n": 0}
+
+    def actualizar(delta: int):
+        en_uso["n"] += delta
+        pool_conexiones_en_uso.set(en_uso["n"])
+        pool_overflow.set(max(en_uso["n"] - tamano, 0))
+
+    event.listen(engine, "checkout", lambda *args: actualizar(1))
+    event.listen(engine, "checkin", lambda *args: actualizar(-1))
+
+
+class MetricasMiddleware:
+    """
+    Middleware ASGI que mide la latencia de cada petición.
+    Usa la plantilla de la ruta (/api/vehiculos/{vehiculo_id}) para no crear
+    una serie por cada id.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        estado = {"codigo": 500}
+
+        async def send_con_estado(mensaje):
+            if mensaje["type"] == "http.response.start":
+                estado["codigo"] = mensaje["status"]
+            await send(mensaje)
+
+        inicio = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_con_estado)
+        finally:
+            ruta = scope.get("route")
+            peticiones_duracion.labels(
+                scope["method"],
+                ruta.path if ruta is not None else "sin_ruta",
+                str(estado["codigo"])
+            ).observe(time.perf_counter() - inicio)
+
+
+def exportar() -> tuple:
+    """Cuerpo y content-type de /metrics (agrega todos los workers en modo multiproceso)"""
+    if MULTIPROCESO:
+        registro = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registro)
+    else:
+        registro = REGISTRY
+    return generate_latest(registro), CONTENT_TYPE_LATEST
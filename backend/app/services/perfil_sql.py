@@ -0,0 +1,161 @@
+"""
+Perfil de SQL por petición y detector de N+1
+- Escucha los eventos del engine de SQLAlchemy (solo si PERFIL_SQL está activo)
+- Por cada petición: número de consultas, tiempo total en BD y sentencias repetidas
+- Devuelve los datos en cabeceras X-SQL-* y registra en el log las peticiones
+  que superan el presupuesto configurado
+- presupuesto_consultas() permite fijar un máximo de consultas en tests
+"""
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import List
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from ..config import settings
+
+logger = logging.getLogger("sigv.perfil_sql")
+
+# Perfiles activos (pueden anidarse: middleware + presupuesto de un test)
+_perfiles_activos: ContextVar[tuple] = ContextVar("perfiles_sql", default=())
+
+_RE_LISTA_IN = re.compile(r"\((?:\s*(?:\?|%\([^)]*\)s|:\w+|%s)\s*,)+\s*(?:\?|%\([^)]*\)s|:\w+|%s)\s*\)")
+_RE_NUMEROS = re.compile(r"\b\d+\b")
+_RE_ESPACIOS = re.compile(r"\s+")
+
+
+def forma_sentencia(sql: str) -> str:
+    """Normalizar una sentencia para agrupar las que solo cambian en parámetros"""
+    sql = _RE_ESPACIOS.sub(" ", sql).strip()
+    sql = _RE_LISTA_IN.sub("(...)", sql)
+    return _RE_NUMEROS.sub("N", sql)
+
+
+class PerfilSQL:
+    """Consultas ejecutadas durante una petición (o un bloque de código)"""
+    __slots__ = ("consultas", "tiempo", "formas", "_inicio")
+
+    def __init__(self):
+        self.consultas = 0
+        self.tiempo = 0.0
+        self.formas = Counter()
+        self._inicio: List[float] = []
+
+    @property
+    def tiempo_ms(self) -> float:
+        return self.tiempo * 1000
+
+    def repetidas(self, minimo: int = None) -> List[tuple]:
+        """Sentencias ejecutadas al menos `minimo` veces (sospechosas de N+1)"""
+        minimo = minimo or settings.PERFIL_SQL_UMBRAL_REPETICIONES
+        return [(forma, n) for forma, n in self.formas.most_common() if n >= minimo]
+
+    def cabeceras(self) -> List[tuple]:
+        repetidas = self.repetidas()
+        max_repeticiones = repetidas[0][1] if repetidas else 0
+        return [
+            (b"x-sql-consultas", str(self.consultas).encode()),
+            (b"x-sql-tiempo-ms", f"{self.tiempo_ms:.1f}".encode()),
+            (b"x-sql-repetidas", f"{len(repetidas)};max={max_repeticiones}".encode()),
+        ]
+
+
+def _antes_de_ejecutar(conn, cursor, statement, parameters, context, executemany):
+    perfiles = _perfiles_activos.get()
+    if perfiles:
+        inicio = time.perf_counter()
+        for perfil in perfiles:
+            perfil._inicio.append(inicio)
+
+
+def _despues_de_ejecutar(conn, cursor, statement, parameters, context, executemany):
+    perfiles = _perfiles_activos.get()
+    if perfiles:
+        fin = time.perf_counter()
+        forma = forma_sentencia(statement)
+        for perfil in perfiles:
+            if perfil._inicio:
+                perfil.tiempo += fin - perfil._inicio.pop()
+                perfil.consultas += 1
+                perfil.formas[forma] += 1
+
+
+def instrumentar_engine(engine: Engine):
+    """Registrar los listeners (sin coste apreciable si no hay perfil activo)"""
+    if not event.contains(engine, "before_cursor_execute", _antes_de_ejecutar):
+        event.listen(engine, "before_cursor_execute", _antes_de_ejecutar)
+        event.listen(engine, "after_cursor_execute", _despues_de_ejecutar)
+
+
+@contextmanager
+def perfilar():
+    """Perfilar las consultas ejecutadas dentro del bloque"""
+    perfil = PerfilSQL()
+    token = _perfiles_activos.set(_perfiles_activos.get() + (perfil,))
+    try:
+        yield perfil
+    finally:
+        _perfiles_activos.reset(token)
+
+
+@contextmanager
+def presupuesto_consultas(max_consultas: int, engine: Engine = None):
+    """
+    Fallar si el bloque ejecuta más de `max_consultas` consultas.
+    Pensado para tests: `with presupuesto_consultas(4): client.get("/api/zonas/")`
+    """
+    if engine is None:
+        from ..database import engine
+    instrumentar_engine(engine)
+
+    with perfilar() as perfil:
+        yield perfil
+
+    if perfil.consultas > max_consultas:
+        detalle = "\n".join(f"  {n}x {forma}" for forma, n in perfil.formas.most_common(5))
+        raise AssertionError(
+            f"Se ejecutaron {perfil.consultas} consultas (máximo {max_consultas}):\n{detalle}"
+        )
+
+
+class PerfilSQLMiddleware:
+    """
+    Middleware ASGI opcional (PERFIL_SQL=True).
+    Añade cabeceras X-SQL-Consultas, X-SQL-Tiempo-ms y X-SQL-Repetidas y avisa
+    en el log de las peticiones que superan el presupuesto o parecen N+1.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with perfilar() as perfil:
+            async def send_con_cabeceras(mensaje):
+                if mensaje["type"] == "http.response.start":
+                    mensaje = dict(mensaje)
+                    mensaje["headers"] = list(mensaje.get("headers", [])) + perfil.cabeceras()
+                await send(mensaje)
+
+            await self.app(scope, receive, send_con_cabeceras)
+
+        repetidas = perfil.repetidas()
+        if (perfil.consultas > settings.PERFIL_SQL_MAX_CONSULTAS
+                or perfil.tiempo_ms > settings.PERFIL_SQL_MAX_MS
+                or repetidas):
+            logger.warning(
+                "%s %s: %d consultas, %.1f ms en BD%s",
+                scope["method"],
+                scope["path"],
+                perfil.consultas,
+                perfil.tiempo_ms,
+                "".join(f"\n  posible N+1 ({n}x): {forma[:200]}" for forma, n in repetidas[:3])
+            )
@@ -0,0 +1,107 @@
+"""
+Registro en memoria del estado de los vehículos para la ingesta LPR
+- Por matrícula solo se guarda lo que necesita una detección: id, en_instalaciones
+  y zona_actual_id (objetos con __slots__, claves internadas)
+- procesar_deteccion decide con el estado del registro y lo escribe con un UPDATE
+  condicionado a que la fila siga en ese estado (misma matrícula, en_instalaciones
+  y zona): en el caso común no hay SELECT del vehículo
+- Si el UPDATE no afecta a ninguna fila, el registro estaba desfasado (otro worker,
+  movimiento manual, edición, transacción deshecha): se recarga de la BD y se reintenta.
+  Por eso no hace falta invalidarlo entre workers.
+"""
+import logging
+import sys
+import threading
+from typing import Dict, Optional
+
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..database import SessionLocal
+from ..models.vehiculo import Vehiculo
+from .metricas import registrar_cache
+
+logger = logging.getLogger("sigv.registro_vehiculos")
+
+
+class EstadoVehiculo:
+    """Estado mínimo de un vehículo para decidir el tipo de movimiento"""
+    __slots__ = ("id", "en_instalaciones", "zona_actual_id")
+
+    def __init__(self, id: int, en_instalaciones: bool, zona_actual_id: Optional[int]):
+        self.id = id
+        self.en_instalaciones = en_instalaciones
+        self.zona_actual_id = zona_actual_id
+
+
+class RegistroVehiculos:
+    """Matrícula normalizada -> EstadoVehiculo, acotado a `maximo` entradas"""
+
+    def __init__(self, maximo: int):
+        self.maximo = maximo
+        self._datos: Dict[str, EstadoVehiculo] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._datos)
+
+    def obtener(self, matricula: str) -> Optional[EstadoVehiculo]:
+        estado = self._datos.get(matricula)
+        registrar_cache("registro_vehiculos", estado is not None)
+        return estado
+
+    def guardar(self, matricula: str, id: int, en_instalaciones: bool,
+                zona_actual_id: Optional[int]) -> EstadoVehiculo:
+        estado = EstadoVehiculo(id, en_instalaciones, zona_actual_id)
+        with self._lock:
+            # Lleno: no se añaden más (esas matrículas se consultan en la BD cada vez)
+            if matricula in self._datos or len(self._datos) < self.maximo:
+                self._datos[sys.intern(matricula)] = estado
+        return estado
+
+    def olvidar(self, matricula: str):
+        with self._lock:
+            self._datos.pop(matricula, None)
+
+    def cargar(self, db: Session, matricula: str) -> Optional[EstadoVehiculo]:
+        """Leer el estado de la BD (solo las tres columnas) y guardarlo; None si no existe"""
+        fila = db.query(Vehiculo.id, Vehiculo.en_instalaciones, Vehiculo.zona_actual_id).filter(
+            Vehiculo.matricula == matricula
+        ).first()
+        if fila is None:
+            self.olvidar(matricula)
+            return None
+        return self.guardar(matricula, *fila)
+
+    def precargar(self, db: Session, lote: int = 10_000) -> int:
+        """Cargar los vehículos activos (al arrancar) para que las primeras detecciones no consulten"""
+        consulta = db.query(
+            Vehiculo.matricula, Vehiculo.id, Vehiculo.en_instalaciones, Vehiculo.zona_actual_id
+        ).filter(Vehiculo.activo == True).order_by(Vehiculo.fecha_ultimo_movimiento.desc())
+        cargados = 0
+        for matricula, *estado in consulta.limit(self.maximo).yield_per(lote):
+            self.guardar(matricula, *estado)
+            cargados += 1
+        return cargados
+
+    def limpiar(self):
+        with self._lock:
+            self._datos.clear()
+
+
+registro_vehiculos = RegistroVehiculos(settings.REGISTRO_VEHICULOS_MAXIMO)
+
+
+def precargar_registro() -> int:
+    """Precarga al arrancar (REGISTRO_VEHICULOS_PRECARGA); sin BD se arranca con el registro vacío"""
+    if not settings.REGISTRO_VEHICULOS_PRECARGA:
+        return 0
+    db = SessionLocal()
+    try:
+        return registro_vehiculos.precargar(db)
+    except SQLAlchemyError as e:
+        logger.warning("No se pudo precargar el registro de vehículos: %s", e)
+        return 0
+    finally:
+        db.close()
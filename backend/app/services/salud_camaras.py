@@ -0,0 +1,201 @@
+"""
+Sondeo de salud de las cámaras (SONDEO_CAMARAS_INTERVALO > 0)
+- Cada intervalo (con variación aleatoria) se abre una conexión TCP a ip:puerto de
+  todas las cámaras activas con IP, en paralelo y con timeout
+- El estado se lleva en memoria: una cámara pasa a offline tras SONDEO_CAMARAS_FALLOS
+  fallos seguidos y a online con la primera respuesta
+- Solo los cambios de estado se escriben en la BD, en un único UPDATE por ciclo;
+  ultimo_ping guarda la última respuesta conocida en el momento del cambio
+- Con varios workers sondea solo uno (advisory lock de PostgreSQL)
+"""
+import asyncio
+import logging
+import random
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from prometheus_client import Gauge
+from sqlalchemy import create_engine, text, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.pool import NullPool
+
+from ..config import settings
+from ..database import SessionLocal
+from ..models.zona import Camara
+from .invalidacion import publicar_invalidacion
+from .versiones import ZONAS
+
+logger = logging.getLogger("sigv.salud_camaras")
+
+PUERTO_POR_DEFECTO = 554  # RTSP
+CLAVE_LOCK = 0x53494756_01  # "SIGV" + 1: advisory lock del sondeo
+VARIACION_INTERVALO = 0.2  # ±20 %, para no sondear todas las instancias a la vez
+
+camara_online = Gauge(
+    "sigv_camara_online",
+    "Estado de la cámara según el último sondeo (1 = online)",
+    ["camara"],
+    multiprocess_mode="livemax"
+)
+
+
+class EstadoCamara:
+    """Estado en memoria de una cámara sondeada"""
+    __slots__ = ("codigo", "online", "fallos", "ultima_respuesta")
+
+    def __init__(self, codigo: str, online: bool, ultima_respuesta: Optional[datetime]):
+        self.codigo = codigo
+        self.online = online
+        self.fallos = 0
+        self.ultima_respuesta = ultima_respuesta
+
+
+_estado = {"tarea": None, "engine": None, "conexion_lider": None}
+_camaras: Dict[int, EstadoCamara] = {}
+
+
+async def sondear(ip: str, puerto: int, timeout: float) -> bool:
+    """True si la cámara acepta una conexión TCP antes del timeout"""
+    try:
+        _, escritor = await asyncio.wait_for(asyncio.open_connection(ip, puerto), timeout)
+    except (OSError, asyncio.TimeoutError):
+        return False
+    escritor.close()
+    try:
+        await escritor.wait_closed()
+    except OSError:
+        pass
+    return True
+
+
+def _cargar_camaras() -> List[tuple]:
+    db = SessionLocal()
+    try:
+        return db.query(
+            Camara.id, Camara.codigo, Camara.ip, Camara.puerto, Camara.online, Camara.ultimo_ping
+        ).filter(Camara.activo == True, Camara.ip.isnot(None), Camara.ip != "").all()
+    finally:
+        db.close()
+
+
+def _guardar_cambios(cambios: List[dict]):
+    db = SessionLocal()
+    try:
+        # UPDATE ... WHERE id = :id con todas las filas en una sola sentencia (executemany)
+        db.execute(update(Camara), cambios)
+        db.commit()
+    finally:
+        db.close()
+
+
+def _es_lider() -> bool:
+    """En PostgreSQL, solo el worker con el advisory lock sondea; se reintenta cada ciclo"""
+    engine = _estado["engine"]
+    if engine.dialect.name != "postgresql":
+        return True
+    conexion = _estado["conexion_lider"]
+    if conexion is not None:
+        try:
+            conexion.execute(text("SELECT 1"))
+            return True
+        except SQLAlchemyError:
+            _estado["conexion_lider"] = None  # Conexión perdida: el lock se ha liberado
+            conexion.close()
+
+    conexion = engine.connect().execution_options(isolation_level="AUTOCOMMIT")
+    try:
+        if conexion.execute(text("SELECT pg_try_advisory_lock(:clave)"), {"clave": CLAVE_LOCK}).scalar():
+            _estado["conexion_lider"] = conexion
+            return True
+    except SQLAlchemyError:
+        logger.warning("No se pudo comprobar el lock del sondeo de cámaras", exc_info=True)
+    conexion.close()
+    return False
+
+
+async def ciclo_sondeo() -> List[dict]:
+    """Sondear todas las cámaras una vez; devuelve los cambios de estado guardados"""
+    camaras = await asyncio.to_thread(_cargar_camaras)
+    limite = asyncio.Semaphore(settings.SONDEO_CAMARAS_CONCURRENCIA)
+
+    async def sondear_limitado(camara) -> bool:
+        async with limite:
+            return await sondear(camara.ip, camara.puerto or PUERTO_POR_DEFECTO, settings.SONDEO_CAMARAS_TIMEOUT)
+
+    respuestas = await asyncio.gather(*[sondear_limitado(camara) for camara in camaras])
+    ahora = datetime.utcnow()
+
+    cambios = []
+    vigentes = set()
+    for camara, responde in zip(camaras, respuestas):
+        vigentes.add(camara.id)
+        estado = _camaras.get(camara.id)
+        if estado is None:
+            estado = _camaras[camara.id] = EstadoCamara(camara.codigo, bool(camara.online), camara.ultimo_ping)
+
+        if responde:
+            estado.fallos = 0
+            estado.ultima_respuesta = ahora
+            if not estado.online:
+                estado.online = True
+                cambios.append({"id": camara.id, "online": True, "ultimo_ping": ahora})
+                logger.info("Cámara %s online", camara.codigo)
+        else:
+            estado.fallos += 1
+            if estado.online and estado.fallos >= settings.SONDEO_CAMARAS_FALLOS:
+                estado.online = False
+                cambios.append({"id": camara.id, "online": False, "ultimo_ping": estado.ultima_respuesta})
+                logger.warning("Cámara %s offline (%d sondeos sin respuesta)", camara.codigo, estado.fallos)
+        camara_online.labels(camara.codigo).set(1 if estado.online else 0)
+
+    # Cámaras desactivadas, borradas o sin IP: olvidar su estado
+    for camara_id in set(_camaras) - vigentes:
+        camara_online.remove(_camaras.pop(camara_id).codigo)
+
+    if cambios:
+        await asyncio.to_thread(_guardar_cambios, cambios)
+        publicar_invalidacion(ZONAS)
+    return cambios
+
+
+async def _bucle():
+    while True:
+        inicio = time.monotonic()
+        try:
+            if await asyncio.to_thread(_es_lider):
+                await ciclo_sondeo()
+        except SQLAlchemyError as e:
+            # Sin BD no se puede guardar: se olvida el estado y se recalcula en el siguiente ciclo
+            logger.warning("Sondeo de cámaras sin base de datos (%s)", e)
+            _camaras.clear()
+        except Exception:
+            logger.exception("Error en el sondeo de cámaras")
+
+        intervalo = settings.SONDEO_CAMARAS_INTERVALO * random.uniform(1 - VARIACION_INTERVALO, 1 + VARIACION_INTERVALO)
+        await asyncio.sleep(max(0.0, intervalo - (time.monotonic() - inicio)))
+
+
+def iniciar_sondeo_camaras(engine: Engine):
+    """Arrancar el sondeo en segundo plano (en el lifespan)"""
+    if settings.SONDEO_CAMARAS_INTERVALO <= 0 or _estado["tarea"] is not None:
+        return
+    # El lock de líder vive en una conexión propia, fuera del pool de las peticiones
+    _estado["engine"] = create_engine(engine.url, poolclass=NullPool) if engine.dialect.name == "postgresql" else engine
+    _estado["tarea"] = asyncio.create_task(_bucle())
+
+
+async def detener_sondeo_camaras():
+    tarea = _estado["tarea"]
+    if tarea is None:
+        return
+    tarea.cancel()
+    try:
+        await tarea
+    except asyncio.CancelledError:
+        pass
+    if _estado["conexion_lider"] is not None:
+        _estado["conexion_lider"].close()
+    _estado.update(tarea=None, engine=None, conexion_lider=None)
+    _camaras.clear()
@@ -0,0 +1,33 @@
+"""
+Serialización rápida de listados
+- Los endpoints construyen diccionarios directamente desde las filas SQL
+- La lista completa se valida una sola vez con un TypeAdapter de pydantic
+  y se codifica a JSON en pydantic-core, sin crear un modelo por fila
+  ni revalidar después con response_model
+"""
+from functools import lru_cache
+from typing import Any, Dict, List, Type
+
+from fastapi import Response
+from pydantic import BaseModel, TypeAdapter
+
+
+@lru_cache(maxsize=None)
+def adaptador_lista(modelo: Type[BaseModel]) -> TypeAdapter:
+    """TypeAdapter de List[modelo], creado una vez por modelo"""
+    return TypeAdapter(List[modelo])
+
+
+def serializar_lista(modelo: Type[BaseModel], filas: List[Dict[str, Any]]) -> bytes:
+    """Validar todas las filas de una vez contra el modelo y devolver el JSON"""
+    adaptador = adaptador_lista(modelo)
+    return adaptador.dump_json(adaptador.validate_python(filas))
+
+
+def respuesta_lista(modelo: Type[BaseModel], filas: List[Dict[str, Any]]) -> Response:
+    """
+    Respuesta JSON ya serializada.
+    El endpoint mantiene response_model para la documentación OpenAPI;
+    FastAPI no vuelve a validar cuando se devuelve un Response.
+    """
+    return Response(content=serializar_lista(modelo, filas), media_type="application/json")
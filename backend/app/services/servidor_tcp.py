@@ -0,0 +1,260 @@
+"""
+Listener TCP para cámaras LPR (TCP_LPR_PUERTO > 0)
+Conexiones persistentes con un protocolo de texto, una detección por línea:
+
+    CAMARA|MATRICULA[|CONFIANZA[|EVENTO_ID]]\n          ej: LPR-1|1234BCD|96.5|cam1-000123
+    {"camara_codigo": "LPR-1", "matricula": "1234BCD", ...}\n   (mismos campos que /lpr/detectar)
+
+Por cada línea se responde, en el mismo orden, una línea:
+
+    OK <accion> <vehiculo_id>        detección aplicada (o reintento de un evento ya registrado)
+    OK encolada <secuencia>          con INGESTA_DIFERIDA
+    ERR <motivo>
+
+Si TCP_LPR_CLAVE está definida, la primera línea debe ser "CLAVE <clave>".
+Las líneas recibidas juntas en una conexión se aplican en una sola transacción
+(o un solo fsync en la cola de ingesta). Con varios workers el puerto se comparte
+con SO_REUSEPORT (Linux) y el kernel reparte las conexiones.
+"""
+import asyncio
+import json
+import logging
+import socket
+import time
+from typing import Callable, List, Optional
+
+from prometheus_client import Gauge
+from sqlalchemy.exc import OperationalError
+
+from ..config import settings
+from .cola_ingesta import cola_activa, encolar_detecciones
+from .idempotencia import eventos_recientes
+
+logger = logging.getLogger("sigv.servidor_tcp")
+
+LONGITUD_MAXIMA_LINEA = 4096
+LOTES_EN_ESPERA_MAXIMO = 8  # Lotes sin procesar antes de dejar de leer del socket
+
+conexiones_tcp = Gauge(
+    "sigv_lpr_tcp_conexiones",
+    "Conexiones TCP de cámaras LPR abiertas",
+    multiprocess_mode="livesum"
+)
+
+_estado = {"servidor": None, "aplicar": None, "conexiones": set()}
+
+
+def interpretar_linea(texto: str) -> dict:
+    """Línea del protocolo a registro de detección ({"m", "c", "f", "e"}); ValueError si no es válida"""
+    if texto.startswith("{"):
+        datos = json.loads(texto)
+        if not isinstance(datos, dict):
+            raise ValueError("se esperaba un objeto JSON")
+        camara, matricula = datos.get("camara_codigo"), datos.get("matricula")
+        confianza, evento_id = datos.get("confianza"), datos.get("evento_id")
+        imagen_url = datos.get("imagen_url")
+    else:
+        partes = texto.split("|")
+        if len(partes) < 2 or len(partes) > 4:
+            raise ValueError("formato: CAMARA|MATRICULA[|CONFIANZA[|EVENTO_ID]]")
+        camara, matricula = partes[0], partes[1]
+        confianza = partes[2] if len(partes) > 2 and partes[2] else None
+        evento_id = partes[3] if len(partes) > 3 and partes[3] else None
+        imagen_url = None
+
+    if not camara or not matricula:
+        raise ValueError("faltan cámara o matrícula")
+    if evento_id and len(evento_id) > 64:
+        raise ValueError("evento_id demasiado largo")
+    try:
+        confianza = float(confianza) if confianza is not None else None
+    except ValueError:
+        raise ValueError(f"confianza no válida: {confianza}")
+    return {
+        "m": matricula.strip(),
+        "c": camara.strip().upper(),
+        "f": confianza,
+        "i": imagen_url,
+        "e": evento_id,
+    }
+
+
+def _linea_respuesta(respuesta: dict) -> str:
+    """Respuesta (la misma que guarda /lpr/detectar en la caché de eventos) a línea del protocolo"""
+    if "secuencia" in respuesta:
+        return f"OK encolada {respuesta['secuencia']}"
+    resultado = respuesta["resultado"]
+    return f"OK {resultado['accion']} {resultado['vehiculo_id']}"
+
+
+async def procesar_lineas(lineas: List[str]) -> List[str]:
+    """Procesar un lote de líneas de una conexión; devuelve una línea de respuesta por cada una"""
+    respuestas: List[Optional[str]] = [None] * len(lineas)
+    pendientes = []  # (posición, registro)
+    repetidas = {}  # posición -> posición anterior del mismo evento_id en el lote
+    en_lote = {}
+    instante = time.time()
+
+    for i, linea in enumerate(lineas):
+        try:
+            registro = interpretar_linea(linea)
+        except (ValueError, TypeError) as e:
+            respuestas[i] = f"ERR {e}"
+            continue
+        if registro["e"]:
+            anterior = eventos_recientes.obtener(registro["e"])
+            if anterior is not None:
+                respuestas[i] = _linea_respuesta(anterior)
+                continue
+            if registro["e"] in en_lote:
+                repetidas[i] = en_lote[registro["e"]]
+                continue
+            en_lote[registro["e"]] = i
+        registro["t"] = instante
+        pendientes.append((i, registro))
+
+    if pendientes:
+        registros = [registro for _, registro in pendientes]
+        if cola_activa():
+            secuencias = await encolar_detecciones(registros)
+            resultados = [{"mensaje": "Detección encolada", "secuencia": s} for s in secuencias]
+        else:
+            try:
+                resultados = await asyncio.to_thread(_estado["aplicar"], registros)
+            except OperationalError:
+                logger.exception("Base de datos no disponible en el listener TCP")
+                resultados = ["base de datos no disponible"] * len(registros)
+            resultados = [
+                {"mensaje": "Detección registrada", "resultado": r} if isinstance(r, dict) else r
+                for r in resultados
+            ]
+
+        for (i, registro), resultado in zip(pendientes, resultados):
+            if isinstance(resultado, str):
+                respuestas[i] = f"ERR {resultado}"
+                continue
+            if registro["e"]:
+                eventos_recientes.guardar(registro["e"], resultado)
+            respuestas[i] = _linea_respuesta(resultado)
+
+    for i, original in repetidas.items():
+        respuestas[i] = respuestas[original]
+    return respuestas
+
+
+class ProtocoloLPR(asyncio.Protocol):
+    """Una conexión de cámara: separa líneas y las procesa en orden, por lotes"""
+
+    def __init__(self):
+        self.transporte = None
+        self.buffer = b""
+        self.lotes: asyncio.Queue = asyncio.Queue()
+        self.tarea = None
+        self.autenticado = not settings.TCP_LPR_CLAVE
+        self.pausado = False
+
+    def connection_made(self, transporte):
+        self.transporte = transporte
+        self.tarea = asyncio.create_task(self._procesar())
+        _estado["conexiones"].add(self)
+        conexiones_tcp.inc()
+
+    def data_received(self, datos: bytes):
+        self.buffer += datos
+        *lineas, self.buffer = self.buffer.split(b"\n")
+        if len(self.buffer) > LONGITUD_MAXIMA_LINEA:
+            self.transporte.write(b"ERR linea demasiado larga\n")
+            self.transporte.close()
+            return
+
+        lineas = [l.decode("utf-8", "replace").strip() for l in lineas]
+        lineas = [l for l in lineas if l]
+        if lineas:
+            self.lotes.put_nowait(lineas)
+        if self.lotes.qsize() >= LOTES_EN_ESPERA_MAXIMO and not self.pausado:
+            self.transporte.pause_reading()
+            self.pausado = True
+
+    def eof_received(self):
+        # La cámara ha terminado de enviar: responder lo pendiente antes de cerrar
+        self.lotes.put_nowait(None)
+        return True
+
+    def connection_lost(self, exc):
+        self.lotes.put_nowait(None)
+        _estado["conexiones"].discard(self)
+        conexiones_tcp.dec()
+
+    async def _procesar(self):
+        fin = False
+        while not fin:
+            lineas = await self.lotes.get()
+            if lineas is None:
+                break
+            # Juntar lo que haya llegado mientras se procesaba el lote anterior
+            while not self.lotes.empty() and len(lineas) < settings.TCP_LPR_LOTE:
+                siguiente = self.lotes.get_nowait()
+                if siguiente is None:
+                    fin = True
+                    break
+                lineas.extend(siguiente)
+
+            if self.pausado and self.lotes.qsize() < LOTES_EN_ESPERA_MAXIMO // 2:
+                self.transporte.resume_reading()
+                self.pausado = False
+
+            if not self.autenticado:
+                if lineas[0] != f"CLAVE {settings.TCP_LPR_CLAVE}":
+                    self.transporte.write(b"ERR clave incorrecta\n")
+                    self.transporte.close()
+                    return
+                self.autenticado = True
+                self.transporte.write(b"OK\n")
+                lineas = lineas[1:]
+
+            for inicio in range(0, len(lineas), settings.TCP_LPR_LOTE):
+                try:
+                    respuestas = await procesar_lineas(lineas[inicio:inicio + settings.TCP_LPR_LOTE])
+                except Exception:
+                    logger.exception("Error procesando un lote TCP")
+                    respuestas = ["ERR error interno"] * len(lineas[inicio:inicio + settings.TCP_LPR_LOTE])
+                if self.transporte.is_closing():
+                    return
+                self.transporte.write("".join(r + "\n" for r in respuestas).encode())
+        self.transporte.close()
+
+
+async def iniciar_servidor_tcp(aplicar: Callable[[List[dict]], list]):
+    """Abrir el puerto TCP de cámaras (en el lifespan); no hace nada si TCP_LPR_PUERTO = 0"""
+    if not settings.TCP_LPR_PUERTO or _estado["servidor"] is not None:
+        return
+    _estado["aplicar"] = aplicar
+    loop = asyncio.get_running_loop()
+    try:
+        _estado["servidor"] = await loop.create_server(
+            ProtocoloLPR,
+            host=settings.TCP_LPR_HOST,
+            port=settings.TCP_LPR_PUERTO,
+            reuse_port=hasattr(socket, "SO_REUSEPORT")
+        )
+    except OSError as e:
+        logger.warning("No se pudo abrir el puerto TCP %s para cámaras LPR: %s", settings.TCP_LPR_PUERTO, e)
+
+
+async def detener_servidor_tcp(espera: float = 5):
+    """Dejar de aceptar conexiones, responder lo ya recibido y cerrar las conexiones abiertas"""
+    servidor = _estado["servidor"]
+    if servidor is None:
+        return
+    servidor.close()
+    conexiones = list(_estado["conexiones"])
+    for conexion in conexiones:
+        conexion.transporte.pause_reading()
+        conexion.lotes.put_nowait(None)
+    tareas = [conexion.tarea for conexion in conexiones]
+    if tareas:
+        await asyncio.wait(tareas, timeout=espera)
+    for conexion in conexiones:
+        conexion.transporte.close()
+    await servidor.wait_closed()
+    _estado.update(servidor=None, aplicar=None)
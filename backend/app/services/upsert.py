@@ -0,0 +1,94 @@
+"""
+INSERT ... ON CONFLICT atómico para PostgreSQL y SQLite
+Evita la carrera "SELECT, no existe, INSERT" entre peticiones o workers: la propia
+base de datos decide quién inserta y el resto ve la fila ya existente sin error.
+"""
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import insert
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+
+def insertar_si_no_existe(db: Session, modelo, valores: Dict, conflicto: List[str],
+                          donde=None) -> Optional[int]:
+    """
+    Insertar una fila salvo que ya exista otra con los mismos valores en `conflicto`
+    (columnas de una restricción única; `donde` = condición de un índice único
+    parcial). Devuelve el id insertado o None si ya existía.
+    Con PostgreSQL, si otra transacción acaba de insertar la misma clave, espera a
+    que confirme o deshaga antes de decidir.
+    """
+    insertar = _INSERTS.get(db.get_bind().dialect.name)
+    if insertar is not None:
+        sentencia = (
+            insertar(modelo)
+            .values(**valores)
+            .on_conflict_do_nothing(index_elements=conflicto, index_where=donde)
+            .returning(modelo.id)
+        )
+        return db.execute(sentencia).scalar()
+
+    # Otros motores: savepoint y restricción única
+    try:
+        with db.begin_nested():
+            fila = modelo(**valores)
+            db.add(fila)
+        return fila.id
+    except IntegrityError:
+        return None
+
+
+def insertar_desde_consulta(db: Session, modelo, columnas: List[str], consulta, conflicto: List[str],
+                            donde=None) -> int:
+    """
+    INSERT ... SELECT que omite las filas que chocan con una restricción única
+    (`conflicto`, `donde` como en insertar_si_no_existe). Devuelve las filas insertadas.
+    """
+    insertar = _INSERTS.get(db.get_bind().dialect.name)
+    if insertar is not None:
+        sentencia = insertar(modelo).from_select(columnas, consulta).on_conflict_do_nothing(
+            index_elements=conflicto, index_where=donde
+        )
+    else:
+        # Otros motores: la restricción única rechaza la sentencia entera si hay choque
+        sentencia = insert(modelo).from_select(columnas, consulta)
+    return db.execute(sentencia).rowcount
+
+
+def insertar_o_actualizar(db: Session, modelo, filas: List[Dict], conflicto: List[str],
+                          actualizar: Optional[Dict[str, Any]] = None, acumular: Iterable[str] = ()):
+    """
+    Upsert en bloque: una sola sentencia INSERT ... ON CONFLICT DO UPDATE para todas
+    las filas (todas con las mismas claves). Las filas que ya existen (mismos valores
+    en `conflicto`) reciben el resto de columnas, más los valores de `actualizar`;
+    las columnas de `acumular` se suman al valor existente en lugar de sustituirlo.
+    """
+    if not filas:
+        return
+    acumular = set(acumular)
+    insertar = _INSERTS.get(db.get_bind().dialect.name)
+    if insertar is not None:
+        sentencia = insertar(modelo).values(filas)
+        columnas = {
+            c: getattr(modelo, c) + sentencia.excluded[c] if c in acumular else sentencia.excluded[c]
+            for c in filas[0] if c not in conflicto
+        }
+        columnas.update(actualizar or {})
+        db.execute(sentencia.on_conflict_do_update(index_elements=conflicto, set_=columnas))
+        return
+
+    # Otros motores: fila a fila
+    for fila in filas:
+        existente = db.query(modelo).filter(*(getattr(modelo, c) == fila[c] for c in conflicto)).first()
+        if existente is None:
+            db.add(modelo(**fila))
+            continue
+        for columna, valor in {**fila, **(actualizar or {})}.items():
+            if columna in acumular:
+                valor = getattr(existente, columna) + valor
+            setattr(existente, columna, valor)
+    db.flush()
@@ -0,0 +1,145 @@
+"""
+Versiones de recursos y GET condicional (ETag / If-None-Match)
+- Cada recurso (zonas, etiquetas, vehiculos...) tiene una versión (global, local)
+- La global es la de la tabla versiones_recursos: la incrementa el envío del NOTIFY
+  y llega a todos los workers en él, así que todos calculan el mismo ETag
+- La local cuenta las invalidaciones aún sin versión global (la escritura de este
+  worker antes de que salga su NOTIFY, o todas si no hay bus); vuelve a 0 al recibirla
+- Las rutas de lectura calculan el ETag a partir de las versiones y
+  responden 304 sin ejecutar consultas si el cliente ya tiene la versión
+- CacheVersionada guarda en memoria datos de referencia mientras no cambie
+  la versión de los recursos de los que dependen
+"""
+import hashlib
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+
+from fastapi import Depends, HTTPException, Request, Response, status
+
+from ..api.auth import get_current_user
+from ..models.usuario import Usuario
+from .invalidacion import suscribir, suscribir_versiones
+from .metricas import registrar_cache
+
+# Recursos versionados
+ZONAS = "zonas"
+ETIQUETAS = "etiquetas"
+CAMPOS = "campos"
+VEHICULOS = "vehiculos"
+MOVIMIENTOS = "movimientos"
+ALERTAS = "alertas"
+
+# Versión global de los recursos que no están en _globales. Sin bus (sin PostgreSQL) es
+# el instante de arranque, para que un reinicio no repita ETag; al leer la tabla pasa a 0.
+_base = {"global": time.time_ns()}
+_globales: Dict[str, int] = {}
+_locales: Dict[str, int] = {}
+_lock = threading.Lock()
+
+
+def incrementar_version(*recursos: str):
+    """
+    Marcar recursos como modificados solo en este worker. Las escrituras deben usar
+    publicar_invalidacion(), que llega aquí en todos los workers por el bus.
+    """
+    with _lock:
+        for recurso in recursos:
+            _locales[recurso] = _locales.get(recurso, 0) + 1
+
+
+@suscribir
+def _invalidar_versiones(recursos):
+    """Aplicar en este worker las invalidaciones publicadas por cualquier worker"""
+    # None (notificaciones perdidas): el bus vuelve a leer la tabla de versiones
+    if recursos is not None:
+        incrementar_version(*recursos)
+
+
+@suscribir_versiones
+def fijar_versiones(versiones: Dict[str, int], completo: bool = False):
+    """Adoptar las versiones globales (del NOTIFY, o la tabla completa al conectar)"""
+    with _lock:
+        if completo:
+            _base["global"] = 0
+            _locales.clear()
+        for recurso, version in versiones.items():
+            _globales[recurso] = max(_globales.get(recurso, 0), version)
+            _locales.pop(recurso, None)
+
+
+def obtener_version(recurso: str) -> tuple:
+    return _globales.get(recurso, _base["global"]), _locales.get(recurso, 0)
+
+
+def clave_versiones(*recursos: str) -> tuple:
+    """Versiones actuales de los recursos (cambia con cualquier invalidación que les afecte)"""
+    return tuple(obtener_version(r) for r in recursos)
+
+
+class CacheVersionada:
+    """
+    Valor cargado de la BD y guardado en memoria del worker mientras no cambie la
+    versión de `recursos`. La versión se lee antes de cargar: si una escritura la
+    cambia durante la carga, la siguiente lectura vuelve a cargar.
+    """
+
+    def __init__(self, nombre: str, recursos: tuple, cargar: Callable[[Any], Any]):
+        self.nombre = nombre
+        self.recursos = recursos
+        self._cargar = cargar
+        self._entrada: Optional[tuple] = None  # (clave de versiones, valor)
+
+    def obtener(self, db, recargar: bool = False) -> Any:
+        clave = clave_versiones(*self.recursos)
+        entrada = self._entrada
+        acierto = not recargar and entrada is not None and entrada[0] == clave
+        registrar_cache(self.nombre, acierto)
+        if acierto:
+            return entrada[1]
+        valor = self._cargar(db)
+        self._entrada = (clave, valor)
+        return valor
+
+
+def calcular_etag(request: Request, *recursos: str) -> str:
+    """
+    ETag débil a partir de la ruta, los parámetros y las versiones.
+    Incluye la fecha para que los contadores "de hoy" caduquen a medianoche.
+    """
+    partes = [
+        request.url.path,
+        str(request.query_params),
+        datetime.utcnow().date().isoformat()
+    ]
+    partes.extend("{}:{}.{}".format(r, *obtener_version(r)) for r in recursos)
+    digest = hashlib.blake2b("|".join(partes).encode(), digest_size=12).hexdigest()
+    return f'W/"{digest}"'
+
+
+def verificar_etag(*recursos: str):
+    """
+    Dependency para endpoints de lectura.
+    Si If-None-Match coincide responde 304 antes de ejecutar el endpoint;
+    si no, añade la cabecera ETag a la respuesta.
+    """
+    async def dependencia(
+        request: Request,
+        response: Response,
+        current_user: Usuario = Depends(get_current_user)
+    ):
+        etag = calcular_etag(request, *recursos)
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match:
+            etiquetas = [e.strip() for e in if_none_match.split(",")]
+            if etag in etiquetas or "*" in etiquetas:
+                registrar_cache("etag", True)
+                raise HTTPException(
+                    status_code=status.HTTP_304_NOT_MODIFIED,
+                    headers={"ETag": etag}
+                )
+        registrar_cache("etag", False)
+        response.headers["ETag"] = etag
+
+    return dependencia
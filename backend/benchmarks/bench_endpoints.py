@@ -0,0 +1,166 @@
+"""
+Benchmark de los endpoints más usados contra una base de datos sintética
+- Latencia (mediana y p95) y número de consultas SQL por petición
+- Guarda los resultados como línea base en JSON y, en ejecuciones posteriores,
+  marca como regresión lo que empeore más allá de la tolerancia
+
+Las consultas SQL no dependen de la máquina: cualquier aumento es una regresión.
+La latencia sí, por eso la línea base debe generarse en la misma máquina; se compara
+la mediana (el p95 se muestra pero es demasiado ruidoso para decidir).
+
+Uso:
+    python -m benchmarks.bench_endpoints --guardar            # crear/actualizar la línea base
+    python -m benchmarks.bench_endpoints --tolerancia 0.25    # comparar (sale con código 1 si hay regresión)
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime
+from itertools import count
+
+from .comun import preparar_entorno, poblar_sintetico, cliente_autenticado
+
+LINEA_BASE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "linea_base.json")
+
+# Margen absoluto para no marcar como regresión variaciones de ruido en endpoints muy rápidos
+MARGEN_MS = 0.5
+
+
+def casos(vehiculos: int):
+    """(nombre, método, url o función que genera la url, cuerpo o función que genera el cuerpo)"""
+    from app.services.generador_datos import matricula_desde_indice
+
+    secuencia = count()
+
+    def siguiente_matricula():
+        return matricula_desde_indice(next(secuencia) % vehiculos)
+
+    return [
+        ("lpr_detectar", "POST", "/api/movimientos/lpr/detectar",
+         lambda: {"matricula": siguiente_matricula(), "camara_codigo": "LPR-1", "confianza": 95.0}),
+        ("vehiculos_listado", "GET", "/api/vehiculos/?limit=100", None),
+        ("vehiculos_listado_filtros", "GET", "/api/vehiculos/?en_instalaciones=true&limit=100", None),
+        ("vehiculos_buscar", "GET", lambda: f"/api/vehiculos/buscar/{siguiente_matricula()}", None),
+        ("dashboard_estadisticas", "GET", "/api/dashboard/estadisticas", None),
+        ("dashboard_mapa", "GET", "/api/dashboard/mapa", None),
+        ("alertas_contador", "GET", "/api/alertas/contador", None),
+        ("movimientos_recientes", "GET", "/api/movimientos/recientes?limit=100", None),
+        ("movimientos_vehiculo", "GET", "/api/movimientos/vehiculo/1?limit=200", None),
+    ]
+
+
+def ejecutar_caso(cliente, cabeceras, metodo, url, cuerpo, repeticiones: int, calentamiento: int) -> dict:
+    from app.services.perfil_sql import perfilar
+
+    latencias = []
+    consultas = []
+    for i in range(calentamiento + repeticiones):
+        url_peticion = url() if callable(url) else url
+        json_peticion = cuerpo() if callable(cuerpo) else cuerpo
+
+        with perfilar() as perfil:
+            inicio = time.perf_counter()
+            respuesta = cliente.request(metodo, url_peticion, headers=cabeceras, json=json_peticion)
+            duracion = time.perf_counter() - inicio
+        respuesta.raise_for_status()
+
+        if i >= calentamiento:
+            latencias.append(duracion * 1000)
+            consultas.append(perfil.consultas)
+
+    latencias.sort()
+    return {
+        "mediana_ms": round(statistics.median(latencias), 3),
+        "p95_ms": round(latencias[min(len(latencias) - 1, int(len(latencias) * 0.95))], 3),
+        "consultas": max(consultas),
+    }
+
+
+def comparar(resultados: dict, base: dict, tolerancia: float) -> list:
+    """Lista de regresiones (texto) respecto a la línea base"""
+    regresiones = []
+    for nombre, actual in resultados.items():
+        anterior = base.get(nombre)
+        if anterior is None:
+            continue
+        if actual["consultas"] > anterior["consultas"]:
+            regresiones.append(f"{nombre}: {anterior['consultas']} -> {actual['consultas']} consultas")
+        limite = anterior["mediana_ms"] * (1 + tolerancia) + MARGEN_MS
+        if actual["mediana_ms"] > limite:
+            regresiones.append(
+                f"{nombre}: mediana {anterior['mediana_ms']:.2f} -> {actual['mediana_ms']:.2f} ms "
+                f"(límite {limite:.2f})"
+            )
+    return regresiones
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de endpoints con línea base")
+    parser.add_argument("--vehiculos", type=int, default=2000)
+    parser.add_argument("--movimientos", type=int, default=40_000, help="Total de movimientos")
+    parser.add_argument("--repeticiones", type=int, default=50)
+    parser.add_argument("--calentamiento", type=int, default=5)
+    parser.add_argument("--tolerancia", type=float, default=0.25, help="Empeoramiento de latencia permitido (0.25 = 25%%)")
+    parser.add_argument("--linea-base", default=LINEA_BASE)
+    parser.add_argument("--guardar", action="store_true", help="Guardar los resultados como nueva línea base")
+    args = parser.parse_args()
+
+    preparar_entorno()
+    poblar_sintetico(vehiculos=args.vehiculos, movimientos=args.movimientos)
+
+    from app.database import engine
+    from app.services.perfil_sql import instrumentar_engine
+
+    instrumentar_engine(engine)
+    cliente, cabeceras = cliente_autenticado()
+
+    base = {}
+    if os.path.exists(args.linea_base) and not args.guardar:
+        with open(args.linea_base, encoding="utf-8") as f:
+            contenido = json.load(f)
+        base = contenido["resultados"]
+        if contenido["datos"] != {"vehiculos": args.vehiculos, "movimientos": args.movimientos}:
+            print(f"Aviso: la línea base se generó con otro volumen de datos ({contenido['datos']})")
+
+    print(f"\n{'Endpoint':<28}{'mediana (ms)':>14}{'p95 (ms)':>11}{'consultas':>11}{'base mediana':>14}{'base cons.':>12}")
+    print("-" * 90)
+
+    resultados = {}
+    for nombre, metodo, url, cuerpo in casos(args.vehiculos):
+        resultado = ejecutar_caso(cliente, cabeceras, metodo, url, cuerpo, args.repeticiones, args.calentamiento)
+        resultados[nombre] = resultado
+        anterior = base.get(nombre, {})
+        print(f"{nombre:<28}{resultado['mediana_ms']:>14.2f}{resultado['p95_ms']:>11.2f}{resultado['consultas']:>11}"
+              f"{anterior.get('mediana_ms', float('nan')):>14.2f}{anterior.get('consultas', '-'):>12}")
+
+    if args.guardar:
+        with open(args.linea_base, "w", encoding="utf-8") as f:
+            json.dump({
+                "fecha": datetime.utcnow().isoformat(timespec="seconds"),
+                "maquina": platform.node(),
+                "python": platform.python_version(),
+                "datos": {"vehiculos": args.vehiculos, "movimientos": args.movimientos},
+                "resultados": resultados,
+            }, f, indent=2, ensure_ascii=False)
+        print(f"\nLínea base guardada en {args.linea_base}")
+        return
+
+    if not base:
+        print("\nNo hay línea base: ejecutar con --guardar para crearla")
+        return
+
+    regresiones = comparar(resultados, base, args.tolerancia)
+    if regresiones:
+        print("\nREGRESIONES:")
+        for regresion in regresiones:
+            print(f"  {regresion}")
+        sys.exit(1)
+    print(f"\nSin regresiones (tolerancia de latencia {args.tolerancia:.0%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Benchmark del registro de estado de vehículos de la ingesta LPR
+- Memoria por cada 100.000 matrículas: registro (__slots__) frente a tener los
+  objetos Vehiculo del ORM en memoria
+- Detecciones/s y consultas SQL por detección con el registro precargado y sin él
+  (sin registro cada detección lee el estado del vehículo de la BD), en lotes como
+  la cola de ingesta / el listener TCP y de una en una como /lpr/detectar
+
+Uso:
+    python -m benchmarks.bench_registro_vehiculos --vehiculos 5000 --detecciones 5000
+"""
+import argparse
+import gc
+import random
+import time
+import tracemalloc
+from datetime import datetime
+
+from .comun import preparar_entorno, poblar_sintetico
+
+POR_CADA = 100_000
+
+
+def memoria_por_100k(crear, cantidad: int) -> float:
+    """MB retenidos por `crear(cantidad)`, escalados a 100.000 elementos"""
+    gc.collect()
+    tracemalloc.start()
+    antes = tracemalloc.get_traced_memory()[0]
+    retenido = crear(cantidad)
+    despues = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del retenido
+    return (despues - antes) / cantidad * POR_CADA / 1024 / 1024
+
+
+def medir_ingesta(matriculas: list, detecciones: int, lote: int, camaras: list) -> tuple:
+    """(detecciones/s, consultas por detección) aplicando en lotes de `lote` (1 = de una en una)"""
+    from sqlalchemy import event
+    from app.database import engine
+    from app.api.movimientos import aplicar_lote_detecciones
+
+    rnd = random.Random(7)
+    registros = [
+        {"m": rnd.choice(matriculas), "c": rnd.choice(camaras), "t": time.time(), "f": 95.0}
+        for _ in range(detecciones)
+    ]
+    consultas = {"n": 0}
+
+    def contar(*_):
+        consultas["n"] += 1
+
+    event.listen(engine, "before_cursor_execute", contar)
+    inicio = time.perf_counter()
+    for i in range(0, detecciones, lote):
+        aplicar_lote_detecciones(registros[i:i + lote])
+    duracion = time.perf_counter() - inicio
+    event.remove(engine, "before_cursor_execute", contar)
+    return detecciones / duracion, consultas["n"] / detecciones
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del registro de estado de vehículos")
+    parser.add_argument("--vehiculos", type=int, default=5000)
+    parser.add_argument("--movimientos", type=int, default=20_000)
+    parser.add_argument("--detecciones", type=int, default=5000)
+    parser.add_argument("--lote", type=int, default=100, help="Detecciones por transacción en modo lote")
+    parser.add_argument("--memoria", type=int, default=POR_CADA, help="Matrículas para medir memoria")
+    args = parser.parse_args()
+
+    preparar_entorno()
+
+    from app.models import Vehiculo
+    from app.services.generador_datos import matricula_desde_indice
+    from app.services.registro_vehiculos import RegistroVehiculos, registro_vehiculos
+
+    # --- Memoria ---
+    def con_registro(n):
+        registro = RegistroVehiculos(n)
+        for i in range(n):
+            registro.guardar(matricula_desde_indice(i), i + 1, i % 2 == 0, i % 12 or None)
+        return registro
+
+    def con_orm(n):
+        ahora = datetime.utcnow()
+        return {
+            matricula: Vehiculo(
+                id=i + 1, matricula=matricula, marca="Seat", modelo="Ibiza", color="Blanco",
+                cliente_nombre=f"Cliente {i}", activo=True, en_instalaciones=i % 2 == 0,
+                zona_actual_id=i % 12 or None, fecha_primera_entrada=ahora, fecha_ultima_entrada=ahora,
+                fecha_ultimo_movimiento=ahora, fecha_creacion=ahora
+            )
+            for i, matricula in ((i, matricula_desde_indice(i)) for i in range(n))
+        }
+
+    print(f"\nMemoria por {POR_CADA:,} matrículas (medido con {args.memoria:,}):")
+    print(f"  registro (__slots__)     {memoria_por_100k(con_registro, args.memoria):>8.1f} MB")
+    print(f"  objetos Vehiculo (ORM)   {memoria_por_100k(con_orm, args.memoria):>8.1f} MB")
+
+    # --- Ingesta ---
+    print(f"\nPreparando {args.vehiculos:,} vehículos y {args.movimientos:,} movimientos...")
+    poblar_sintetico(vehiculos=args.vehiculos, movimientos=args.movimientos)
+    matriculas = [matricula_desde_indice(i) for i in range(args.vehiculos)]
+    camaras = ["LPR-1", "LPR-2"]
+
+    from app.database import SessionLocal
+
+    print(f"\n{'Caso':<28}{'det/s':>10}{'SQL/det':>10}")
+    print("-" * 48)
+    maximo = registro_vehiculos.maximo
+    for nombre, activo, lote in [
+        ("sin registro, de una en una", False, 1),
+        ("con registro, de una en una", True, 1),
+        (f"sin registro, lotes de {args.lote}", False, args.lote),
+        (f"con registro, lotes de {args.lote}", True, args.lote),
+    ]:
+        registro_vehiculos.limpiar()
+        registro_vehiculos.maximo = maximo if activo else 0
+        if activo:
+            db = SessionLocal()
+            registro_vehiculos.precargar(db)
+            db.close()
+        por_segundo, sql = medir_ingesta(matriculas, args.detecciones, lote, camaras)
+        print(f"{nombre:<28}{por_segundo:>10,.0f}{sql:>10.2f}")
+    registro_vehiculos.maximo = maximo
+
+
+if __name__ == "__main__":
+    main()
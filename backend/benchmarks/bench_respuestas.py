@@ -0,0 +1,68 @@
+"""
+Benchmark de tamaño de respuesta y tiempo de codificación JSON
+- Bytes en la red sin comprimir vs gzip/brotli para los listados principales
+- Tiempo de codificación con el encoder JSON estándar vs orjson
+
+Uso:
+    python -m benchmarks.bench_respuestas --vehiculos 1000 --repeticiones 50
+"""
+import argparse
+import time
+
+from .comun import preparar_entorno, poblar, cliente_autenticado
+
+ENDPOINTS = [
+    "/api/dashboard/mapa",
+    "/api/vehiculos/?limit=200",
+    "/api/movimientos/recientes?limit=200",
+    "/api/movimientos/vehiculo/1?limit=500",
+]
+
+
+def medir_codificacion(clase_respuesta, contenido, repeticiones: int) -> float:
+    """Milisegundos medios para renderizar el contenido con la clase de respuesta dada"""
+    respuesta = clase_respuesta(content=None)
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        respuesta.render(contenido)
+    return (time.perf_counter() - inicio) * 1000 / repeticiones
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de compresión y codificación JSON")
+    parser.add_argument("--vehiculos", type=int, default=1000)
+    parser.add_argument("--movimientos", type=int, default=20, help="Movimientos por vehículo")
+    parser.add_argument("--repeticiones", type=int, default=50)
+    args = parser.parse_args()
+
+    preparar_entorno()
+    poblar(vehiculos=args.vehiculos, movimientos_por_vehiculo=args.movimientos)
+
+    from fastapi.responses import JSONResponse, ORJSONResponse
+
+    cliente, cabeceras = cliente_autenticado()
+
+    print(f"\n{'Endpoint':<42}{'Sin comprimir':>14}{'Comprimido':>12}{'Ratio':>8}"
+          f"{'json (ms)':>11}{'orjson (ms)':>13}")
+    print("-" * 100)
+
+    for url in ENDPOINTS:
+        plano = cliente.get(url, headers={**cabeceras, "Accept-Encoding": "identity"})
+        comprimido = cliente.get(url, headers={**cabeceras, "Accept-Encoding": "br, gzip"})
+        plano.raise_for_status()
+
+        bytes_plano = plano.num_bytes_downloaded
+        bytes_comprimido = comprimido.num_bytes_downloaded
+        codificacion = comprimido.headers.get("content-encoding", "ninguna")
+
+        contenido = plano.json()
+        ms_json = medir_codificacion(JSONResponse, contenido, args.repeticiones)
+        ms_orjson = medir_codificacion(ORJSONResponse, contenido, args.repeticiones)
+
+        print(f"{url:<42}{bytes_plano:>14,}{bytes_comprimido:>9,} {codificacion[:2]:<2}"
+              f"{bytes_plano / max(bytes_comprimido, 1):>7.1f}x"
+              f"{ms_json:>11.3f}{ms_orjson:>13.3f}")
+
+
+if __name__ == "__main__":
+    main()
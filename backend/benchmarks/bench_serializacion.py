@@ -0,0 +1,114 @@
+"""
+Benchmark de la capa de serialización de listados
+Compara, por cada 1.000 filas:
+- antes: un modelo pydantic por fila + revalidación de response_model en FastAPI
+         + jsonable_encoder + codificación JSON
+- después: validación de la lista completa con TypeAdapter y JSON en pydantic-core
+
+Uso:
+    python -m benchmarks.bench_serializacion --filas 1000 --repeticiones 20
+"""
+import argparse
+import asyncio
+import time
+from datetime import datetime, timedelta
+from typing import List
+
+from .comun import preparar_entorno
+
+
+def filas_vehiculos(n: int) -> List[dict]:
+    ahora = datetime.utcnow()
+    return [
+        {
+            "id": i, "matricula": f"{i:04d}BCD", "marca": "Seat", "modelo": "Ibiza", "color": "Rojo",
+            "año": 2018, "vin": None, "cliente_nombre": f"Cliente {i}", "cliente_telefono": "600000000",
+            "cliente_email": None, "notas": None, "activo": True, "en_instalaciones": True,
+            "zona_actual": {"id": 2, "nombre": "Campa - Parcela 15", "codigo": "CAMPA_15"},
+            "etiquetas": [{"id": 5, "nombre": "Esperando piezas", "color": "#e74c3c", "fecha_asignacion": ahora}],
+            "campos_personalizados": {"presupuesto": {"etiqueta": "Presupuesto (€)", "valor": "1200", "tipo": "numero"}},
+            "fecha_primera_entrada": ahora - timedelta(days=3), "fecha_ultima_entrada": ahora,
+            "fecha_ultimo_movimiento": ahora, "fecha_creacion": ahora,
+        }
+        for i in range(n)
+    ]
+
+
+def filas_movimientos(n: int) -> List[dict]:
+    ahora = datetime.utcnow()
+    return [
+        {
+            "id": i, "vehiculo_id": i % 100, "matricula": f"{i % 100:04d}BCD", "tipo": "entrada",
+            "zona_origen": None, "zona_destino": {"id": 1, "nombre": "Entrada Principal"},
+            "camara": {"id": 1, "codigo": "LPR-1"}, "confianza": 93.5, "fecha_hora": ahora,
+            "manual": False, "registrado_por": None, "notas": None,
+        }
+        for i in range(n)
+    ]
+
+
+def filas_alertas(n: int) -> List[dict]:
+    ahora = datetime.utcnow()
+    return [
+        {
+            "id": i, "tipo": "inactividad", "vehiculo_id": i, "vehiculo_matricula": f"{i:04d}BCD",
+            "titulo": f"Vehículo inactivo: {i:04d}BCD", "mensaje": "Lleva 21 días sin movimiento.",
+            "prioridad": "alta", "leida": False, "resuelta": False,
+            "fecha_creacion": ahora, "fecha_resolucion": None,
+        }
+        for i in range(n)
+    ]
+
+
+async def ruta_anterior(modelo, campo, filas):
+    """Camino previo: modelo por fila, serialize_response de FastAPI y render orjson"""
+    from fastapi.responses import ORJSONResponse
+    from fastapi.routing import serialize_response
+
+    objetos = [modelo(**f) for f in filas]
+    contenido = await serialize_response(field=campo, response_content=objetos)
+    return ORJSONResponse(content=None).render(contenido)
+
+
+def medir(funcion, repeticiones: int) -> float:
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        funcion()
+    return (time.perf_counter() - inicio) / repeticiones
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de serialización de listados")
+    parser.add_argument("--filas", type=int, default=1000)
+    parser.add_argument("--repeticiones", type=int, default=20)
+    args = parser.parse_args()
+
+    preparar_entorno()
+
+    from fastapi.utils import create_response_field
+    from app.api.vehiculos import VehiculoResponse
+    from app.api.movimientos import MovimientoResponse
+    from app.api.alertas import AlertaResponse
+    from app.services.serializacion import serializar_lista
+
+    casos = [
+        ("VehiculoResponse", VehiculoResponse, filas_vehiculos(args.filas)),
+        ("MovimientoResponse", MovimientoResponse, filas_movimientos(args.filas)),
+        ("AlertaResponse", AlertaResponse, filas_alertas(args.filas)),
+    ]
+
+    escala = 1000 / args.filas
+    print(f"\n{'Modelo':<22}{'antes (ms/1k)':>15}{'después (ms/1k)':>18}{'filas/s antes':>16}"
+          f"{'filas/s después':>18}{'mejora':>9}")
+    print("-" * 98)
+
+    for nombre, modelo, filas in casos:
+        campo = create_response_field(name=f"Response_{nombre}", type_=List[modelo])
+        antes = medir(lambda: asyncio.run(ruta_anterior(modelo, campo, filas)), args.repeticiones)
+        despues = medir(lambda: serializar_lista(modelo, filas), args.repeticiones)
+        print(f"{nombre:<22}{antes * 1000 * escala:>15.2f}{despues * 1000 * escala:>18.2f}"
+              f"{args.filas / antes:>16,.0f}{args.filas / despues:>18,.0f}{antes / despues:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
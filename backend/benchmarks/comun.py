@@ -0,0 +1,122 @@
+"""
+Utilidades comunes para los benchmarks
+- Base de datos SQLite temporal con datos sintéticos
+- Cliente autenticado contra la API en proceso (sin servidor)
+
+Importante: llamar a preparar_entorno() antes de importar cualquier módulo de `app`,
+ya que la configuración se lee al importar.
+"""
+import os
+import random
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def preparar_entorno(database_url: str = None) -> str:
+    """Configurar DATABASE_URL (por defecto una SQLite temporal) y el path de importación"""
+    if database_url is None:
+        ruta = os.path.join(tempfile.mkdtemp(prefix="sigv_bench_"), "bench.db")
+        database_url = f"sqlite:///{ruta}"
+    os.environ["DATABASE_URL"] = database_url
+    if BACKEND_DIR not in sys.path:
+        sys.path.insert(0, BACKEND_DIR)
+    return database_url
+
+
+def poblar(vehiculos: int = 500, movimientos_por_vehiculo: int = 10, semilla: int = 42):
+    """Crear tablas, datos iniciales y un volumen sintético de vehículos, etiquetas y movimientos"""
+    from sqlalchemy import insert
+    from app.database import SessionLocal, engine, Base
+    from app.models import (
+        Vehiculo, VehiculoEtiqueta, Movimiento, TipoMovimiento, Zona, Camara, Etiqueta
+    )
+    from app.services.init_db import init_all
+
+    Base.metadata.create_all(bind=engine)
+    rnd = random.Random(semilla)
+    db = SessionLocal()
+    try:
+        init_all(db)
+        zona_ids = [z.id for z in db.query(Zona.id).all()]
+        camara_ids = [c.id for c in db.query(Camara.id).all()]
+        etiqueta_ids = [e.id for e in db.query(Etiqueta.id).all()]
+        ahora = datetime.utcnow()
+
+        db.execute(insert(Vehiculo), [
+            {
+                "matricula": f"{i:04d}{rnd.choice('BCDFGHJKLMNPRSTVWXYZ')}{rnd.choice('BCDFGHJKLM')}"
+                             f"{rnd.choice('NPRSTVWXYZ')}",
+                "marca": rnd.choice(["Seat", "Renault", "Peugeot", "Toyota", "Ford"]),
+                "modelo": rnd.choice(["Ibiza", "Clio", "208", "Corolla", "Focus"]),
+                "color": rnd.choice(["Blanco", "Negro", "Gris", "Rojo"]),
+                "cliente_nombre": f"Cliente {i}",
+                "activo": True,
+                "en_instalaciones": True,
+                "zona_actual_id": rnd.choice(zona_ids),
+                "fecha_primera_entrada": ahora - timedelta(days=rnd.randint(0, 60)),
+                "fecha_ultimo_movimiento": ahora - timedelta(hours=rnd.randint(0, 800)),
+            }
+            for i in range(vehiculos)
+        ])
+        vehiculo_ids = [v.id for v in db.query(Vehiculo.id).all()]
+
+        db.execute(insert(VehiculoEtiqueta), [
+            {"vehiculo_id": vid, "etiqueta_id": rnd.choice(etiqueta_ids), "activa": True,
+             "fecha_asignacion": ahora - timedelta(days=rnd.randint(0, 30))}
+            for vid in vehiculo_ids
+        ])
+        db.execute(insert(Movimiento), [
+            {"vehiculo_id": vid, "tipo": rnd.choice(list(TipoMovimiento)),
+             "zona_origen_id": rnd.choice(zona_ids), "zona_destino_id": rnd.choice(zona_ids),
+             "camara_id": rnd.choice(camara_ids), "matricula_detectada": "BENCH",
+             "confianza": round(rnd.uniform(80, 99), 2), "manual": False,
+             "fecha_hora": ahora - timedelta(minutes=rnd.randint(0, 60 * 24 * 30))}
+            for vid in vehiculo_ids
+            for _ in range(movimientos_por_vehiculo)
+        ])
+        db.commit()
+    finally:
+        db.close()
+
+
+def poblar_sintetico(vehiculos: int = 2000, movimientos: int = 40_000, semilla: int = 42):
+    """
+    Crear tablas y datos con el generador sintético (trayectorias, historial de
+    etiquetas, campos y alertas realistas). El histórico termina hoy a las 00:00 para
+    que la inactividad y los tiempos de estancia sean realistas.
+    """
+    from app.database import SessionLocal, engine, Base
+    from app.services.init_db import init_all
+    from app.services.generador_datos import generar_datos
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        init_all(db)
+        generar_datos(
+            db,
+            vehiculos=vehiculos,
+            movimientos=movimientos,
+            semilla=semilla,
+            progreso=False
+        )
+    finally:
+        db.close()
+
+
+def cliente_autenticado():
+    """TestClient sobre la app y cabeceras con el token del administrador por defecto"""
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    cliente = TestClient(app)
+    respuesta = cliente.post(
+        "/api/auth/login",
+        data={"username": "admin@sigv.local", "password": "admin123"}
+    )
+    respuesta.raise_for_status()
+    token = respuesta.json()["access_token"]
+    return cliente, {"Authorization": f"Bearer {token}"}
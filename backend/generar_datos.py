@@ -0,0 +1,58 @@
+"""
+Script para generar un volumen grande de datos sintéticos (pruebas de rendimiento)
+Usar siempre contra una base de datos vacía, nunca contra la de producción.
+
+Ejemplos:
+    python generar_datos.py --vehiculos 200000 --movimientos 20000000
+    python generar_datos.py --vehiculos 5000 --movimientos 100000 --semilla 7 --hasta 2026-01-01
+"""
+import argparse
+import time
+from datetime import datetime
+
+from app.database import SessionLocal, engine
+from app.services.arranque import aplicar_migraciones
+from app.services.init_db import init_all
+from app.services.generador_datos import generar_datos
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generador de datos sintéticos SIGV")
+    parser.add_argument("--vehiculos", type=int, default=200_000)
+    parser.add_argument("--movimientos", type=int, default=20_000_000, help="Total de movimientos")
+    parser.add_argument("--dias", type=int, default=365, help="Días de histórico")
+    parser.add_argument("--semilla", type=int, default=42)
+    parser.add_argument("--hasta", type=datetime.fromisoformat, default=None,
+                        help="Fecha final del histórico (por defecto hoy); fijarla para datos idénticos")
+    parser.add_argument("--lote", type=int, default=2_000, help="Vehículos por lote de inserción")
+    args = parser.parse_args()
+
+    print(f"Aplicando migraciones en {engine.url.render_as_string(hide_password=True)}...")
+    aplicar_migraciones(engine)
+
+    db = SessionLocal()
+    try:
+        init_all(db)
+        print(f"Generando {args.vehiculos:,} vehículos y {args.movimientos:,} movimientos (semilla {args.semilla})...")
+        inicio = time.perf_counter()
+        totales = generar_datos(
+            db,
+            vehiculos=args.vehiculos,
+            movimientos=args.movimientos,
+            dias=args.dias,
+            semilla=args.semilla,
+            hasta=args.hasta,
+            lote_vehiculos=args.lote
+        )
+    finally:
+        db.close()
+
+    duracion = time.perf_counter() - inicio
+    print(f"\nCompletado en {duracion:.1f} s:")
+    for tabla, filas in totales.items():
+        print(f"  {tabla:<12}{filas:>12,}")
+    print(f"  {'filas/s':<12}{sum(totales.values()) / duracion:>12,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,12 +2,13 @@
 Script para inicializar la base de datos con datos de ejemplo
 Ejecutar una sola vez después de crear la base de datos
 """
-from app.database import SessionLocal, engine, Base
+from app.database import SessionLocal, engine
+from app.services.arranque import aplicar_migraciones
 from app.services.init_db import init_all
 
-# Crear todas las tablas
-print("Creando tablas en la base de datos...")
-Base.metadata.create_all(bind=engine)
+# Crear/actualizar las tablas (migraciones de Alembic)
+print("Aplicando migraciones de la base de datos...")
+aplicar_migraciones(engine)
 
 # Inicializar datos
 db = SessionLocal()
@@ -0,0 +1,57 @@
+"""
+Entorno de Alembic para SIGV
+Usa la misma configuración (DATABASE_URL) y los mismos modelos que la aplicación.
+"""
+from logging.config import fileConfig
+
+from alembic import context
+
+from app.config import settings
+from app.database import Base, engine
+import app.models  # noqa: F401  (registrar todos los modelos en Base.metadata)
+
+config = context.config
+
+if config.config_file_name is not None and config.attributes.get("configurar_logging", True):
+    fileConfig(config.config_file_name)
+
+target_metadata = Base.metadata
+
+
+def run_migrations_offline():
+    """Generar el SQL sin conectar (alembic upgrade head --sql)"""
+    context.configure(
+        url=settings.DATABASE_URL,
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online():
+    """Aplicar las migraciones con el engine de la aplicación (o la conexión recibida)"""
+    conexion = config.attributes.get("connection")
+    if conexion is not None:
+        _ejecutar(conexion)
+        return
+
+    with engine.connect() as conexion:
+        _ejecutar(conexion)
+
+
+def _ejecutar(conexion):
+    context.configure(
+        connection=conexion,
+        target_metadata=target_metadata,
+        render_as_batch=conexion.dialect.name == "sqlite",
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
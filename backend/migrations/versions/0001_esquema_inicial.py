@@ -0,0 +1,235 @@
+"""esquema inicial
+
+Revision ID: 0001
+Revises: 
+Create Date: 2026-10-19
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('campos_personalizados',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('nombre', sa.String(length=100), nullable=False),
+    sa.Column('etiqueta', sa.String(length=100), nullable=False),
+    sa.Column('tipo', sa.String(length=20), nullable=True),
+    sa.Column('opciones', sa.JSON(), nullable=True),
+    sa.Column('obligatorio', sa.Boolean(), nullable=True),
+    sa.Column('activo', sa.Boolean(), nullable=True),
+    sa.Column('orden', sa.Integer(), nullable=True),
+    sa.Column('fecha_creacion', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('nombre')
+    )
+    op.create_index(op.f('ix_campos_personalizados_id'), 'campos_personalizados', ['id'], unique=False)
+    op.create_table('etiquetas',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('nombre', sa.String(length=50), nullable=False),
+    sa.Column('color', sa.String(length=7), nullable=True),
+    sa.Column('descripcion', sa.String(length=255), nullable=True),
+    sa.Column('icono', sa.String(length=50), nullable=True),
+    sa.Column('activo', sa.Boolean(), nullable=True),
+    sa.Column('orden', sa.Integer(), nullable=True),
+    sa.Column('es_sistema', sa.Boolean(), nullable=True),
+    sa.Column('fecha_creacion', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.Column('fecha_actualizacion', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('nombre')
+    )
+    op.create_index(op.f('ix_etiquetas_id'), 'etiquetas', ['id'], unique=False)
+    op.create_table('usuarios',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('email', sa.String(length=255), nullable=False),
+    sa.Column('nombre', sa.String(length=100), nullable=False),
+    sa.Column('apellidos', sa.String(length=150), nullable=True),
+    sa.Column('password_hash', sa.String(length=255), nullable=False),
+    sa.Column('rol', sa.Enum('ADMINISTRADOR', 'ASESOR', 'MECANICO', name='rol'), nullable=False),
+    sa.Column('activo', sa.Boolean(), nullable=True),
+    sa.Column('telefono', sa.String(length=20), nullable=True),
+    sa.Column('fecha_creacion', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.Column('fecha_actualizacion', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('ultimo_acceso', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_usuarios_email'), 'usuarios', ['email'], unique=True)
+    op.create_index(op.f('ix_usuarios_id'), 'usuarios', ['id'], unique=False)
+    op.create_table('zonas',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('nombre', sa.String(length=100), nullable=False),
+    sa.Column('codigo', sa.String(length=20), nullable=False),
+    sa.Column('descripcion', sa.String(length=255), nullable=True),
+    sa.Column('tipo', sa.String(length=50), nullable=True),
+    sa.Column('pos_x', sa.Float(), nullable=True),
+    sa.Column('pos_y', sa.Float(), nullable=True),
+    sa.Column('ancho', sa.Float(), nullable=True),
+    sa.Column('alto', sa.Float(), nullable=True),
+    sa.Column('color', sa.String(length=7), nullable=True),
+    sa.Column('activo', sa.Boolean(), nullable=True),
+    sa.Column('orden', sa.Integer(), nullable=True),
+    sa.Column('fecha_creacion', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('codigo'),
+    sa.UniqueConstraint('nombre')
+    )
+    op.create_index(op.f('ix_zonas_id'), 'zonas', ['id'], unique=False)
+    op.create_table('camaras',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('nombre', sa.String(length=100), nullable=False),
+    sa.Column('codigo', sa.String(length=20), nullable=False),
+    sa.Column('tipo', sa.String(length=20), nullable=False),
+    sa.Column('zona_id', sa.Integer(), nullable=True),
+    sa.Column('ip', sa.String(length=50), nullable=True),
+    sa.Column('puerto', sa.Integer(), nullable=True),
+    sa.Column('url_stream', sa.String(length=500), nullable=True),
+    sa.Column('usuario', sa.String(length=100), nullable=True),
+    sa.Column('password_encriptado', sa.String(length=255), nullable=True),
+    sa.Column('direccion', sa.String(length=20), nullable=True),
+    sa.Column('activo', sa.Boolean(), nullable=True),
+    sa.Column('online', sa.Boolean(), nullable=True),
+    sa.Column('ultimo_ping', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('pos_x', sa.Float(), nullable=True),
+    sa.Column('pos_y', sa.Float(), nullable=True),
+    sa.Column('angulo', sa.Float(), nullable=True),
+    sa.Column('fecha_creacion', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.Column('fecha_actualizacion', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['zona_id'], ['zonas.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('codigo')
+    )
+    op.create_index(op.f('ix_camaras_id'), 'camaras', ['id'], unique=False)
+    op.create_table('vehiculos',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('matricula', sa.String(length=20), nullable=False),
+    sa.Column('marca', sa.String(length=50), nullable=True),
+    sa.Column('modelo', sa.String(length=50), nullable=True),
+    sa.Column('color', sa.String(length=30), nullable=True),
+    sa.Column('año', sa.Integer(), nullable=True),
+    sa.Column('vin', sa.String(length=50), nullable=True),
+    sa.Column('cliente_nombre', sa.String(length=150), nullable=True),
+    sa.Column('cliente_telefono', sa.String(length=20), nullable=True),
+    sa.Column('cliente_email', sa.String(length=255), nullable=True),
+    sa.Column('activo', sa.Boolean(), nullable=True),
+    sa.Column('en_instalaciones', sa.Boolean(), nullable=True),
+    sa.Column('zona_actual_id', sa.Integer(), nullable=True),
+    sa.Column('notas', sa.Text(), nullable=True),
+    sa.Column('fecha_primera_entrada', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('fecha_ultima_entrada', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('fecha_ultima_salida', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('fecha_ultimo_movimiento', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('fecha_creacion', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.Column('fecha_actualizacion', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['zona_actual_id'], ['zonas.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_vehiculos_id'), 'vehiculos', ['id'], unique=False)
+    op.create_index(op.f('ix_vehiculos_matricula'), 'vehiculos', ['matricula'], unique=True)
+    op.create_table('alertas',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('tipo', sa.Enum('INACTIVIDAD', 'POSIBLE_ENTREGA', 'ENTRADA_NO_REGISTRADA', 'SALIDA_SIN_AUTORIZACION', 'PERSONALIZADA', name='tipoalerta'), nullable=False),
+    sa.Column('vehiculo_id', sa.Integer(), nullable=True),
+    sa.Column('titulo', sa.String(length=200), nullable=False),
+    sa.Column('mensaje', sa.Text(), nullable=True),
+    sa.Column('prioridad', sa.String(length=20), nullable=True),
+    sa.Column('leida', sa.Boolean(), nullable=True),
+    sa.Column('resuelta', sa.Boolean(), nullable=True),
+    sa.Column('fecha_lectura', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('fecha_resolucion', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('resuelta_por_id', sa.Integer(), nullable=True),
+    sa.Column('notas_resolucion', sa.Text(), nullable=True),
+    sa.Column('fecha_creacion', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.ForeignKeyConstraint(['resuelta_por_id'], ['usuarios.id'], ),
+    sa.ForeignKeyConstraint(['vehiculo_id'], ['vehiculos.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_alertas_fecha_creacion'), 'alertas', ['fecha_creacion'], unique=False)
+    op.create_index(op.f('ix_alertas_id'), 'alertas', ['id'], unique=False)
+    op.create_table('movimientos',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('vehiculo_id', sa.Integer(), nullable=False),
+    sa.Column('tipo', sa.Enum('ENTRADA', 'SALIDA', 'CAMBIO_ZONA', 'DETECCION', name='tipomovimiento'), nullable=False),
+    sa.Column('zona_origen_id', sa.Integer(), nullable=True),
+    sa.Column('zona_destino_id', sa.Integer(), nullable=True),
+    sa.Column('camara_id', sa.Integer(), nullable=True),
+    sa.Column('matricula_detectada', sa.String(length=20), nullable=True),
+    sa.Column('confianza', sa.Float(), nullable=True),
+    sa.Column('imagen_url', sa.String(length=500), nullable=True),
+    sa.Column('fecha_hora', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.Column('manual', sa.Boolean(), nullable=True),
+    sa.Column('registrado_por_id', sa.Integer(), nullable=True),
+    sa.Column('notas', sa.Text(), nullable=True),
+    sa.ForeignKeyConstraint(['camara_id'], ['camaras.id'], ),
+    sa.ForeignKeyConstraint(['registrado_por_id'], ['usuarios.id'], ),
+    sa.ForeignKeyConstraint(['vehiculo_id'], ['vehiculos.id'], ),
+    sa.ForeignKeyConstraint(['zona_destino_id'], ['zonas.id'], ),
+    sa.ForeignKeyConstraint(['zona_origen_id'], ['zonas.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_movimientos_fecha_hora'), 'movimientos', ['fecha_hora'], unique=False)
+    op.create_index(op.f('ix_movimientos_id'), 'movimientos', ['id'], unique=False)
+    op.create_table('valores_campos_personalizados',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('vehiculo_id', sa.Integer(), nullable=False),
+    sa.Column('campo_id', sa.Integer(), nullable=False),
+    sa.Column('valor', sa.Text(), nullable=True),
+    sa.Column('fecha_actualizacion', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['campo_id'], ['campos_personalizados.id'], ),
+    sa.ForeignKeyConstraint(['vehiculo_id'], ['vehiculos.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_valores_campos_personalizados_id'), 'valores_campos_personalizados', ['id'], unique=False)
+    op.create_table('vehiculo_etiquetas',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('vehiculo_id', sa.Integer(), nullable=False),
+    sa.Column('etiqueta_id', sa.Integer(), nullable=False),
+    sa.Column('activa', sa.Boolean(), nullable=True),
+    sa.Column('asignado_por_id', sa.Integer(), nullable=True),
+    sa.Column('fecha_asignacion', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.Column('fecha_remocion', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['asignado_por_id'], ['usuarios.id'], ),
+    sa.ForeignKeyConstraint(['etiqueta_id'], ['etiquetas.id'], ),
+    sa.ForeignKeyConstraint(['vehiculo_id'], ['vehiculos.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_vehiculo_etiquetas_id'), 'vehiculo_etiquetas', ['id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_vehiculo_etiquetas_id'), table_name='vehiculo_etiquetas')
+    op.drop_table('vehiculo_etiquetas')
+    op.drop_index(op.f('ix_valores_campos_personalizados_id'), table_name='valores_campos_personalizados')
+    op.drop_table('valores_campos_personalizados')
+    op.drop_index(op.f('ix_movimientos_id'), table_name='movimientos')
+    op.drop_index(op.f('ix_movimientos_fecha_hora'), table_name='movimientos')
+    op.drop_table('movimientos')
+    op.drop_index(op.f('ix_alertas_id'), table_name='alertas')
+    op.drop_index(op.f('ix_alertas_fecha_creacion'), table_name='alertas')
+    op.drop_table('alertas')
+    op.drop_index(op.f('ix_vehiculos_matricula'), table_name='vehiculos')
+    op.drop_index(op.f('ix_vehiculos_id'), table_name='vehiculos')
+    op.drop_table('vehiculos')
+    op.drop_index(op.f('ix_camaras_id'), table_name='camaras')
+    op.drop_table('camaras')
+    op.drop_index(op.f('ix_zonas_id'), table_name='zonas')
+    op.drop_table('zonas')
+    op.drop_index(op.f('ix_usuarios_id'), table_name='usuarios')
+    op.drop_index(op.f('ix_usuarios_email'), table_name='usuarios')
+    op.drop_table('usuarios')
+    op.drop_index(op.f('ix_etiquetas_id'), table_name='etiquetas')
+    op.drop_table('etiquetas')
+    op.drop_index(op.f('ix_campos_personalizados_id'), table_name='campos_personalizados')
+    op.drop_table('campos_personalizados')
+
+    # En PostgreSQL los Enum son tipos propios que drop_table no elimina
+    for tipo in ("tipomovimiento", "tipoalerta", "rol"):
+        sa.Enum(name=tipo).drop(op.get_bind(), checkfirst=True)
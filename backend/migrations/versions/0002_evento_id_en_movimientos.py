@@ -0,0 +1,28 @@
+"""evento_id en movimientos
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('movimientos', sa.Column('evento_id', sa.String(length=64), nullable=True))
+    op.create_index(op.f('ix_movimientos_evento_id'), 'movimientos', ['evento_id'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_movimientos_evento_id'), table_name='movimientos')
+    op.drop_column('movimientos', 'evento_id')
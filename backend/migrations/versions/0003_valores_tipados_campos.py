@@ -0,0 +1,95 @@
+"""valores tipados de campos personalizados
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19
+
+"""
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+COLUMNAS = {
+    'numero': 'valor_numero',
+    'fecha': 'valor_fecha',
+    'booleano': 'valor_booleano',
+    'seleccion': 'valor_opcion',
+}
+LOTE = 5000
+
+
+def upgrade() -> None:
+    op.add_column('valores_campos_personalizados', sa.Column('valor_numero', sa.Float(), nullable=True))
+    op.add_column('valores_campos_personalizados', sa.Column('valor_fecha', sa.Date(), nullable=True))
+    op.add_column('valores_campos_personalizados', sa.Column('valor_booleano', sa.Boolean(), nullable=True))
+    op.add_column('valores_campos_personalizados', sa.Column('valor_opcion', sa.String(length=255), nullable=True))
+
+    if not context.is_offline_mode():
+        _rellenar_valores_tipados()
+
+    op.create_index('ix_valores_campo_booleano', 'valores_campos_personalizados', ['campo_id', 'valor_booleano'], unique=False)
+    op.create_index('ix_valores_campo_fecha', 'valores_campos_personalizados', ['campo_id', 'valor_fecha'], unique=False)
+    op.create_index('ix_valores_campo_numero', 'valores_campos_personalizados', ['campo_id', 'valor_numero'], unique=False)
+    op.create_index('ix_valores_campo_opcion', 'valores_campos_personalizados', ['campo_id', 'valor_opcion'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_valores_campo_opcion', table_name='valores_campos_personalizados')
+    op.drop_index('ix_valores_campo_numero', table_name='valores_campos_personalizados')
+    op.drop_index('ix_valores_campo_fecha', table_name='valores_campos_personalizados')
+    op.drop_index('ix_valores_campo_booleano', table_name='valores_campos_personalizados')
+    op.drop_column('valores_campos_personalizados', 'valor_opcion')
+    op.drop_column('valores_campos_personalizados', 'valor_booleano')
+    op.drop_column('valores_campos_personalizados', 'valor_fecha')
+    op.drop_column('valores_campos_personalizados', 'valor_numero')
+
+
+def _rellenar_valores_tipados() -> None:
+    """Convertir los valores de texto existentes (antes de crear los índices); los no convertibles quedan vacíos"""
+    from app.services.campos_tipados import convertir_valor
+
+    conexion = op.get_bind()
+    campos = sa.table('campos_personalizados', sa.column('id'), sa.column('tipo'))
+    valores = sa.table(
+        'valores_campos_personalizados',
+        sa.column('id'), sa.column('campo_id'), sa.column('valor'),
+        *(sa.column(columna) for columna in COLUMNAS.values()),
+    )
+    for campo_id, tipo in conexion.execute(sa.select(campos.c.id, campos.c.tipo)).all():
+        columna = COLUMNAS.get(tipo)
+        if columna is None:
+            continue
+        actualizar = (
+            sa.update(valores)
+            .where(valores.c.id == sa.bindparam('_id'))
+            .values({columna: sa.bindparam('_valor')})
+        )
+        ultimo_id = 0
+        while True:
+            filas = conexion.execute(
+                sa.select(valores.c.id, valores.c.valor)
+                .where(valores.c.campo_id == campo_id, valores.c.id > ultimo_id)
+                .order_by(valores.c.id)
+                .limit(LOTE)
+            ).all()
+            if not filas:
+                break
+            parametros = []
+            for fila in filas:
+                if fila.valor is None or not fila.valor.strip():
+                    continue
+                try:
+                    parametros.append({'_id': fila.id, '_valor': convertir_valor(tipo, fila.valor)})
+                except (ValueError, TypeError):
+                    pass
+            if parametros:
+                conexion.execute(actualizar, parametros)
+            ultimo_id = filas[-1].id
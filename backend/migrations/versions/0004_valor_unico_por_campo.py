@@ -0,0 +1,31 @@
+"""un valor por vehiculo y campo personalizado
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Valores duplicados de antes de la restricción: conservar el más reciente
+    op.execute(
+        "DELETE FROM valores_campos_personalizados WHERE id NOT IN ("
+        "SELECT max(id) FROM valores_campos_personalizados GROUP BY vehiculo_id, campo_id)"
+    )
+    op.create_index('uq_valores_vehiculo_campo', 'valores_campos_personalizados', ['vehiculo_id', 'campo_id'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index('uq_valores_vehiculo_campo', table_name='valores_campos_personalizados')
@@ -0,0 +1,42 @@
+"""contadores de vehiculos por zona y etiqueta
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('contadores_vehiculos',
+    sa.Column('tipo', sa.String(length=20), nullable=False),
+    sa.Column('entidad_id', sa.Integer(), nullable=False),
+    sa.Column('cantidad', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('tipo', 'entidad_id')
+    )
+    # Valores iniciales (después los mantiene la aplicación y los reconcilia periódicamente)
+    op.execute(
+        "INSERT INTO contadores_vehiculos (tipo, entidad_id, cantidad) "
+        "SELECT 'zona', zona_actual_id, count(*) FROM vehiculos "
+        "WHERE en_instalaciones = true AND zona_actual_id IS NOT NULL GROUP BY zona_actual_id"
+    )
+    op.execute(
+        "INSERT INTO contadores_vehiculos (tipo, entidad_id, cantidad) "
+        "SELECT 'etiqueta', etiqueta_id, count(*) FROM vehiculo_etiquetas "
+        "WHERE activa = true GROUP BY etiqueta_id"
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('contadores_vehiculos')
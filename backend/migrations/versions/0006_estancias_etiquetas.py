@@ -0,0 +1,82 @@
+"""estancias por etiqueta agregadas por dia y tramo
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-19
+
+"""
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0006'
+down_revision: Union[str, None] = '0005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+LOTE = 5000
+
+
+def upgrade() -> None:
+    op.create_table('estancias_etiquetas',
+    sa.Column('etiqueta_id', sa.Integer(), nullable=False),
+    sa.Column('dia', sa.Date(), nullable=False),
+    sa.Column('tramo', sa.Integer(), nullable=False),
+    sa.Column('cantidad', sa.Integer(), nullable=False),
+    sa.Column('segundos', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['etiqueta_id'], ['etiquetas.id'], ),
+    sa.PrimaryKeyConstraint('etiqueta_id', 'dia', 'tramo')
+    )
+    op.create_index('ix_vehiculo_etiquetas_activa', 'vehiculo_etiquetas', ['activa', 'etiqueta_id'], unique=False)
+
+    if not context.is_offline_mode():
+        _rellenar_estancias()
+
+
+def downgrade() -> None:
+    op.drop_index('ix_vehiculo_etiquetas_activa', table_name='vehiculo_etiquetas')
+    op.drop_table('estancias_etiquetas')
+
+
+def _rellenar_estancias() -> None:
+    """Agregar las estancias ya terminadas del historial de etiquetas"""
+    from app.services.estancias import agregar
+
+    conexion = op.get_bind()
+    asignaciones = sa.table(
+        'vehiculo_etiquetas',
+        sa.column('id'), sa.column('etiqueta_id'), sa.column('activa'),
+        sa.column('fecha_asignacion', sa.DateTime()), sa.column('fecha_remocion', sa.DateTime()),
+    )
+    estancias = sa.table(
+        'estancias_etiquetas',
+        sa.column('etiqueta_id'), sa.column('dia'), sa.column('tramo'), sa.column('cantidad'), sa.column('segundos'),
+    )
+    agregado = None
+    ultimo_id = 0
+    while True:
+        filas = conexion.execute(
+            sa.select(asignaciones.c.id, asignaciones.c.etiqueta_id,
+                      asignaciones.c.fecha_asignacion, asignaciones.c.fecha_remocion)
+            .where(asignaciones.c.activa == sa.false(), asignaciones.c.fecha_remocion.isnot(None),
+                   asignaciones.c.id > ultimo_id)
+            .order_by(asignaciones.c.id)
+            .limit(LOTE)
+        ).all()
+        if not filas:
+            break
+        agregado = agregar(
+            ((fila.etiqueta_id, fila.fecha_asignacion, fila.fecha_remocion) for fila in filas), agregado
+        )
+        ultimo_id = filas[-1].id
+
+    if agregado:
+        nuevas = [
+            {'etiqueta_id': etiqueta_id, 'dia': dia, 'tramo': tramo, 'cantidad': cantidad, 'segundos': segundos}
+            for (etiqueta_id, dia, tramo), (cantidad, segundos) in agregado.items()
+        ]
+        for inicio in range(0, len(nuevas), LOTE):
+            op.bulk_insert(estancias, nuevas[inicio:inicio + LOTE])
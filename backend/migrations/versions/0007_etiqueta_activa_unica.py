@@ -0,0 +1,34 @@
+"""una asignacion activa por vehiculo y etiqueta
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-19
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0007'
+down_revision: Union[str, None] = '0006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Asignaciones activas duplicadas por asignaciones simultáneas: conservar la más antigua.
+    # Los contadores de etiquetas los corrige la reconciliación periódica.
+    op.execute(
+        "DELETE FROM vehiculo_etiquetas WHERE activa AND id NOT IN ("
+        "SELECT min(id) FROM vehiculo_etiquetas WHERE activa GROUP BY vehiculo_id, etiqueta_id)"
+    )
+    op.create_index('uq_vehiculo_etiquetas_activa', 'vehiculo_etiquetas', ['vehiculo_id', 'etiqueta_id'],
+                    unique=True, postgresql_where=sa.text('activa'), sqlite_where=sa.text('activa'))
+
+
+def downgrade() -> None:
+    op.drop_index('uq_vehiculo_etiquetas_activa', table_name='vehiculo_etiquetas',
+                  postgresql_where=sa.text('activa'), sqlite_where=sa.text('activa'))
@@ -0,0 +1,30 @@
+"""versiones compartidas de recursos para los ETag
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-19
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0008'
+down_revision: Union[str, None] = '0007'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('versiones_recursos',
+    sa.Column('recurso', sa.String(length=50), nullable=False),
+    sa.Column('version', sa.BigInteger(), nullable=False),
+    sa.PrimaryKeyConstraint('recurso')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('versiones_recursos')
@@ -0,0 +1,132 @@
+"""
+Configuración común de los tests
+- Base de datos SQLite temporal, creada una vez por sesión con los datos iniciales
+- Cliente de la API (sin lifespan: sin tareas en segundo plano) y cabeceras de admin
+- engine_postgres_falso: el bus de invalidación "envía" NOTIFY a una lista
+- presupuesto_sql: fallar si un bloque ejecuta más consultas SQL de las indicadas
+
+Uso:
+    def test_listar_zonas(client, cabeceras, presupuesto_sql):
+        with presupuesto_sql(3):
+            client.get("/api/zonas/", headers=cabeceras)
+"""
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+# Antes de importar la aplicación: el engine se crea al importar app.database
+_directorio = tempfile.mkdtemp(prefix="sigv_tests_")
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(_directorio, "sigv.db")
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.exc import OperationalError
+
+from app.services.perfil_sql import presupuesto_consultas
+
+
+@pytest.fixture(scope="session")
+def base_datos():
+    from app.database import Base, SessionLocal, engine
+    import app.models  # noqa: F401 (registrar los modelos en Base.metadata)
+    from app.services.init_db import init_all
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    init_all(db)
+    db.close()
+    yield engine
+    engine.dispose()
+    shutil.rmtree(_directorio, ignore_errors=True)
+
+
+@pytest.fixture
+def db(base_datos):
+    from app.database import SessionLocal
+
+    sesion = SessionLocal()
+    yield sesion
+    sesion.close()
+
+
+@pytest.fixture(scope="session")
+def client(base_datos):
+    from app.main import app
+
+    return TestClient(app)
+
+
+@pytest.fixture(scope="session")
+def cabeceras(client):
+    respuesta = client.post("/api/auth/login", data={"username": "admin@sigv.local", "password": "admin123"})
+    return {"Authorization": f"Bearer {respuesta.json()['access_token']}"}
+
+
+@pytest.fixture(scope="session")
+def detectar(client):
+    """Enviar una detección LPR por la API y devolver su resultado"""
+    def _detectar(matricula: str, camara: str = "LPR-1", **extra) -> dict:
+        respuesta = client.post(
+            "/api/movimientos/lpr/detectar", json={"matricula": matricula, "camara_codigo": camara, **extra}
+        )
+        assert respuesta.status_code == 200, respuesta.text
+        return respuesta.json()["resultado"]
+    return _detectar
+
+
+@pytest.fixture
+def presupuesto_sql(base_datos):
+    """Context manager que falla si el bloque supera el número de consultas indicado"""
+    return presupuesto_consultas
+
+
+class _EnginePostgresFalso:
+    """
+    Registra los NOTIFY (y el hilo que los envía) en lugar de enviarlos; cada envío tarda
+    un poco. Las versiones compartidas se incrementan en memoria en vez de en la tabla.
+    """
+
+    class dialect:
+        name = "postgresql"
+
+    def __init__(self):
+        self.notificados = []
+        self.hilos = set()
+        self.fallos = 0  # Envíos que fallarán antes de funcionar
+        self.versiones = {}
+
+    @contextmanager
+    def begin(self):
+        yield self
+
+    def execute(self, sentencia, parametros):
+        if "recursos" not in parametros:
+            self.hilos.add(threading.current_thread().name)
+            self.notificados.append(sorted(json.loads(parametros["payload"])["v"]))
+            return None
+        time.sleep(0.01)
+        if self.fallos:
+            self.fallos -= 1
+            raise OperationalError("pg_notify", {}, Exception("sin conexión"))
+        for recurso in parametros["recursos"]:
+            self.versiones[recurso] = self.versiones.get(recurso, 0) + 1
+        return SimpleNamespace(all=lambda: [(r, self.versiones[r]) for r in parametros["recursos"]])
+
+
+@pytest.fixture
+def engine_postgres_falso():
+    """
+    Hilo de envío del bus como en PostgreSQL: los NOTIFY quedan en engine.notificados.
+    invalidacion.detener_envio() espera a que se envíe lo pendiente.
+    """
+    from app.services import invalidacion
+
+    engine = _EnginePostgresFalso()
+    invalidacion.iniciar_envio(engine)
+    yield engine
+    invalidacion.detener_envio()
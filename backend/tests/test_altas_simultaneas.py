@@ -0,0 +1,72 @@
+"""Altas simultáneas de matrículas nuevas: un vehículo y una alerta por matrícula, sin errores"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import func
+
+from app.models.alerta import Alerta, TipoAlerta
+from app.models.vehiculo import Vehiculo
+
+HILOS = 4
+DETECTADAS = [f"{i:04d}EST" for i in range(10)]
+CREADAS = [f"{i:04d}ESA" for i in range(10)]
+
+
+def _a_la_vez(accion, matriculas: list) -> list:
+    """Cada hilo ejecuta accion(hilo, matricula) para todas; la misma matrícula a la vez en todos"""
+    barrera = threading.Barrier(HILOS)
+
+    def hilo(numero: int) -> list:
+        resultados = []
+        for matricula in matriculas:
+            barrera.wait()
+            resultados.append(accion(numero, matricula))
+        return resultados
+
+    with ThreadPoolExecutor(HILOS) as ejecutor:
+        return [r for resultados in ejecutor.map(hilo, range(HILOS)) for r in resultados]
+
+
+def test_detecciones_simultaneas(db):
+    from app.api.movimientos import procesar_deteccion
+    from app.database import SessionLocal
+    from app.services.catalogo_zonas import camara_por_codigo
+
+    sesiones = [SessionLocal() for _ in range(HILOS)]
+
+    def detectar(numero: int, matricula: str):
+        sesion = sesiones[numero]
+        camara = camara_por_codigo(sesion, "LPR-1" if numero % 2 else "LPR-2")
+        return procesar_deteccion(matricula, camara, sesion, confianza=90.0)
+
+    try:
+        # Cualquier excepción en un hilo se relanza aquí
+        _a_la_vez(detectar, DETECTADAS)
+    finally:
+        for sesion in sesiones:
+            sesion.close()
+
+    vehiculos = dict(
+        db.query(Vehiculo.matricula, func.count())
+        .filter(Vehiculo.matricula.in_(DETECTADAS)).group_by(Vehiculo.matricula).all()
+    )
+    alertas = dict(
+        db.query(Vehiculo.matricula, func.count(Alerta.id))
+        .join(Alerta, Alerta.vehiculo_id == Vehiculo.id)
+        .filter(Vehiculo.matricula.in_(DETECTADAS), Alerta.tipo == TipoAlerta.ENTRADA_NO_REGISTRADA)
+        .group_by(Vehiculo.matricula).all()
+    )
+    assert vehiculos == {matricula: 1 for matricula in DETECTADAS}
+    assert alertas == {matricula: 1 for matricula in DETECTADAS}
+
+
+def test_altas_simultaneas_por_la_api(client, cabeceras, db):
+    def crear(numero: int, matricula: str) -> tuple:
+        respuesta = client.post("/api/vehiculos/", headers=cabeceras, json={"matricula": matricula})
+        return matricula, respuesta.status_code
+
+    codigos = _a_la_vez(crear, CREADAS)
+
+    for matricula in CREADAS:
+        assert sorted(c for m, c in codigos if m == matricula) == [201] + [400] * (HILOS - 1)
+    assert db.query(Vehiculo).filter(Vehiculo.matricula.in_(CREADAS)).count() == len(CREADAS)
@@ -0,0 +1,78 @@
+"""Campos personalizados: filtros y orden por valor tipado, guardado en una sentencia"""
+import pytest
+
+from app.services.campos_tipados import convertir_valor
+
+TEXTOS = [f"texto_prueba_{i}" for i in range(5)]
+
+
+@pytest.fixture(scope="module")
+def campos(client, cabeceras):
+    """{nombre: id} de un campo numérico y varios de texto"""
+    ids = {}
+    for nombre, tipo in [("presupuesto_prueba", "numero")] + [(nombre, "texto") for nombre in TEXTOS]:
+        respuesta = client.post("/api/campos/", json={"nombre": nombre, "etiqueta": nombre, "tipo": tipo},
+                                headers=cabeceras)
+        assert respuesta.status_code == 201, respuesta.text
+        ids[nombre] = respuesta.json()["id"]
+    return ids
+
+
+@pytest.fixture(scope="module")
+def vehiculos(client, cabeceras, detectar, campos):
+    """Cinco vehículos con presupuesto 0, 500, 1000, 1500 y 2000; devuelve sus ids"""
+    ids = []
+    for i in range(5):
+        vehiculo_id = detectar(f"{i:04d}CMP")["vehiculo_id"]
+        respuesta = client.put(f"/api/vehiculos/{vehiculo_id}", json={
+            "campos_personalizados": {str(campos["presupuesto_prueba"]): i * 500}
+        }, headers=cabeceras)
+        assert respuesta.status_code == 200, respuesta.text
+        ids.append(vehiculo_id)
+    return ids
+
+
+def _listar(client, cabeceras, **parametros):
+    respuesta = client.get("/api/vehiculos/", params={"buscar": "CMP", **parametros}, headers=cabeceras)
+    assert respuesta.status_code == 200, respuesta.text
+    return [vehiculo["id"] for vehiculo in respuesta.json()]
+
+
+def test_filtro_numerico(client, cabeceras, vehiculos):
+    assert sorted(_listar(client, cabeceras, campo="presupuesto_prueba:mayor:1000")) == sorted(vehiculos[3:])
+    assert sorted(_listar(client, cabeceras, campo="presupuesto_prueba:entre:1.000,00|500")) == sorted(vehiculos[1:3])
+
+
+def test_orden_por_campo(client, cabeceras, vehiculos):
+    assert _listar(client, cabeceras, ordenar_campo="presupuesto_prueba") == vehiculos
+    assert _listar(client, cabeceras, ordenar_campo="-presupuesto_prueba") == vehiculos[::-1]
+
+
+@pytest.mark.parametrize("valor", ["nan", "inf", "-Infinity", float("nan"), float("inf")])
+def test_numero_no_finito(valor):
+    with pytest.raises(ValueError):
+        convertir_valor("numero", valor)
+
+
+def test_filtro_y_guardado_rechazan_nan(client, cabeceras, campos, vehiculos):
+    respuesta = client.get("/api/vehiculos/", params={"campo": "presupuesto_prueba:mayor:nan"}, headers=cabeceras)
+    assert respuesta.status_code == 400
+
+    respuesta = client.put(f"/api/vehiculos/{vehiculos[0]}", json={
+        "campos_personalizados": {str(campos["presupuesto_prueba"]): "inf"}
+    }, headers=cabeceras)
+    assert respuesta.status_code == 400
+
+
+def test_guardado_en_sentencias_constantes(client, cabeceras, presupuesto_sql, campos, vehiculos):
+    def actualizar(nombres):
+        with presupuesto_sql(20) as perfil:
+            respuesta = client.put(f"/api/vehiculos/{vehiculos[0]}", json={
+                "campos_personalizados": {str(campos[nombre]): f"valor {nombre}" for nombre in nombres}
+            }, headers=cabeceras)
+        assert respuesta.status_code == 200, respuesta.text
+        return perfil.consultas
+
+    actualizar(TEXTOS)  # catálogo de campos ya en memoria
+    # Un upsert para todos los valores: las consultas no dependen de cuántos campos se guardan
+    assert actualizar(TEXTOS[:1]) == actualizar(TEXTOS)
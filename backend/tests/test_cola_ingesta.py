@@ -0,0 +1,59 @@
+"""Cola de ingesta: reaplicar tras una caída no duplica movimientos ni pierde ranuras"""
+import os
+
+from app.api.movimientos import aplicar_lote_detecciones
+from app.models.movimiento import Movimiento
+from app.services.cola_ingesta import ColaIngesta
+
+
+def _deteccion(matricula: str, camara: str = "LPR-1") -> dict:
+    return {"m": matricula, "c": camara, "f": 95.0, "i": None, "e": None}
+
+
+def _abrir(directorio) -> ColaIngesta:
+    cola = ColaIngesta(str(directorio))
+    cola.abrir()
+    return cola
+
+
+def test_reaplicar_tras_caida_no_duplica(tmp_path, db):
+    cola = _abrir(tmp_path)
+    cola.anadir([_deteccion("0001COL"), _deteccion("0001COL", "OV-5"), _deteccion("0002COL")])
+    registros = cola.lote(10)
+    assert all(r["e"] == f"q{cola.identificador}-{r['s']}" for r in registros)
+
+    assert all(isinstance(r, dict) for r in aplicar_lote_detecciones(registros))
+    # Caída entre el commit del lote y la escritura de "aplicado"
+    cola.cerrar()
+
+    cola = _abrir(tmp_path)
+    repetidos = cola.lote(10)
+    assert [r["e"] for r in repetidos] == [r["e"] for r in registros]
+    resultados = aplicar_lote_detecciones(repetidos)
+    cola.confirmar(repetidos[-1]["s"])
+    cola.cerrar()
+
+    assert all(r.get("duplicada") for r in resultados)
+    assert db.query(Movimiento).filter(Movimiento.matricula_detectada.like("%COL")).count() == 3
+
+
+def test_ranuras_sin_worker_se_recogen(tmp_path):
+    # Dos workers con detecciones pendientes; al reiniciar queda uno
+    primera, segunda = _abrir(tmp_path), _abrir(tmp_path)
+    primera.anadir([_deteccion("0003COL")])
+    segunda.anadir([_deteccion("0004COL"), _deteccion("0005COL")])
+    eventos = {r["e"] for r in primera.lote(10) + segunda.lote(10)}
+    primera.cerrar()
+    segunda.cerrar()
+
+    cola = _abrir(tmp_path)
+    assert cola.directorio == primera.directorio
+    assert {r["e"] for r in cola.lote(10)} == eventos
+    assert not [n for n in os.listdir(segunda.directorio) if n.endswith(".log")]
+    cola.cerrar()
+
+    # Recogidas y sin aplicar: siguen pendientes en la ranura que las recogió, con el mismo evento_id
+    cola = _abrir(tmp_path)
+    assert {r["e"] for r in cola.lote(10)} == eventos
+    cola.cerrar()
+
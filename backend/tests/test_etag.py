@@ -0,0 +1,68 @@
+"""GET condicional: los ETag cambian con las escrituras de cualquier worker y coinciden entre workers"""
+import pytest
+
+from app.services import invalidacion, versiones
+from app.services.versiones import VEHICULOS, MOVIMIENTOS
+
+
+@pytest.fixture
+def versiones_compartidas(monkeypatch):
+    """Versiones del worker aisladas del resto de tests"""
+    monkeypatch.setattr(versiones, "_base", dict(versiones._base))
+    monkeypatch.setattr(versiones, "_globales", dict(versiones._globales))
+    monkeypatch.setattr(versiones, "_locales", dict(versiones._locales))
+
+
+def _reiniciar_worker(monkeypatch, tabla):
+    """Estado de un worker recién arrancado tras leer la tabla de versiones"""
+    monkeypatch.setattr(versiones, "_base", {"global": 123})
+    monkeypatch.setattr(versiones, "_globales", {})
+    monkeypatch.setattr(versiones, "_locales", {})
+    versiones.fijar_versiones(tabla, completo=True)
+
+
+def test_deteccion_notifica_a_los_demas_workers(engine_postgres_falso, detectar):
+    detectar("1234ETG")
+    invalidacion.detener_envio()
+
+    enviados = {recurso for lote in engine_postgres_falso.notificados for recurso in lote}
+    assert {VEHICULOS, MOVIMIENTOS} <= enviados
+    assert engine_postgres_falso.hilos == {"sigv-invalidacion-envio"}
+
+
+def test_etag_cambia_con_notificacion_de_otro_worker(client, cabeceras, versiones_compartidas):
+    respuesta = client.get("/api/dashboard/mapa", headers=cabeceras)
+    etag = respuesta.headers["ETag"]
+
+    respuesta = client.get("/api/dashboard/mapa", headers={**cabeceras, "If-None-Match": etag})
+    assert respuesta.status_code == 304
+
+    # Lo que hace el hilo de escucha al recibir el NOTIFY de otro worker
+    version_global, _ = versiones.obtener_version(VEHICULOS)
+    invalidacion._recibir({"o": "otro-worker", "v": {VEHICULOS: version_global + 1}})
+
+    respuesta = client.get("/api/dashboard/mapa", headers={**cabeceras, "If-None-Match": etag})
+    assert respuesta.status_code == 200
+    assert respuesta.headers["ETag"] != etag
+
+
+def test_etag_igual_en_todos_los_workers(client, cabeceras, versiones_compartidas, monkeypatch):
+    tabla = {VEHICULOS: 7, MOVIMIENTOS: 3}
+    _reiniciar_worker(monkeypatch, tabla)
+    etag = client.get("/api/dashboard/mapa", headers=cabeceras).headers["ETag"]
+
+    # Otro worker (o este reiniciado) con la misma tabla da el mismo ETag
+    _reiniciar_worker(monkeypatch, tabla)
+    respuesta = client.get("/api/dashboard/mapa", headers={**cabeceras, "If-None-Match": etag})
+    assert respuesta.status_code == 304
+
+    # Escritura de este worker: cambia ya, y al llegar la versión compartida coincide con los demás
+    invalidacion.publicar_invalidacion(VEHICULOS)
+    local = client.get("/api/dashboard/mapa", headers=cabeceras).headers["ETag"]
+    versiones.fijar_versiones({VEHICULOS: 8})
+    propio = client.get("/api/dashboard/mapa", headers=cabeceras).headers["ETag"]
+
+    _reiniciar_worker(monkeypatch, {**tabla, VEHICULOS: 8})
+    ajeno = client.get("/api/dashboard/mapa", headers=cabeceras).headers["ETag"]
+    assert len({etag, local, propio}) == 3
+    assert propio == ajeno
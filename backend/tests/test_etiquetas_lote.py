@@ -0,0 +1,52 @@
+"""Asignación de etiquetas: una sola asignación activa por vehículo y etiqueta"""
+import pytest
+from sqlalchemy import literal, select, text
+
+from app.models.etiqueta import VehiculoEtiqueta
+from app.models.vehiculo import Vehiculo
+from app.services.contadores import ETIQUETA, reconciliar
+from app.services.upsert import insertar_desde_consulta
+
+
+@pytest.fixture(scope="module")
+def escenario(client, cabeceras, detectar):
+    respuesta = client.post("/api/etiquetas/", json={"nombre": "Prueba lote"}, headers=cabeceras)
+    assert respuesta.status_code == 201, respuesta.text
+    vehiculos = [detectar(f"{i:04d}LOT")["vehiculo_id"] for i in range(3)]
+    return respuesta.json()["id"], vehiculos
+
+
+def _activas(db, etiqueta_id):
+    return db.query(VehiculoEtiqueta.vehiculo_id).filter(
+        VehiculoEtiqueta.etiqueta_id == etiqueta_id, VehiculoEtiqueta.activa == True
+    ).order_by(VehiculoEtiqueta.vehiculo_id).all()
+
+
+def test_individual_y_lote_no_duplican(client, cabeceras, db, escenario):
+    etiqueta_id, vehiculos = escenario
+    ruta = f"/api/vehiculos/{vehiculos[0]}/etiquetas"
+    assert client.post(ruta, json={"etiqueta_id": etiqueta_id}, headers=cabeceras).status_code == 200
+    assert client.post(ruta, json={"etiqueta_id": etiqueta_id}, headers=cabeceras).status_code == 400
+
+    respuesta = client.post("/api/vehiculos/etiquetas/lote", json={
+        "etiqueta_id": etiqueta_id, "vehiculo_ids": vehiculos
+    }, headers=cabeceras)
+    assert respuesta.status_code == 200, respuesta.text
+    assert respuesta.json()["modificados"] == 2
+
+    assert [fila.vehiculo_id for fila in _activas(db, etiqueta_id)] == sorted(vehiculos)
+    assert (ETIQUETA, etiqueta_id) not in reconciliar(db)
+
+
+def test_insercion_simultanea_no_duplica_la_activa(db, escenario):
+    # Lo que ve una asignación en lote que empezó antes de que otra petición confirmase la suya
+    etiqueta_id, vehiculos = escenario
+    insertadas = insertar_desde_consulta(
+        db, VehiculoEtiqueta, ["vehiculo_id", "etiqueta_id", "activa"],
+        select(Vehiculo.id, literal(etiqueta_id), literal(True)).where(Vehiculo.id.in_(vehiculos)),
+        ["vehiculo_id", "etiqueta_id"], donde=text("activa")
+    )
+    db.commit()
+
+    assert insertadas == 0
+    assert len(_activas(db, etiqueta_id)) == len(vehiculos)
@@ -0,0 +1,50 @@
+"""Datos sintéticos: nada posterior a la fecha `hasta`"""
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine, func
+from sqlalchemy.orm import Session
+
+from app.database import Base
+from app.models.alerta import Alerta
+from app.models.etiqueta import VehiculoEtiqueta
+from app.models.movimiento import Movimiento
+from app.models.vehiculo import Vehiculo
+from app.services.generador_datos import generar_datos
+from app.services.init_db import init_all
+
+HASTA = datetime(2026, 10, 19)
+
+
+@pytest.fixture(scope="module")
+def sintetica(tmp_path_factory):
+    """BD aparte (generar_datos necesita la tabla de vehículos vacía)"""
+    engine = create_engine("sqlite:///" + str(tmp_path_factory.mktemp("sintetica") / "sigv.db"))
+    Base.metadata.create_all(bind=engine)
+    with Session(bind=engine) as db:
+        init_all(db)
+        generar_datos(db, vehiculos=300, movimientos=3000, dias=60, hasta=HASTA, progreso=False)
+        yield db
+    engine.dispose()
+
+
+def test_sin_fechas_futuras(sintetica):
+    db = sintetica
+    assert db.query(func.count(Movimiento.id)).scalar() == 3000
+    fechas = [
+        db.query(func.max(Movimiento.fecha_hora)).scalar(),
+        db.query(func.max(Vehiculo.fecha_ultimo_movimiento)).scalar(),
+        db.query(func.max(VehiculoEtiqueta.fecha_asignacion)).scalar(),
+        db.query(func.max(VehiculoEtiqueta.fecha_remocion)).scalar(),
+        db.query(func.max(Alerta.fecha_creacion)).scalar(),
+        db.query(func.max(Alerta.fecha_resolucion)).scalar(),
+    ]
+    assert all(fecha <= HASTA for fecha in fechas if fecha is not None)
+
+
+def test_movimientos_en_orden(sintetica):
+    db = sintetica
+    anterior = {}
+    for vehiculo_id, fecha in db.query(Movimiento.vehiculo_id, Movimiento.fecha_hora).order_by(Movimiento.id):
+        assert fecha >= anterior.get(vehiculo_id, fecha)
+        anterior[vehiculo_id] = fecha
@@ -0,0 +1,49 @@
+"""Bus de invalidación: aplicación local y agrupación de NOTIFY en PostgreSQL"""
+import threading
+import time
+
+from app.services import invalidacion
+from app.services.versiones import VEHICULOS, ZONAS, obtener_version
+
+
+def test_publicar_aplica_en_este_worker():
+    version_global, version_local = obtener_version(VEHICULOS)
+    invalidacion.publicar_invalidacion(VEHICULOS)
+    assert obtener_version(VEHICULOS) == (version_global, version_local + 1)
+
+
+def test_publicaciones_simultaneas_se_agrupan(engine_postgres_falso):
+    engine = engine_postgres_falso
+    barrera = threading.Barrier(20)
+
+    def publicar(i):
+        barrera.wait()
+        invalidacion.publicar_invalidacion(f"recurso_{i}", ZONAS)
+
+    hilos = [threading.Thread(target=publicar, args=(i,)) for i in range(20)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    invalidacion.detener_envio()
+
+    enviados = {recurso for lote in engine.notificados for recurso in lote}
+    assert enviados == {f"recurso_{i}" for i in range(20)} | {ZONAS}
+    assert len(engine.notificados) < 20
+    # Quien publica no toca la BD: todos los NOTIFY salen del hilo de envío
+    assert engine.hilos == {"sigv-invalidacion-envio"}
+    # Tras el envío este worker adopta la versión compartida, igual que los demás
+    assert obtener_version(ZONAS) == (engine.versiones[ZONAS], 0)
+
+
+def test_envio_fallido_se_reintenta(engine_postgres_falso, monkeypatch):
+    monkeypatch.setattr(invalidacion, "ESPERA_REINTENTO_ENVIO", 0.01)
+    engine = engine_postgres_falso
+    engine.fallos = 2
+
+    invalidacion.publicar_invalidacion(ZONAS)
+    limite = time.monotonic() + 5
+    while not engine.notificados and time.monotonic() < limite:
+        time.sleep(0.01)
+
+    assert engine.notificados == [[ZONAS]]
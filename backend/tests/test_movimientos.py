@@ -0,0 +1,51 @@
+"""Listados de movimientos y detecciones LPR: sin consultas por fila ni por detección"""
+import pytest
+
+CAMARAS = ["LPR-1", "LPR-2", "OV-5", "OV-6", "OV-2"]
+
+
+@pytest.fixture(scope="module")
+def vehiculo_con_historial(detectar):
+    """20 vehículos con varios movimientos; devuelve el id de uno de ellos"""
+    vehiculo_id = None
+    for ronda in range(3):
+        for i in range(20):
+            resultado = detectar(f"{i:04d}MOV", CAMARAS[(i + ronda) % len(CAMARAS)])
+            vehiculo_id = vehiculo_id or resultado["vehiculo_id"]
+    return vehiculo_id
+
+
+def test_recientes_sin_n_mas_1(client, cabeceras, presupuesto_sql, vehiculo_con_historial):
+    # Usuario autenticado + listado
+    with presupuesto_sql(2):
+        respuesta = client.get("/api/movimientos/recientes?limit=50", headers=cabeceras)
+    assert respuesta.status_code == 200
+    movimientos = respuesta.json()
+    assert len(movimientos) >= 20
+    assert all(m["matricula"].endswith("MOV") and m["camara"] for m in movimientos)
+
+
+def test_historial_de_vehiculo_sin_n_mas_1(client, cabeceras, presupuesto_sql, vehiculo_con_historial):
+    # Usuario autenticado + existencia del vehículo + listado
+    with presupuesto_sql(3):
+        respuesta = client.get(f"/api/movimientos/vehiculo/{vehiculo_con_historial}", headers=cabeceras)
+    assert respuesta.status_code == 200
+    assert len(respuesta.json()) >= 3
+
+
+def test_filtro_por_zona(client, cabeceras, presupuesto_sql, vehiculo_con_historial):
+    zona_id = client.get("/api/zonas/", headers=cabeceras).json()[0]["id"]
+    with presupuesto_sql(2):
+        respuesta = client.get(f"/api/movimientos/recientes?zona_id={zona_id}", headers=cabeceras)
+    assert respuesta.status_code == 200
+    zonas = [{(m["zona_origen"] or {}).get("id"), (m["zona_destino"] or {}).get("id")} for m in respuesta.json()]
+    assert zonas and all(zona_id in ids for ids in zonas)
+
+
+def test_deteccion_sin_consultar_camara(presupuesto_sql, detectar):
+    detectar("0001LPR", "LPR-1")
+    # Vehículo conocido que cambia de zona: UPDATE del vehículo, contadores y movimiento
+    with presupuesto_sql(3) as perfil:
+        resultado = detectar("0001LPR", "OV-5")
+    assert resultado["zona_destino"]
+    assert not any("FROM camaras" in forma or "FROM zonas" in forma for forma in perfil.formas)
@@ -0,0 +1,32 @@
+"""Perfil de SQL: recuento de consultas y presupuesto por bloque"""
+import pytest
+from sqlalchemy import text
+
+from app.services.perfil_sql import forma_sentencia, perfilar
+
+
+def test_forma_sentencia_agrupa_parametros():
+    assert forma_sentencia("SELECT * FROM t WHERE id IN (?, ?, ?) AND x = 5") == \
+        forma_sentencia("SELECT *  FROM t WHERE id IN (?, ?) AND x = 7")
+
+
+def test_presupuesto_falla_si_se_supera(db, presupuesto_sql):
+    with pytest.raises(AssertionError, match="Se ejecutaron 3 consultas"):
+        with presupuesto_sql(2):
+            for _ in range(3):
+                db.execute(text("SELECT 1"))
+
+
+def test_cuenta_las_consultas_de_una_peticion(client, cabeceras, presupuesto_sql):
+    with presupuesto_sql(10) as perfil:
+        respuesta = client.get("/api/etiquetas/", headers=cabeceras)
+    assert respuesta.status_code == 200
+    assert perfil.consultas >= 2  # usuario autenticado + etiquetas
+
+
+def test_perfiles_anidados(db):
+    with perfilar() as externo:
+        db.execute(text("SELECT 1"))
+        with perfilar() as interno:
+            db.execute(text("SELECT 1"))
+    assert (externo.consultas, interno.consultas) == (2, 1)
@@ -0,0 +1,71 @@
+"""Sondeo de salud de las cámaras contra una cámara falsa (puerto TCP local)"""
+import asyncio
+
+import pytest
+
+from app.config import settings
+from app.models.zona import Camara
+from app.services import salud_camaras
+
+
+class _CamaraFalsa:
+    """Como la del simulador (modo camaras): acepta la conexión y la cierra"""
+
+    def __init__(self):
+        self.puerto = None
+        self._servidor = None
+
+    async def encender(self):
+        async def atender(lector, escritor):
+            escritor.close()
+
+        self._servidor = await asyncio.start_server(atender, "127.0.0.1", self.puerto or 0, reuse_address=True)
+        self.puerto = self._servidor.sockets[0].getsockname()[1]
+
+    async def apagar(self):
+        self._servidor.close()
+        await self._servidor.wait_closed()
+
+
+@pytest.fixture
+def camara_sondeada(db, monkeypatch):
+    monkeypatch.setattr(settings, "SONDEO_CAMARAS_FALLOS", 2)
+    monkeypatch.setattr(settings, "SONDEO_CAMARAS_TIMEOUT", 0.5)
+    camara = Camara(nombre="Cámara sondeo", codigo="SONDEO-1", tipo="vigilancia", ip="127.0.0.1", online=True)
+    db.add(camara)
+    db.commit()
+    yield camara
+    salud_camaras._camaras.clear()
+    db.delete(camara)
+    db.commit()
+
+
+def test_offline_tras_fallos_y_recuperacion(db, camara_sondeada):
+    falsa = _CamaraFalsa()
+
+    async def ciclo() -> list:
+        return [c for c in await salud_camaras.ciclo_sondeo() if c["id"] == camara_sondeada.id]
+
+    async def escenario():
+        await falsa.encender()
+        camara_sondeada.puerto = falsa.puerto
+        db.commit()
+
+        assert await ciclo() == []
+        respuesta = salud_camaras._camaras[camara_sondeada.id].ultima_respuesta
+
+        await falsa.apagar()
+        # Un fallo no basta; el segundo la marca offline con la última respuesta conocida
+        assert await ciclo() == []
+        assert await ciclo() == [{"id": camara_sondeada.id, "online": False, "ultimo_ping": respuesta}]
+        assert await ciclo() == []
+
+        await falsa.encender()
+        cambios = await ciclo()
+        assert len(cambios) == 1 and cambios[0]["online"] is True
+        assert cambios[0]["ultimo_ping"].tzinfo is None
+        await falsa.apagar()
+
+    asyncio.run(escenario())
+    db.refresh(camara_sondeada)
+    assert camara_sondeada.online is True
@@ -0,0 +1,34 @@
+"""Zonas servidas desde el catálogo en memoria"""
+
+from app.models.zona import Zona
+
+
+def test_zona_desde_catalogo(client, cabeceras, presupuesto_sql):
+    zona_id = client.get("/api/zonas/", headers=cabeceras).json()[0]["id"]
+    # Usuario autenticado + contador de la zona
+    with presupuesto_sql(2):
+        respuesta = client.get(f"/api/zonas/{zona_id}", headers=cabeceras)
+    assert respuesta.status_code == 200
+    assert respuesta.json()["id"] == zona_id
+
+
+def test_zona_desconocida_no_recarga_el_catalogo(client, cabeceras, presupuesto_sql):
+    client.get("/api/zonas/", headers=cabeceras)
+    for _ in range(3):
+        # Usuario autenticado + comprobación de una fila
+        with presupuesto_sql(2) as perfil:
+            respuesta = client.get("/api/zonas/999999", headers=cabeceras)
+        assert respuesta.status_code == 404
+        assert not any("ORDER BY zonas.orden" in forma for forma in perfil.formas)
+
+
+def test_zona_creada_por_otro_worker(client, cabeceras, db):
+    client.get("/api/zonas/", headers=cabeceras)
+    # Alta sin publicar la invalidación: como si aún no hubiera llegado el NOTIFY
+    zona = Zona(nombre="Zona de otro worker", codigo="OTRO_WORKER", tipo="campa")
+    db.add(zona)
+    db.commit()
+
+    respuesta = client.get(f"/api/zonas/{zona.id}", headers=cabeceras)
+    assert respuesta.status_code == 200
+    assert respuesta.json()["nombre"] == "Zona de otro worker"
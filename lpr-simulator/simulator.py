@@ -7,10 +7,16 @@ import requests
 import random
 import time
 import argparse
+import asyncio
+import csv
+import json
+import math
+from collections import deque
 from datetime import datetime
 
 # Configuración
 API_URL = "http://localhost:8000/api/movimientos/lpr/detectar"
+TCP_SERVIDOR = "localhost:9100"  # TCP_LPR_PUERTO del backend
 
 # Cámaras disponibles
 CAMARAS = ["LPR-1", "LPR-2"]
@@ -153,14 +159,579 @@ def modo_escenario():
     print("Escenario completado!")
 
 
+def generar_matriculas(cantidad: int, semilla: int = 1) -> list:
+    """Genera matrículas con formato español (0000BCD) reproducibles"""
+    rnd = random.Random(semilla)
+    consonantes = "BCDFGHJKLMNPRSTVWXYZ"
+    return [
+        f"{rnd.randint(0, 9999):04d}{''.join(rnd.choice(consonantes) for _ in range(3))}"
+        for _ in range(cantidad)
+    ]
+
+
+def percentil(valores_ordenados: list, p: float) -> float:
+    """Percentil por rango más cercano sobre una lista ya ordenada"""
+    if not valores_ordenados:
+        return 0.0
+    indice = max(0, math.ceil(p / 100 * len(valores_ordenados)) - 1)
+    return valores_ordenados[indice]
+
+
+def imprimir_informe(latencias_ms: list, errores: dict, duracion: float):
+    """Resumen final: throughput, tasa de error y distribución de latencias"""
+    ok = len(latencias_ms)
+    total_errores = sum(errores.values())
+    total = ok + total_errores
+    latencias = sorted(latencias_ms)
+
+    print("\n" + "=" * 50)
+    print("RESULTADOS DE LA PRUEBA DE CARGA")
+    print("=" * 50)
+    print(f"Duración:        {duracion:.1f} s")
+    print(f"Peticiones:      {total} ({ok} OK, {total_errores} errores)")
+    print(f"Throughput:      {ok / duracion if duracion else 0:.1f} detecciones/s")
+    print(f"Tasa de error:   {100 * total_errores / total if total else 0:.2f} %")
+    for causa, cantidad in sorted(errores.items(), key=lambda e: -e[1]):
+        print(f"    {causa}: {cantidad}")
+
+    if not latencias:
+        return
+
+    print(f"\nLatencia (ms):   p50={percentil(latencias, 50):.1f}  p95={percentil(latencias, 95):.1f}  "
+          f"p99={percentil(latencias, 99):.1f}  max={latencias[-1]:.1f}")
+
+    # Histograma en cubetas exponenciales
+    limites = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, float("inf")]
+    cuentas = [0] * len(limites)
+    for valor in latencias:
+        for i, limite in enumerate(limites):
+            if valor <= limite:
+                cuentas[i] += 1
+                break
+    maximo = max(cuentas)
+    print()
+    anterior = 0
+    for limite, cuenta in zip(limites, cuentas):
+        if cuenta:
+            etiqueta = f"{anterior}-{limite}" if limite != float("inf") else f">{anterior}"
+            barra = "#" * max(1, round(40 * cuenta / maximo))
+            print(f"  {etiqueta:>10} ms | {barra} {cuenta}")
+        anterior = limite if limite != float("inf") else anterior
+
+
+async def _enviar(cliente, url: str, payload: dict, inicio_previsto: float, latencias: list, errores: dict):
+    """Envía una detección y registra la latencia desde el instante previsto de envío"""
+    try:
+        respuesta = await cliente.post(url, json=payload)
+        if respuesta.status_code in (200, 202):  # 202 = encolada (INGESTA_DIFERIDA)
+            latencias.append((time.perf_counter() - inicio_previsto) * 1000)
+        else:
+            errores[f"HTTP {respuesta.status_code}"] = errores.get(f"HTTP {respuesta.status_code}", 0) + 1
+    except Exception as e:
+        causa = type(e).__name__
+        errores[causa] = errores.get(causa, 0) + 1
+
+
+async def _camara_virtual(numero: int, cliente, url: str, matriculas: list, tasa: float,
+                          llegada: str, fin: float, latencias: list, errores: dict):
+    """
+    Una cámara virtual.
+    - tasa > 0: bucle abierto, las detecciones se lanzan en su instante previsto
+      aunque las anteriores no hayan terminado (llegadas constantes o Poisson)
+    - tasa = 0: bucle cerrado, envía la siguiente en cuanto termina la anterior
+    """
+    rnd = random.Random(numero)
+    camara = CAMARAS[numero % len(CAMARAS)]
+    pendientes = set()
+    siguiente = time.perf_counter()
+
+    while siguiente < fin:
+        payload = {
+            "matricula": rnd.choice(matriculas),
+            "camara_codigo": camara,
+            "confianza": round(rnd.uniform(85, 99), 2)
+        }
+
+        if tasa <= 0:
+            inicio = time.perf_counter()
+            await _enviar(cliente, url, payload, inicio, latencias, errores)
+            siguiente = time.perf_counter()
+            continue
+
+        espera = siguiente - time.perf_counter()
+        if espera > 0:
+            await asyncio.sleep(espera)
+        tarea = asyncio.create_task(_enviar(cliente, url, payload, siguiente, latencias, errores))
+        pendientes.add(tarea)
+        tarea.add_done_callback(pendientes.discard)
+
+        intervalo = rnd.expovariate(tasa) if llegada == "poisson" else 1 / tasa
+        siguiente += intervalo
+
+    if pendientes:
+        await asyncio.gather(*pendientes)
+
+
+async def _prueba_carga(url: str, camaras: int, tasa: float, llegada: str, duracion: float,
+                        conexiones: int, num_matriculas: int):
+    import httpx
+
+    matriculas = generar_matriculas(num_matriculas)
+    latencias = []
+    errores = {}
+    limites = httpx.Limits(max_connections=conexiones, max_keepalive_connections=conexiones)
+    tasa_por_camara = tasa / camaras if tasa > 0 else 0
+
+    async with httpx.AsyncClient(limits=limites, timeout=30) as cliente:
+        inicio = time.perf_counter()
+        fin = inicio + duracion
+        await asyncio.gather(*[
+            _camara_virtual(i, cliente, url, matriculas, tasa_por_camara, llegada, fin, latencias, errores)
+            for i in range(camaras)
+        ])
+        total = time.perf_counter() - inicio
+
+    return latencias, errores, total
+
+
+async def _camara_tcp(numero: int, servidor: tuple, clave: str, matriculas: list, tasa: float,
+                      llegada: str, ventana: int, fin: float, latencias: list, errores: dict):
+    """
+    Una cámara virtual con una conexión TCP persistente (protocolo de líneas del backend).
+    Las respuestas llegan en orden, así que se emparejan con los instantes de envío en una cola.
+    - tasa > 0: bucle abierto, como en HTTP
+    - tasa = 0: bucle cerrado con hasta `ventana` detecciones sin respuesta
+    """
+    rnd = random.Random(numero)
+    camara = CAMARAS[numero % len(CAMARAS)]
+    try:
+        lector, escritor = await asyncio.open_connection(*servidor)
+    except OSError as e:
+        errores[type(e).__name__] = errores.get(type(e).__name__, 0) + 1
+        return
+
+    if clave:
+        escritor.write(f"CLAVE {clave}\n".encode())
+        if (await lector.readline()).strip() != b"OK":
+            errores["clave rechazada"] = errores.get("clave rechazada", 0) + 1
+            escritor.close()
+            return
+
+    enviados = deque()
+    libres = asyncio.Semaphore(ventana if tasa <= 0 else 1_000_000)
+
+    async def leer_respuestas():
+        while True:
+            linea = await lector.readline()
+            if not linea:
+                return
+            if not enviados:
+                continue
+            inicio_previsto = enviados.popleft()
+            libres.release()
+            if linea.startswith(b"OK"):
+                latencias.append((time.perf_counter() - inicio_previsto) * 1000)
+            else:
+                causa = linea.decode(errors="replace").strip()
+                errores[causa] = errores.get(causa, 0) + 1
+
+    lectura = asyncio.create_task(leer_respuestas())
+    siguiente = time.perf_counter()
+    try:
+        while siguiente < fin and not lectura.done():
+            if tasa > 0:
+                espera = siguiente - time.perf_counter()
+                if espera > 0:
+                    await asyncio.sleep(espera)
+            await libres.acquire()
+            if tasa <= 0:
+                siguiente = time.perf_counter()
+            linea = f"{camara}|{rnd.choice(matriculas)}|{rnd.uniform(85, 99):.2f}\n"
+            enviados.append(siguiente)
+            escritor.write(linea.encode())
+            await escritor.drain()
+            if tasa > 0:
+                siguiente += rnd.expovariate(tasa) if llegada == "poisson" else 1 / tasa
+
+        # Fin de envío: el servidor responde lo pendiente y cierra
+        escritor.write_eof()
+        await asyncio.wait_for(lectura, timeout=30)
+    except (OSError, asyncio.TimeoutError) as e:
+        errores[type(e).__name__] = errores.get(type(e).__name__, 0) + (len(enviados) or 1)
+    finally:
+        lectura.cancel()
+        escritor.close()
+
+
+async def _prueba_carga_tcp(servidor: tuple, clave: str, camaras: int, tasa: float, llegada: str,
+                            duracion: float, ventana: int, num_matriculas: int):
+    matriculas = generar_matriculas(num_matriculas)
+    latencias = []
+    errores = {}
+    tasa_por_camara = tasa / camaras if tasa > 0 else 0
+
+    inicio = time.perf_counter()
+    fin = inicio + duracion
+    await asyncio.gather(*[
+        _camara_tcp(i, servidor, clave, matriculas, tasa_por_camara, llegada, ventana, fin, latencias, errores)
+        for i in range(camaras)
+    ])
+    return latencias, errores, time.perf_counter() - inicio
+
+
+def modo_carga(url: str = API_URL, camaras: int = 10, tasa: float = 0, llegada: str = "constante",
+               duracion: float = 30, conexiones: int = 20, num_matriculas: int = 500):
+    """Modo carga: N cámaras virtuales concurrentes con conexiones keep-alive reutilizadas"""
+    print("\n" + "=" * 50)
+    print("SIMULADOR LPR - Prueba de Carga")
+    print(f"Cámaras virtuales: {camaras}")
+    if tasa > 0:
+        print(f"Tasa objetivo: {tasa} detecciones/s (llegadas {llegada}, bucle abierto)")
+    else:
+        print("Tasa objetivo: máxima (bucle cerrado)")
+    print(f"Duración: {duracion} s | Conexiones: {conexiones} | Matrículas: {num_matriculas}")
+    print("=" * 50)
+
+    try:
+        imprimir_informe(*asyncio.run(
+            _prueba_carga(url, camaras, tasa, llegada, duracion, conexiones, num_matriculas)
+        ))
+    except KeyboardInterrupt:
+        print("\n\nPrueba detenida por el usuario")
+
+
+def _servidor_tcp(valor: str) -> tuple:
+    host, _, puerto = valor.rpartition(":")
+    return host or "localhost", int(puerto)
+
+
+def modo_carga_tcp(servidor: str = TCP_SERVIDOR, clave: str = None, camaras: int = 10, tasa: float = 0,
+                   llegada: str = "constante", duracion: float = 30, ventana: int = 1,
+                   num_matriculas: int = 500):
+    """Modo carga-tcp: una conexión TCP persistente por cámara virtual (TCP_LPR_PUERTO del backend)"""
+    print("\n" + "=" * 50)
+    print("SIMULADOR LPR - Prueba de Carga TCP")
+    print(f"Servidor: {servidor} | Cámaras virtuales (conexiones): {camaras}")
+    if tasa > 0:
+        print(f"Tasa objetivo: {tasa} detecciones/s (llegadas {llegada}, bucle abierto)")
+    else:
+        print(f"Tasa objetivo: máxima (bucle cerrado, {ventana} detecciones en vuelo por cámara)")
+    print(f"Duración: {duracion} s | Matrículas: {num_matriculas}")
+    print("=" * 50)
+
+    try:
+        imprimir_informe(*asyncio.run(
+            _prueba_carga_tcp(_servidor_tcp(servidor), clave, camaras, tasa, llegada, duracion,
+                              ventana, num_matriculas)
+        ))
+    except KeyboardInterrupt:
+        print("\n\nPrueba detenida por el usuario")
+
+
+def modo_comparar(url: str = API_URL, servidor: str = TCP_SERVIDOR, clave: str = None, camaras: int = 10,
+                  tasa: float = 0, llegada: str = "constante", duracion: float = 30, conexiones: int = 20,
+                  ventana: int = 1, num_matriculas: int = 500):
+    """Modo comparar: la misma carga por HTTP y por TCP, una detrás de otra, y tabla comparativa"""
+    print("\n" + "=" * 50)
+    print("SIMULADOR LPR - Comparación HTTP / TCP")
+    print(f"Cámaras virtuales: {camaras} | Duración por protocolo: {duracion} s")
+    print("=" * 50)
+
+    resultados = {}
+    try:
+        print("\nHTTP...")
+        resultados["HTTP"] = asyncio.run(
+            _prueba_carga(url, camaras, tasa, llegada, duracion, conexiones, num_matriculas)
+        )
+        print("TCP...")
+        resultados["TCP"] = asyncio.run(
+            _prueba_carga_tcp(_servidor_tcp(servidor), clave, camaras, tasa, llegada, duracion,
+                              ventana, num_matriculas)
+        )
+    except KeyboardInterrupt:
+        print("\n\nPrueba detenida por el usuario")
+        return
+
+    print(f"\n{'':<6}{'det/s':>10}{'errores':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for protocolo, (latencias, errores, total) in resultados.items():
+        ordenadas = sorted(latencias)
+        print(f"{protocolo:<6}{len(latencias) / total if total else 0:>10.1f}{sum(errores.values()):>10}"
+              f"{percentil(ordenadas, 50):>10.1f}{percentil(ordenadas, 95):>10.1f}{percentil(ordenadas, 99):>10.1f}")
+        for causa, cantidad in sorted(errores.items(), key=lambda e: -e[1]):
+            print(f"{'':<6}  {causa}: {cantidad}")
+
+
+# Cámaras falsas para el sondeo de salud del backend
+def _rango_puertos(valor: str) -> list:
+    """"9301-9304,9310" -> [9301, 9302, 9303, 9304, 9310]"""
+    puertos = []
+    for parte in valor.split(","):
+        inicio, _, fin = parte.partition("-")
+        puertos.extend(range(int(inicio), int(fin or inicio) + 1))
+    return puertos
+
+
+async def _camara_falsa(puerto: int, caida: float):
+    """Acepta conexiones en el puerto; con caida > 0 se apaga y enciende a intervalos aleatorios"""
+    async def atender(lector, escritor):
+        escritor.close()
+
+    rnd = random.Random(puerto)
+    while True:
+        servidor = await asyncio.start_server(atender, "0.0.0.0", puerto, reuse_address=True)
+        print(f"[{datetime.now().strftime('%H:%M:%S')}] Cámara :{puerto} online")
+        if caida <= 0:
+            await servidor.serve_forever()
+        await asyncio.sleep(rnd.expovariate(1 / caida))
+        servidor.close()
+        await servidor.wait_closed()
+        print(f"[{datetime.now().strftime('%H:%M:%S')}] Cámara :{puerto} offline")
+        await asyncio.sleep(rnd.expovariate(1 / caida))
+
+
+def modo_camaras(puertos: list, caida: float = 0):
+    """Modo camaras: puertos TCP que responden como cámaras (configurar ip/puerto en el backend)"""
+    print("\n" + "=" * 50)
+    print("SIMULADOR LPR - Cámaras falsas para el sondeo de salud")
+    print(f"Puertos: {', '.join(map(str, puertos))}")
+    if caida > 0:
+        print(f"Caídas aleatorias: ~{caida} s encendidas / ~{caida} s apagadas")
+    print("=" * 50)
+
+    async def todas():
+        await asyncio.gather(*[_camara_falsa(puerto, caida) for puerto in puertos])
+
+    try:
+        asyncio.run(todas())
+    except KeyboardInterrupt:
+        print("\n\nCámaras detenidas")
+
+
+# Reproducción de capturas
+COLUMNAS_CSV = {
+    "t": ["fecha_hora", "fecha", "timestamp", "time", "datetime"],
+    "m": ["matricula", "plate", "license_plate", "placa"],
+    "c": ["camara", "camara_codigo", "camera", "camera_id"],
+    "f": ["confianza", "confidence", "score"],
+}
+
+
+def _leer_instante(valor: str) -> float:
+    """Epoch (segundos o milisegundos) o fecha ISO 8601 a segundos epoch"""
+    valor = valor.strip()
+    try:
+        numero = float(valor)
+        return numero / 1000 if numero > 1e11 else numero
+    except ValueError:
+        return datetime.fromisoformat(valor.replace("Z", "+00:00")).timestamp()
+
+
+def cargar_captura(ruta: str) -> list:
+    """
+    Lee una captura del backend (.jsonl, CAPTURA_DETECCIONES_ARCHIVO) o un CSV
+    exportado por el software de las cámaras. Devuelve eventos ordenados por tiempo.
+    """
+    eventos = []
+    if ruta.lower().endswith(".csv"):
+        with open(ruta, newline="", encoding="utf-8-sig") as f:
+            muestra = f.read(4096)
+            f.seek(0)
+            dialecto = csv.Sniffer().sniff(muestra, delimiters=",;\t")
+            lector = csv.DictReader(f, dialect=dialecto)
+            cabeceras = {c.strip().lower(): c for c in lector.fieldnames or []}
+            columnas = {}
+            for clave, alias in COLUMNAS_CSV.items():
+                columnas[clave] = next((cabeceras[a] for a in alias if a in cabeceras), None)
+            if not columnas["t"] or not columnas["m"] or not columnas["c"]:
+                raise ValueError(f"El CSV necesita columnas de fecha, matrícula y cámara: {lector.fieldnames}")
+            for fila in lector:
+                confianza = fila.get(columnas["f"]) if columnas["f"] else None
+                eventos.append({
+                    "t": _leer_instante(fila[columnas["t"]]),
+                    "m": fila[columnas["m"]].strip(),
+                    "c": fila[columnas["c"]].strip(),
+                    "f": float(confianza) if confianza else None,
+                })
+    else:
+        with open(ruta, encoding="utf-8") as f:
+            eventos = [json.loads(linea) for linea in f if linea.strip()]
+
+    eventos.sort(key=lambda e: e["t"])
+    return eventos
+
+
+def estado_esperado(eventos: list) -> dict:
+    """Estado final por matrícula según la captura original (solo capturas del backend)"""
+    estados = {}
+    for evento in eventos:
+        accion = evento.get("a")
+        if accion is None:
+            continue
+        anterior = estados.get(evento["m"], {})
+        en_instalaciones = anterior.get("en_instalaciones", False)
+        if accion == "entrada":
+            en_instalaciones = True
+        elif accion == "salida":
+            en_instalaciones = False
+        estados[evento["m"]] = {"en_instalaciones": en_instalaciones, "zona": evento.get("z")}
+    return estados
+
+
+async def _reproducir(url: str, eventos: list, velocidad: float, conexiones: int):
+    """
+    Envía los eventos respetando los tiempos originales divididos por `velocidad`
+    (0 = lo más rápido posible). Las detecciones de una misma matrícula se envían
+    siempre en orden, aunque se solapen en el tiempo.
+    """
+    import httpx
+
+    latencias = []
+    errores = {}
+    acciones_distintas = []
+    ultima_por_matricula = {}
+    limites = httpx.Limits(max_connections=conexiones, max_keepalive_connections=conexiones)
+
+    async def enviar(evento, anterior):
+        if anterior is not None:
+            await anterior
+        inicio = time.perf_counter()
+        try:
+            respuesta = await cliente.post(url, json={
+                "matricula": evento["m"], "camara_codigo": evento["c"], "confianza": evento.get("f")
+            })
+        except Exception as e:
+            errores[type(e).__name__] = errores.get(type(e).__name__, 0) + 1
+            return
+        if respuesta.status_code != 200:
+            errores[f"HTTP {respuesta.status_code}"] = errores.get(f"HTTP {respuesta.status_code}", 0) + 1
+            return
+        latencias.append((time.perf_counter() - inicio) * 1000)
+        accion = respuesta.json()["resultado"]["accion"]
+        if evento.get("a") and evento["a"] != accion:
+            acciones_distintas.append((evento["m"], evento["a"], accion))
+
+    async with httpx.AsyncClient(limits=limites, timeout=30) as cliente:
+        inicio = time.perf_counter()
+        t0 = eventos[0]["t"]
+        tareas = []
+        for evento in eventos:
+            if velocidad > 0:
+                espera = (evento["t"] - t0) / velocidad - (time.perf_counter() - inicio)
+                if espera > 0:
+                    await asyncio.sleep(espera)
+            anterior = ultima_por_matricula.get(evento["m"])
+            tarea = asyncio.create_task(enviar(evento, anterior))
+            ultima_por_matricula[evento["m"]] = tarea
+            tareas.append(tarea)
+            if velocidad <= 0 and len(tareas) % conexiones == 0:
+                await asyncio.gather(*tareas[-conexiones:])
+        await asyncio.gather(*tareas)
+        duracion = time.perf_counter() - inicio
+
+    return latencias, errores, acciones_distintas, duracion
+
+
+def comprobar_estados(url: str, esperados: dict, usuario: str, password: str) -> int:
+    """Compara el estado final de cada vehículo en la API con el de la captura"""
+    base = url.split("/api/")[0]
+    respuesta = requests.post(f"{base}/api/auth/login", data={"username": usuario, "password": password})
+    respuesta.raise_for_status()
+    cabeceras = {"Authorization": f"Bearer {respuesta.json()['access_token']}"}
+
+    diferencias = 0
+    with requests.Session() as sesion:
+        for matricula, esperado in esperados.items():
+            r = sesion.get(f"{base}/api/vehiculos/buscar/{matricula}", headers=cabeceras)
+            if r.status_code != 200:
+                print(f"  {matricula}: no encontrado ({r.status_code})")
+                diferencias += 1
+                continue
+            vehiculo = r.json()
+            zona = vehiculo["zona_actual"]["nombre"] if vehiculo["zona_actual"] else None
+            if vehiculo["en_instalaciones"] != esperado["en_instalaciones"] or zona != esperado["zona"]:
+                print(f"  {matricula}: esperado {esperado}, obtenido "
+                      f"{{'en_instalaciones': {vehiculo['en_instalaciones']}, 'zona': {zona!r}}}")
+                diferencias += 1
+    return diferencias
+
+
+def modo_replay(ruta: str, url: str = API_URL, velocidad: float = 1, conexiones: int = 20,
+                usuario: str = None, password: str = None):
+    """Modo replay: reproduce una captura real con sus tiempos entre llegadas"""
+    eventos = cargar_captura(ruta)
+    if not eventos:
+        print("La captura está vacía")
+        return
+
+    duracion_original = eventos[-1]["t"] - eventos[0]["t"]
+    print("\n" + "=" * 50)
+    print("SIMULADOR LPR - Reproducción de Captura")
+    print(f"Archivo: {ruta} ({len(eventos)} detecciones, {duracion_original:.0f} s originales)")
+    print(f"Velocidad: {'máxima' if velocidad <= 0 else f'{velocidad}x'}")
+    print("=" * 50)
+
+    try:
+        latencias, errores, acciones_distintas, duracion = asyncio.run(
+            _reproducir(url, eventos, velocidad, conexiones)
+        )
+    except KeyboardInterrupt:
+        print("\n\nReproducción detenida por el usuario")
+        return
+
+    imprimir_informe(latencias, errores, duracion)
+
+    esperados = estado_esperado(eventos)
+    if not esperados:
+        print("\nLa captura no incluye resultados; no se comprueban estados.")
+        return
+
+    print(f"\nAcciones distintas a la captura: {len(acciones_distintas)}")
+    for matricula, original, obtenida in acciones_distintas[:10]:
+        print(f"  {matricula}: {original} -> {obtenida}")
+
+    if usuario and password:
+        print(f"\nComprobando estado final de {len(esperados)} vehículos...")
+        diferencias = comprobar_estados(url, esperados, usuario, password)
+        print(f"Vehículos con estado distinto: {diferencias}")
+
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Simulador de Cámaras LPR para SIGV")
-    parser.add_argument("--modo", choices=["interactivo", "auto", "escenario"],
+    parser.add_argument("--modo", choices=["interactivo", "auto", "escenario", "carga", "carga-tcp", "comparar", "camaras", "replay"],
                         default="interactivo", help="Modo de simulación")
     parser.add_argument("--intervalo", type=int, default=30,
                         help="Intervalo entre detecciones en modo auto (segundos)")
     parser.add_argument("--cantidad", type=int, default=10,
                         help="Número de detecciones en modo auto")
+    parser.add_argument("--url", default=API_URL,
+                        help="URL del endpoint de detecciones")
+    parser.add_argument("--camaras", type=int, default=10,
+                        help="Cámaras virtuales concurrentes en modo carga")
+    parser.add_argument("--tasa", type=float, default=0,
+                        help="Detecciones/s totales en modo carga (0 = máxima, bucle cerrado)")
+    parser.add_argument("--llegada", choices=["constante", "poisson"], default="constante",
+                        help="Proceso de llegada en modo carga con --tasa")
+    parser.add_argument("--duracion", type=float, default=30,
+                        help="Duración de la prueba de carga (segundos)")
+    parser.add_argument("--conexiones", type=int, default=20,
+                        help="Conexiones keep-alive del pool en modo carga")
+    parser.add_argument("--tcp", default=TCP_SERVIDOR,
+                        help="host:puerto del listener TCP en modos carga-tcp y comparar")
+    parser.add_argument("--ventana", type=int, default=1,
+                        help="Detecciones sin respuesta por conexión TCP en bucle cerrado")
+    parser.add_argument("--clave", help="Clave del listener TCP (TCP_LPR_CLAVE)")
+    parser.add_argument("--puertos", default="9301-9304",
+                        help="Puertos de las cámaras falsas en modo camaras (ej: 9301-9304,9310)")
+    parser.add_argument("--caida", type=float, default=0,
+                        help="Segundos medios entre caídas de cada cámara falsa (0 = siempre online)")
+    parser.add_argument("--matriculas", type=int, default=500,
+                        help="Número de matrículas distintas en modo carga")
+    parser.add_argument("--archivo",
+                        help="Captura a reproducir en modo replay (.jsonl del backend o .csv de las cámaras)")
+    parser.add_argument("--velocidad", type=float, default=1,
+                        help="Factor de velocidad en modo replay (1, 10... 0 = lo más rápido posible)")
+    parser.add_argument("--usuario", help="Usuario para comprobar estados tras el replay")
+    parser.add_argument("--password", help="Contraseña para comprobar estados tras el replay")
 
     args = parser.parse_args()
 
@@ -175,3 +746,18 @@ if __name__ == "__main__":
         modo_automatico(args.intervalo, args.cantidad)
     elif args.modo == "escenario":
         modo_escenario()
+    elif args.modo == "carga":
+        modo_carga(args.url, args.camaras, args.tasa, args.llegada, args.duracion,
+                   args.conexiones, args.matriculas)
+    elif args.modo == "carga-tcp":
+        modo_carga_tcp(args.tcp, args.clave, args.camaras, args.tasa, args.llegada, args.duracion,
+                       args.ventana, args.matriculas)
+    elif args.modo == "comparar":
+        modo_comparar(args.url, args.tcp, args.clave, args.camaras, args.tasa, args.llegada, args.duracion,
+                      args.conexiones, args.ventana, args.matriculas)
+    elif args.modo == "camaras":
+        modo_camaras(_rango_puertos(args.puertos), args.caida)
+    elif args.modo == "replay":
+        if not args.archivo:
+            parser.error("--modo replay requiere --archivo")
+        modo_replay(args.archivo, args.url, args.velocidad, args.conexiones, args.usuario, args.password)